@@ -0,0 +1,247 @@
+"""
+Offline LLM execution through an OpenAI-style Batch API.
+
+Work nobody is waiting on (the resume parse backlog, overnight re-ranking) doesn't need the
+synchronous endpoints: its requests are written to a JSONL file, one
+`{"custom_id", "method", "url", "body"}` per line, and submitted as one batch. The provider answers
+within the completion window at BATCH_PRICE_FACTOR of the price and outside the synchronous rate
+limits; results come back as JSONL lines matched to the requests by `custom_id`.
+
+The backend is pluggable (settings.LLM_BATCH, like CANDIDATE_EMBEDDER):
+- OpenAIBatchBackend uploads the file and polls the provider's Batch API
+- LocalFileBatchBackend keeps batches in a directory and answers them when first polled, sending
+  each request to the configured OpenAI-compatible endpoint (e.g. benchmarks.fake_openai), so the
+  whole flow runs without the Batch API and, with the fake endpoint, without network
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+from django.conf import settings
+from django.utils.module_loading import import_string
+from dotenv import load_dotenv
+from openai import OpenAI
+
+from .llm import llm_call
+
+load_dotenv()
+client = OpenAI()
+
+# Metrics call_site of the requests LocalFileBatchBackend sends
+LOCAL_BATCH_CALL_SITE = "local_batch"
+
+# Batch statuses after which no more results will arrive (expired and cancelled batches keep the
+# results of the requests that were answered before)
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def request_line(custom_id, url, body):
+    return {"custom_id": custom_id, "method": "POST", "url": url, "body": body}
+
+
+def write_requests(path, lines):
+    """Writes request lines as a JSONL batch input file. Returns the number of requests."""
+    count = 0
+    with open(path, "w") as f:
+        for line in lines:
+            f.write(json.dumps(line, separators=(",", ":")) + "\n")
+            count += 1
+    return count
+
+
+def read_jsonl(text):
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def response_body(result):
+    """(body, None) for a successful result line, (None, error message) otherwise."""
+    response = result.get("response") or {}
+    if result.get("error") is None and response.get("status_code") == 200:
+        return response.get("body"), None
+    error = result.get("error") or (response.get("body") or {}).get("error") or {}
+    message = error.get("message") if isinstance(error, dict) else str(error)
+    return None, message or f"Request failed with status {response.get('status_code')}"
+
+
+class BaseBatchBackend:
+    """
+    Submits JSONL batch input files and returns their results. Batch states are dicts with the
+    provider's `status`, the `total`, `completed` and `failed` request counts and an `error` message.
+    """
+
+    def __init__(self, directory, completion_window="24h"):
+        self.directory = directory
+        self.completion_window = completion_window
+
+    @property
+    def name(self):
+        return type(self).__name__
+
+    def submit(self, path, endpoint, metadata=None):
+        """Submits the input file at `path` for `endpoint` (e.g. "/v1/responses"). Returns the batch id."""
+        raise NotImplementedError
+
+    def retrieve(self, batch_id):
+        raise NotImplementedError
+
+    def results(self, batch_id):
+        """Every result line answered so far (successes and errors), in no particular order."""
+        raise NotImplementedError
+
+    def cancel(self, batch_id):
+        raise NotImplementedError
+
+
+class OpenAIBatchBackend(BaseBatchBackend):
+
+    def submit(self, path, endpoint, metadata=None):
+        with open(path, "rb") as f:
+            input_file = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(
+            input_file_id=input_file.id, endpoint=endpoint, completion_window=self.completion_window,
+            metadata=metadata,
+        )
+        return batch.id
+
+    def retrieve(self, batch_id):
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        errors = batch.errors.data if batch.errors and batch.errors.data else []
+        return {
+            "status": batch.status,
+            "total": counts.total if counts else 0,
+            "completed": counts.completed if counts else 0,
+            "failed": counts.failed if counts else 0,
+            "error": "; ".join(error.message or error.code or "" for error in errors),
+        }
+
+    def results(self, batch_id):
+        batch = client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                lines += read_jsonl(client.files.content(file_id).text)
+        return lines
+
+    def cancel(self, batch_id):
+        client.batches.cancel(batch_id)
+
+
+class LocalFileBatchBackend(BaseBatchBackend):
+    """
+    Stand-in for the Batch API on the local filesystem: <directory>/<batch id>/ holds input.jsonl,
+    state.json and, once answered, output.jsonl and errors.jsonl in the Batch API's result format.
+    A batch is answered by the first poll that claims it, `workers` requests at a time. The requests
+    go through llm_call (rate limiter, retries, metrics) under the LOCAL_BATCH_CALL_SITE call site, at
+    synchronous prices, as that's what they cost.
+    """
+
+    def __init__(self, directory, completion_window="24h", workers=8):
+        super().__init__(directory, completion_window)
+        self.workers = workers
+
+    def batch_path(self, batch_id, name):
+        return os.path.join(self.directory, batch_id, name)
+
+    def read_state(self, batch_id):
+        with open(self.batch_path(batch_id, "state.json")) as f:
+            return json.load(f)
+
+    def write_state(self, batch_id, state):
+        path = self.batch_path(batch_id, "state.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(f"{path}.tmp", path)
+
+    def submit(self, path, endpoint, metadata=None):
+        batch_id = f"batch_local_{uuid.uuid4().hex}"
+        os.makedirs(os.path.join(self.directory, batch_id))
+        shutil.copyfile(path, self.batch_path(batch_id, "input.jsonl"))
+        self.write_state(batch_id, {
+            "status": "validating", "endpoint": endpoint, "metadata": metadata or {},
+            "completion_window": self.completion_window, "created_at": time.time(),
+            "total": 0, "completed": 0, "failed": 0, "error": "",
+        })
+        return batch_id
+
+    def answer(self, request):
+        """One result line for one request line, sent like any other call (see backends.llm)."""
+        result = {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"], "error": None}
+        path = request["url"].removeprefix("/v1")
+        try:
+            body = llm_call(LOCAL_BATCH_CALL_SITE, lambda **body: client.post(path, body=body, cast_to=object), **request["body"])
+            result["response"] = {"status_code": 200, "request_id": "", "body": body}
+        except openai.APIStatusError as e:
+            result["response"] = {"status_code": e.status_code, "request_id": "", "body": {"error": e.body}}
+        except openai.APIError as e:
+            result["response"] = None
+            result["error"] = {"code": type(e).__name__, "message": str(e)}
+        return result
+
+    def run(self, batch_id, state):
+        with open(self.batch_path(batch_id, "input.jsonl")) as f:
+            requests = read_jsonl(f.read())
+        state.update(status="in_progress", total=len(requests))
+        self.write_state(batch_id, state)
+
+        with ThreadPoolExecutor(max(1, self.workers), thread_name_prefix="local-batch") as threads:
+            results = list(threads.map(self.answer, requests))
+        succeeded, failed = [], []
+        for result in results:
+            (succeeded if response_body(result)[1] is None else failed).append(result)
+        write_requests(self.batch_path(batch_id, "output.jsonl"), succeeded)
+        write_requests(self.batch_path(batch_id, "errors.jsonl"), failed)
+        # A batch cancelled meanwhile stays cancelled, with the results it got
+        status = "cancelled" if self.read_state(batch_id)["status"] == "cancelled" else "completed"
+        state.update(status=status, completed=len(succeeded), failed=len(failed), completed_at=time.time())
+        self.write_state(batch_id, state)
+
+    def claim(self, batch_id):
+        """True for exactly one caller per batch: creating the claim file is atomic (O_EXCL)."""
+        try:
+            os.close(os.open(self.batch_path(batch_id, "claimed"), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    def retrieve(self, batch_id):
+        state = self.read_state(batch_id)
+        if state["status"] == "validating":
+            if self.claim(batch_id):
+                self.run(batch_id, state)
+            else:
+                # Another poller is answering it and hasn't written in_progress yet
+                state["status"] = "in_progress"
+        return state
+
+    def results(self, batch_id):
+        lines = []
+        for name in ("output.jsonl", "errors.jsonl"):
+            path = self.batch_path(batch_id, name)
+            if os.path.exists(path):
+                with open(path) as f:
+                    lines += read_jsonl(f.read())
+        return lines
+
+    def cancel(self, batch_id):
+        state = self.read_state(batch_id)
+        if state["status"] not in FINAL_STATUSES:
+            state["status"] = "cancelled"
+            self.write_state(batch_id, state)
+
+
+_backend = None
+
+
+def get_batch_backend():
+    """Returns the batch backend configured in settings.LLM_BATCH."""
+    global _backend
+    if _backend is None:
+        config = settings.LLM_BATCH
+        _backend = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+        os.makedirs(_backend.directory, exist_ok=True)
+    return _backend
@@ -0,0 +1,73 @@
+"""
+The one way the app calls the OpenAI API. Each attempt waits for the shared rate limiter
+(backends.ratelimit) and is recorded in the metrics (backends.metrics); transient failures
+(429, 5xx, timeouts, dropped connections) are retried with jittered exponential backoff, so one
+flaky call costs one extra call instead of a failed task.
+
+    response = llm_call("resume_parse", client.responses.parse, model="gpt-4o", input=..., text_format=...)
+"""
+import time
+
+import openai
+from django.conf import settings
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from .metrics import record_llm_call, usage_tokens
+from .ratelimit import acquire, estimate_request_tokens, settle
+
+TRANSIENT_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+
+def is_transient(error):
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+def retry_after(error):
+    """Seconds the API asked us to wait (Retry-After header of a 429/503), if any."""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after")) if response is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class wait_backoff(wait_random_exponential):
+    """Full-jitter exponential backoff, but never shorter than the API's Retry-After."""
+
+    def __call__(self, retry_state):
+        error = retry_state.outcome.exception() if retry_state.outcome else None
+        return max(super().__call__(retry_state), retry_after(error))
+
+
+def attempt_llm_call(call_site, create, **kwargs):
+    """A single rate-limited, recorded call; see llm_call."""
+    model = kwargs.get("model", "unknown")
+    reserved = estimate_request_tokens(kwargs)
+    throttled = acquire(model, reserved)
+    started = time.perf_counter()
+    try:
+        response = create(**kwargs)
+    except Exception as e:
+        settle(model, reserved, 0)
+        record_llm_call(call_site, model, time.perf_counter() - started, error=type(e).__name__, throttled=throttled)
+        raise
+    usage = response.get("usage") if isinstance(response, dict) else getattr(response, "usage", None)
+    input_tokens, output_tokens = usage_tokens(usage)
+    if input_tokens or output_tokens:
+        settle(model, reserved, input_tokens + output_tokens)
+    record_llm_call(call_site, model, time.perf_counter() - started, input_tokens, output_tokens, throttled=throttled)
+    return response
+
+
+def llm_call(call_site, create, **kwargs):
+    """
+    Calls an OpenAI SDK method, e.g. client.chat.completions.create, under `call_site`, retrying
+    transient failures up to LLM_CALL_MAX_RETRIES times. The last error is re-raised.
+    """
+    retrying = Retrying(
+        stop=stop_after_attempt(settings.LLM_CALL_MAX_RETRIES + 1),
+        wait=wait_backoff(multiplier=settings.LLM_CALL_RETRY_BASE_DELAY, max=settings.LLM_CALL_RETRY_MAX_DELAY),
+        retry=retry_if_exception(is_transient),
+        reraise=True,
+    )
+    return retrying(attempt_llm_call, call_site, create, **kwargs)
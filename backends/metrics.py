@@ -0,0 +1,288 @@
+"""
+Prometheus metrics for LLM calls and Celery tasks.
+
+Gunicorn and Celery run many processes (often on different hosts), so samples are aggregated in
+Redis (METRICS_REDIS_URL) instead of process memory: every process increments the same hashes and
+GET /metrics/ renders them in the Prometheus text format. Recording never raises; if Redis is
+unreachable the sample is dropped. LLM calls are recorded by backends.llm.llm_call.
+"""
+import hmac
+import json
+import math
+import threading
+import time
+
+import redis
+from celery import signals
+from django.conf import settings
+from django.http import HttpResponse
+
+# Dollars per 1K (input, output) tokens, matched by model name prefix (longest first)
+LLM_PRICING_PER_1K = {
+    "gpt-5": (0.00125, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "text-embedding-3-small": (0.00002, 0.0),
+    "text-embedding-3-large": (0.00013, 0.0),
+}
+# Batch API requests (backends.batch) are billed at this share of the synchronous price
+BATCH_PRICE_FACTOR = 0.5
+
+LLM_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+TASK_DURATION_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800)
+QUEUE_WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+
+_redis = None
+_registry = []
+
+
+def get_redis():
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.METRICS_REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return _redis
+
+
+def _write(commands):
+    """Runs [(method, args)] in one pipelined round trip; metrics must never break the caller."""
+    if not settings.METRICS_ENABLED:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for method, args in commands:
+            getattr(pipe, method)(*args)
+        pipe.execute()
+    except Exception as e:
+        print(f"Metrics write failed: {str(e)}")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    @property
+    def key(self):
+        return f"{settings.METRICS_KEY_PREFIX}:{self.name}"
+
+    def _label_key(self, labels):
+        return json.dumps([str(labels[name]) for name in self.labelnames])
+
+    def _label_pairs(self, label_key):
+        return list(zip(self.labelnames, json.loads(label_key)))
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc_commands(self, amount=1, **labels):
+        return [("hincrbyfloat", (self.key, self._label_key(labels), amount))]
+
+    def inc(self, amount=1, **labels):
+        _write(self.inc_commands(amount, **labels))
+
+    def render(self, fields):
+        lines = self.header()
+        for label_key, value in sorted(fields.items()):
+            lines.append(f"{self.name}{_format_labels(self._label_pairs(label_key))} {_format_value(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    """Stores per-bucket (non-cumulative) counts plus sum and count; cumulated when rendered."""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LLM_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe_commands(self, value, **labels):
+        label_key = self._label_key(labels)
+        bucket = next(le for le in self.buckets if value <= le)
+        return [
+            ("hincrbyfloat", (self.key, f"bucket|{bucket}|{label_key}", 1)),
+            ("hincrbyfloat", (self.key, f"sum|{label_key}", value)),
+            ("hincrbyfloat", (self.key, f"count|{label_key}", 1)),
+        ]
+
+    def observe(self, value, **labels):
+        _write(self.observe_commands(value, **labels))
+
+    def render(self, fields):
+        series = {}
+        for field, value in fields.items():
+            kind, _, rest = field.partition("|")
+            if kind == "bucket":
+                bucket, _, label_key = rest.partition("|")
+                series.setdefault(label_key, {"buckets": {}})["buckets"][float(bucket)] = float(value)
+            else:
+                series.setdefault(rest, {"buckets": {}})[kind] = float(value)
+
+        lines = self.header()
+        for label_key, data in sorted(series.items()):
+            pairs = self._label_pairs(label_key)
+            cumulative = 0
+            for le in self.buckets:
+                cumulative += data["buckets"].get(le, 0)
+                le_text = "+Inf" if le == math.inf else _format_value(le)
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', le_text)])} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(data.get('sum', 0))}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {_format_value(data.get('count', 0))}")
+        return lines
+
+
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds", "Latency of LLM API calls.", ("call_site", "model"), LLM_LATENCY_BUCKETS)
+LLM_REQUESTS = Counter("llm_requests_total", "LLM API calls by outcome.", ("call_site", "model", "status"))
+LLM_ERRORS = Counter("llm_errors_total", "Failed LLM API calls by exception type.", ("call_site", "model", "error"))
+LLM_INPUT_TOKENS = Counter("llm_input_tokens_total", "Input tokens reported by the API.", ("call_site", "model"))
+LLM_OUTPUT_TOKENS = Counter("llm_output_tokens_total", "Output tokens reported by the API.", ("call_site", "model"))
+LLM_COST = Counter("llm_cost_dollars_total", "Estimated LLM spend (LLM_PRICING_PER_1K).", ("call_site", "model"))
+LLM_THROTTLE_WAIT = Histogram(
+    "llm_ratelimit_wait_seconds", "Time LLM calls waited for the shared rate limiter.", ("call_site", "model"),
+    QUEUE_WAIT_BUCKETS)
+RESUME_PARSE_CACHE = Counter(
+    "resume_parse_cache_total", "Resume parses served from the parse cache (hit) or parsed anew (miss).", ("result",))
+RESUME_CONDENSER_TOKENS = Counter(
+    "resume_condenser_tokens_total", "Resume text tokens before (original) and after (condensed) condensing.",
+    ("stage",))
+TASK_DURATION = Histogram(
+    "celery_task_duration_seconds", "Celery task run time.", ("task", "state"), TASK_DURATION_BUCKETS)
+TASK_QUEUE_WAIT = Histogram(
+    "celery_task_queue_wait_seconds", "Time from publishing a Celery task to a worker starting it.", ("task",),
+    QUEUE_WAIT_BUCKETS)
+
+
+def llm_cost(model, input_tokens, output_tokens, batch=False):
+    for prefix in sorted(LLM_PRICING_PER_1K, key=len, reverse=True):
+        if model.startswith(prefix):
+            input_rate, output_rate = LLM_PRICING_PER_1K[prefix]
+            cost = (input_tokens / 1000) * input_rate + (output_tokens / 1000) * output_rate
+            return cost * BATCH_PRICE_FACTOR if batch else cost
+    return 0.0
+
+
+def usage_tokens(usage):
+    """
+    (input, output) tokens from a chat/embeddings (`prompt_tokens`) or responses (`input_tokens`) usage,
+    an SDK object or the dict of a raw response.
+    """
+    if usage is None:
+        return 0, 0
+    field = usage.get if isinstance(usage, dict) else lambda name: getattr(usage, name, None)
+    input_tokens = field("prompt_tokens") or field("input_tokens") or 0
+    output_tokens = field("completion_tokens") or field("output_tokens") or 0
+    return input_tokens, output_tokens
+
+
+def record_llm_call(call_site, model, seconds, input_tokens=0, output_tokens=0, error=None, throttled=0.0):
+    labels = {"call_site": call_site, "model": model}
+    commands = LLM_REQUEST_DURATION.observe_commands(seconds, **labels)
+    commands += LLM_THROTTLE_WAIT.observe_commands(throttled, **labels)
+    commands += LLM_REQUESTS.inc_commands(status="error" if error else "ok", **labels)
+    if error:
+        commands += LLM_ERRORS.inc_commands(error=error, **labels)
+    if input_tokens or output_tokens:
+        commands += LLM_INPUT_TOKENS.inc_commands(input_tokens, **labels)
+        commands += LLM_OUTPUT_TOKENS.inc_commands(output_tokens, **labels)
+        commands += LLM_COST.inc_commands(llm_cost(model, input_tokens, output_tokens), **labels)
+    _write(commands)
+
+
+def record_llm_batch_results(call_site, model, succeeded, failed, input_tokens=0, output_tokens=0):
+    """Results of a Batch API run: request outcomes, tokens and cost at batch prices (no latency, it isn't a call's)."""
+    labels = {"call_site": call_site, "model": model}
+    commands = LLM_REQUESTS.inc_commands(succeeded, status="ok", **labels)
+    if failed:
+        commands += LLM_REQUESTS.inc_commands(failed, status="error", **labels)
+        commands += LLM_ERRORS.inc_commands(failed, error="BatchRequestFailed", **labels)
+    if input_tokens or output_tokens:
+        commands += LLM_INPUT_TOKENS.inc_commands(input_tokens, **labels)
+        commands += LLM_OUTPUT_TOKENS.inc_commands(output_tokens, **labels)
+        commands += LLM_COST.inc_commands(llm_cost(model, input_tokens, output_tokens, batch=True), **labels)
+    _write(commands)
+
+
+def record_resume_condensed(original_tokens, condensed_tokens):
+    _write(RESUME_CONDENSER_TOKENS.inc_commands(original_tokens, stage="original")
+           + RESUME_CONDENSER_TOKENS.inc_commands(condensed_tokens, stage="condensed"))
+
+
+def render_metrics():
+    pipe = get_redis().pipeline(transaction=False)
+    for metric in _registry:
+        pipe.hgetall(metric.key)
+    lines = []
+    for metric, fields in zip(_registry, pipe.execute()):
+        lines += metric.render({field.decode(): value.decode() for field, value in fields.items()})
+    return "\n".join(lines) + "\n"
+
+
+def scrape_allowed(request):
+    """
+    With METRICS_AUTH_TOKEN set, scrapes must send `Authorization: Bearer <token>`. Without it only
+    staff users are let in, or anyone when DEBUG is on.
+    """
+    if settings.METRICS_AUTH_TOKEN:
+        expected = f"Bearer {settings.METRICS_AUTH_TOKEN}"
+        return hmac.compare_digest(request.headers.get("Authorization", "").encode(), expected.encode())
+    user = getattr(request, "user", None)
+    return settings.DEBUG or bool(user and user.is_staff)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, see scrape_allowed()."""
+    if not scrape_allowed(request):
+        return HttpResponse("Unauthorized", status=401, content_type="text/plain")
+    try:
+        body = render_metrics()
+    except redis.RedisError as e:
+        return HttpResponse(f"Metrics store unavailable: {str(e)}", status=503, content_type="text/plain")
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# Celery: queue wait is measured from a publish timestamp carried in the message headers
+_task_started = {}
+_task_started_lock = threading.Lock()
+
+
+@signals.before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault("published_at", time.time())
+
+
+@signals.task_prerun.connect
+def task_started(task_id=None, task=None, **kwargs):
+    with _task_started_lock:
+        _task_started[task_id] = time.perf_counter()
+    published_at = task.request.get("published_at") if task is not None else None
+    if published_at:
+        TASK_QUEUE_WAIT.observe(max(0.0, time.time() - float(published_at)), task=task.name)
+
+
+@signals.task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    with _task_started_lock:
+        started = _task_started.pop(task_id, None)
+    if started is not None and task is not None:
+        TASK_DURATION.observe(time.perf_counter() - started, task=task.name, state=state or "UNKNOWN")
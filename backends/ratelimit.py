@@ -0,0 +1,179 @@
+"""
+Distributed requests-per-minute / tokens-per-minute limiter for LLM calls.
+
+Celery workers and gunicorn threads all draw from the same per-model token buckets in Redis, so
+their combined throughput stays under the provider limits (LLM_RATE_LIMITS, scaled by
+LLM_RATE_LIMIT_HEADROOM) instead of bursting into 429s. A call reserves one request plus its
+estimated tokens up front and settles the difference once the API reports the real usage.
+Models without configured limits, or an unreachable Redis, are never throttled.
+
+    waited = acquire("gpt-5", tokens=1200)           # blocks until both buckets allow it
+    await acquire_async("gpt-5", tokens=1200)        # same, without blocking the event loop
+"""
+import asyncio
+import random
+import time
+
+import redis
+from django.conf import settings
+
+# KEYS: request bucket, token bucket. ARGV: requests/min, tokens/min, tokens wanted.
+# Both buckets refill continuously; either both are debited or neither is. Returns 0 when granted,
+# otherwise the seconds (as a string) until the request could be granted.
+ACQUIRE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local wait = 0
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i])
+    local wanted = math.min(i == 1 and 1 or tonumber(ARGV[3]), capacity)
+    local state = redis.call('HMGET', key, 'level', 'ts')
+    local level = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    level = math.min(capacity, level + (now - ts) * capacity / 60)
+    levels[i] = level
+    if level < wanted then
+        wait = math.max(wait, (wanted - level) * 60 / capacity)
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local wanted = i == 1 and 1 or tonumber(ARGV[3])
+    redis.call('HSET', key, 'level', levels[i] - wanted, 'ts', now)
+    redis.call('EXPIRE', key, 120)
+end
+return 0
+"""
+
+# KEYS: token bucket. ARGV: tokens/min, tokens to give back (negative to charge more).
+SETTLE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local capacity = tonumber(ARGV[1])
+local state = redis.call('HMGET', KEYS[1], 'level', 'ts')
+local level = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+level = math.min(capacity, level + (now - ts) * capacity / 60 + tonumber(ARGV[2]))
+redis.call('HSET', KEYS[1], 'level', level, 'ts', now)
+redis.call('EXPIRE', KEYS[1], 120)
+return 0
+"""
+
+
+class RateLimitTimeout(Exception):
+    """The rate limiter could not grant a call within the allowed wait."""
+
+
+_redis = None
+_scripts = {}
+
+
+def get_redis():
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.LLM_RATE_LIMIT_REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+    return _redis
+
+
+def _script(source):
+    if source not in _scripts:
+        _scripts[source] = get_redis().register_script(source)
+    return _scripts[source]
+
+
+def model_limits(model):
+    """(requests/min, tokens/min) for the model after headroom, matched by longest name prefix; None when unlimited."""
+    if not settings.LLM_RATE_LIMIT_ENABLED:
+        return None
+    for prefix in sorted(settings.LLM_RATE_LIMITS, key=len, reverse=True):
+        if model.startswith(prefix):
+            limits = settings.LLM_RATE_LIMITS[prefix]
+            headroom = settings.LLM_RATE_LIMIT_HEADROOM
+            return max(1, int(limits["rpm"] * headroom)), max(1, int(limits["tpm"] * headroom))
+    return None
+
+
+def _keys(model):
+    prefix = settings.LLM_RATE_LIMIT_KEY_PREFIX
+    return [f"{prefix}:{model}:requests", f"{prefix}:{model}:tokens"]
+
+
+def try_acquire(model, tokens=0):
+    """One attempt. Returns 0 when granted, otherwise the seconds to wait before trying again."""
+    limits = model_limits(model)
+    if limits is None:
+        return 0
+    try:
+        return float(_script(ACQUIRE_SCRIPT)(keys=_keys(model), args=[limits[0], limits[1], max(0, int(tokens))]))
+    except redis.RedisError as e:
+        print(f"Rate limiter unavailable, not throttling: {str(e)}")
+        return 0
+
+
+def _next_sleep(wait, deadline):
+    # Jitter spreads out callers that were told to wait the same amount
+    delay = min(wait, 5.0) * random.uniform(1.0, 1.2)
+    if deadline is not None and time.monotonic() + delay > deadline:
+        raise RateLimitTimeout(f"Rate limit wait of {wait:.1f}s exceeds the timeout")
+    return delay
+
+
+def acquire(model, tokens=0, timeout=None):
+    """Blocks until one request and `tokens` tokens of `model`'s budget are granted. Returns the seconds waited."""
+    timeout = settings.LLM_RATE_LIMIT_TIMEOUT if timeout is None else timeout
+    started = time.monotonic()
+    deadline = started + timeout if timeout else None
+    while True:
+        wait = try_acquire(model, tokens)
+        if not wait:
+            return time.monotonic() - started
+        time.sleep(_next_sleep(wait, deadline))
+
+
+async def acquire_async(model, tokens=0, timeout=None):
+    """acquire() for asyncio code: waits with asyncio.sleep instead of blocking the event loop."""
+    timeout = settings.LLM_RATE_LIMIT_TIMEOUT if timeout is None else timeout
+    started = time.monotonic()
+    deadline = started + timeout if timeout else None
+    while True:
+        wait = try_acquire(model, tokens)
+        if not wait:
+            return time.monotonic() - started
+        await asyncio.sleep(_next_sleep(wait, deadline))
+
+
+def settle(model, reserved_tokens, used_tokens):
+    """Gives back over-reserved tokens (or charges the excess) once the API reported the real usage."""
+    limits = model_limits(model)
+    if limits is None or used_tokens == reserved_tokens:
+        return
+    try:
+        _script(SETTLE_SCRIPT)(keys=_keys(model)[1:], args=[limits[1], int(reserved_tokens) - int(used_tokens)])
+    except redis.RedisError as e:
+        print(f"Rate limiter unavailable, usage not settled: {str(e)}")
+
+
+def _text_length(value):
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_text_length(v) for k, v in value.items() if k in ("content", "text", "input"))
+    if isinstance(value, (list, tuple)):
+        return sum(_text_length(v) for v in value)
+    return 0
+
+
+def estimate_request_tokens(kwargs):
+    """
+    Rough token reservation for an OpenAI request (~4 characters per token of prompt, plus the
+    output cap or LLM_RATE_LIMIT_OUTPUT_TOKENS); the real usage is settled afterwards.
+    """
+    prompt = kwargs.get("messages") or kwargs.get("input") or ""
+    prompt_tokens = _text_length(prompt) // 4 + 1
+    if str(kwargs.get("model", "")).startswith("text-embedding"):
+        return prompt_tokens
+    output_cap = kwargs.get("max_completion_tokens") or kwargs.get("max_tokens") or kwargs.get("max_output_tokens")
+    return prompt_tokens + (output_cap or settings.LLM_RATE_LIMIT_OUTPUT_TOKENS)
@@ -1,4 +1,5 @@
 from pathlib import Path
+import json
 import os
 from dotenv import load_dotenv
 
@@ -22,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     "corsheaders",
     "django_rest_passwordreset",
@@ -37,6 +39,8 @@ AWS_SECRET_ACCESS_KEY = os.environ['AWS_SECRET_ACCESS_KEY']
 AWS_STORAGE_BUCKET_NAME = os.environ['AWS_STORAGE_BUCKET_NAME']
 DEFAULT_FILE_STORAGE = "backends.storage.MediaStorage"
 AWS_S3_REGION_NAME= "eu-north-1"
+# Point at a local S3 stand-in (MinIO, moto server) in development and tests
+AWS_S3_ENDPOINT_URL = os.getenv('AWS_S3_ENDPOINT_URL')
 SESSION_SAVE_EVERY_REQUEST = True
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
@@ -257,4 +261,122 @@ CELERY_TASK_SOFT_TIME_LIMIT = 25 * 60  # 25 minutes
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_WORKER_CONCURRENCY = 4
 CELERY_TASK_ALWAYS_EAGER = False
-CELERY_TASK_EAGER_PROPAGATES = True
\ No newline at end of file
+CELERY_TASK_EAGER_PROPAGATES = True
+
+# Candidate Ranking Configuration
+# Ranking cascade: BM25 over the skill index orders the whole pool in-process, the cheap screening
+# model scores the top RANKING_SCREEN_TOP_N (0 disables screening) and only the best
+# RANKING_SHORTLIST_SIZE are scored by RANKING_MODEL and stored as the job's ranking
+RANKING_MODEL = os.getenv('RANKING_MODEL', 'gpt-5')
+RANKING_SHORTLIST_SIZE = int(os.getenv('RANKING_SHORTLIST_SIZE', 5))
+RANKING_SCREEN_MODEL = os.getenv('RANKING_SCREEN_MODEL', 'gpt-4o-mini')
+RANKING_SCREEN_TOP_N = int(os.getenv('RANKING_SCREEN_TOP_N', 40))
+RANKING_SCREEN_MODE = os.getenv('RANKING_SCREEN_MODE', 'batched')
+# Max LLM scoring calls in flight per ranking run
+RANKING_MAX_CONCURRENCY = int(os.getenv('RANKING_MAX_CONCURRENCY', 8))
+# "single" = one prompt per candidate, "batched" = listwise prompts sharing one copy of the job description
+RANKING_SCORING_MODE = os.getenv('RANKING_SCORING_MODE', 'single')
+# Input-token budget (tiktoken) and candidate cap for one listwise prompt
+RANKING_BATCH_TOKEN_BUDGET = int(os.getenv('RANKING_BATCH_TOKEN_BUDGET', 16000))
+RANKING_BATCH_MAX_CANDIDATES = int(os.getenv('RANKING_BATCH_MAX_CANDIDATES', 8))
+# Shortlists larger than this are scored in chunks of this size by parallel Celery subtasks (0, the
+# default, disables fan-out). One worker already scores RANKING_MAX_CONCURRENCY candidates at a time,
+# so only enable it for shortlists several times that size (RANKING_SHORTLIST_SIZE in the hundreds),
+# with a chunk size well above RANKING_MAX_CONCURRENCY, e.g. 50. Each chunk costs broker round trips
+# and a worker slot; in 'batched' scoring mode it also adds one prompt.
+RANKING_FANOUT_CHUNK_SIZE = int(os.getenv('RANKING_FANOUT_CHUNK_SIZE', 0))
+# Rank-on-write (main.reverse_matching): candidates matched against the ranked jobs per task, and
+# the most jobs one candidate is scored against by RANKING_MODEL (its best placed ones by BM25)
+REVERSE_MATCH_CHUNK_SIZE = int(os.getenv('REVERSE_MATCH_CHUNK_SIZE', 100))
+REVERSE_MATCH_MAX_JOBS = int(os.getenv('REVERSE_MATCH_MAX_JOBS', 10))
+
+# Candidate embeddings used to prefilter the ranking pool.
+# Set CANDIDATE_EMBEDDER_BACKEND=candidates.embeddings.HashingEmbedder to run fully offline.
+CANDIDATE_EMBEDDER = {
+    'BACKEND': os.getenv('CANDIDATE_EMBEDDER_BACKEND', 'candidates.embeddings.OpenAIEmbedder'),
+    'OPTIONS': {
+        'dimensions': int(os.getenv('CANDIDATE_EMBEDDING_DIMENSIONS', 512)),
+    },
+}
+# Rows fetched per round trip when streaming the candidate table into the in-memory ranking indexes
+CANDIDATE_SCAN_CHUNK_SIZE = int(os.getenv('CANDIDATE_SCAN_CHUNK_SIZE', 2000))
+# Incremental syncs of those indexes re-read rows updated this many seconds before the last one seen,
+# since updated_at is set before commit and a slow transaction can land with an older timestamp.
+# Keep it above the longest transaction that writes candidate profiles or embeddings
+CANDIDATE_SYNC_OVERLAP_SECONDS = int(os.getenv('CANDIDATE_SYNC_OVERLAP_SECONDS', 300))
+# Candidates kept by the embedding prefilter before heuristic scoring
+RANKING_PREFILTER_TOP_N = int(os.getenv('RANKING_PREFILTER_TOP_N', 200))
+# How long LLM skill-synonym expansions stay cached (per skill and per skill set)
+SKILL_EXPANSION_CACHE_TTL = int(os.getenv('SKILL_EXPANSION_CACHE_TTL', 60 * 60 * 24 * 7))
+# How long per-(job, resume) LLM match scores are reused across re-ranks
+RANKING_SCORE_CACHE_TTL = int(os.getenv('RANKING_SCORE_CACHE_TTL', 60 * 60 * 24 * 30))
+
+# Prometheus metrics (LLM calls, tokens, cost, Celery task latency), aggregated in Redis so every
+# gunicorn and Celery process feeds one registry; scraped at /metrics/
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_REDIS_URL = os.getenv('METRICS_REDIS_URL', 'redis://localhost:6379/2')
+METRICS_KEY_PREFIX = os.getenv('METRICS_KEY_PREFIX', 'enabledtalent:metrics')
+# When set, scrapes must send "Authorization: Bearer <token>". When unset, only staff users can read
+# /metrics/ (anyone with DEBUG on), so set it wherever Prometheus scrapes
+METRICS_AUTH_TOKEN = os.getenv('METRICS_AUTH_TOKEN')
+
+# Shared LLM rate limits: every process draws from the same per-model Redis token buckets.
+# Limits are the provider's per-minute quotas (longest model-name prefix wins; unlisted models are
+# not throttled), override with a JSON object in LLM_RATE_LIMITS.
+LLM_RATE_LIMIT_ENABLED = os.getenv('LLM_RATE_LIMIT_ENABLED', 'True') == 'True'
+LLM_RATE_LIMIT_REDIS_URL = os.getenv('LLM_RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/2')
+LLM_RATE_LIMIT_KEY_PREFIX = os.getenv('LLM_RATE_LIMIT_KEY_PREFIX', 'enabledtalent:ratelimit')
+LLM_RATE_LIMITS = json.loads(os.getenv('LLM_RATE_LIMITS', 'null')) or {
+    'gpt-5': {'rpm': 500, 'tpm': 500_000},
+    'gpt-4o-mini': {'rpm': 500, 'tpm': 200_000},
+    'gpt-4o': {'rpm': 500, 'tpm': 30_000},
+    'text-embedding-3': {'rpm': 3_000, 'tpm': 1_000_000},
+}
+# Fraction of the provider limits actually used, so we stay just under them
+LLM_RATE_LIMIT_HEADROOM = float(os.getenv('LLM_RATE_LIMIT_HEADROOM', 0.9))
+# Output tokens reserved per call when the request sets no cap (settled against the real usage)
+LLM_RATE_LIMIT_OUTPUT_TOKENS = int(os.getenv('LLM_RATE_LIMIT_OUTPUT_TOKENS', 1000))
+# Longest a call waits for the limiter before raising RateLimitTimeout (0 waits forever)
+LLM_RATE_LIMIT_TIMEOUT = int(os.getenv('LLM_RATE_LIMIT_TIMEOUT', 300))
+
+# Transient LLM failures (429, 5xx, timeouts) are retried per call with full-jitter exponential backoff
+LLM_CALL_MAX_RETRIES = int(os.getenv('LLM_CALL_MAX_RETRIES', 3))
+LLM_CALL_RETRY_BASE_DELAY = float(os.getenv('LLM_CALL_RETRY_BASE_DELAY', 1))
+LLM_CALL_RETRY_MAX_DELAY = float(os.getenv('LLM_CALL_RETRY_MAX_DELAY', 30))
+
+# tiktoken budget of the resume text sent to the parse model; the condenser keeps the sections
+# ResumeData needs (contact, skills, experience, education first) within it. The default matches
+# what the old 10,000-character cut sent (~2.5k tokens), so long resumes lose nothing against it
+RESUME_TOKEN_BUDGET = int(os.getenv('RESUME_TOKEN_BUDGET', 2500))
+# Resume PDFs with at least this many pages are text-extracted in page ranges by a process pool (0 disables)
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 24))
+PDF_EXTRACT_CHUNK_PAGES = int(os.getenv('PDF_EXTRACT_CHUNK_PAGES', 8))
+# Extraction pool size (0 = one process per CPU)
+PDF_EXTRACT_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', 0))
+
+# Bulk resume imports (candidates.bulk_ingest): resumes claimed per batch, and batches of one import
+# processed at the same time. Point BULK_IMPORT_QUEUE at a dedicated worker to keep imports off the
+# shared queue entirely.
+BULK_IMPORT_BATCH_SIZE = int(os.getenv('BULK_IMPORT_BATCH_SIZE', 50))
+BULK_IMPORT_MAX_CONCURRENCY = int(os.getenv('BULK_IMPORT_MAX_CONCURRENCY', 2))
+BULK_IMPORT_QUEUE = os.getenv('BULK_IMPORT_QUEUE', 'celery')
+# Resumes parsed per LLM call (1 disables grouping) and grouped calls in flight per batch
+BULK_IMPORT_LLM_GROUP_SIZE = int(os.getenv('BULK_IMPORT_LLM_GROUP_SIZE', 4))
+BULK_IMPORT_LLM_CONCURRENCY = int(os.getenv('BULK_IMPORT_LLM_CONCURRENCY', 4))
+# Threads copying source files into storage / downloading resumes from it
+BULK_IMPORT_FETCH_THREADS = int(os.getenv('BULK_IMPORT_FETCH_THREADS', 8))
+
+# Offline Batch API mode (backends.batch) for the resume parse backlog and overnight ranking:
+# requests are written as JSONL files under LLM_BATCH_DIR and answered within the completion window
+# at batch prices. LLM_BATCH_BACKEND=backends.batch.LocalFileBatchBackend answers batches locally
+# through the configured OpenAI-compatible endpoint instead (e.g. benchmarks.fake_openai).
+LLM_BATCH = {
+    'BACKEND': os.getenv('LLM_BATCH_BACKEND', 'backends.batch.OpenAIBatchBackend'),
+    'OPTIONS': {
+        'directory': os.getenv('LLM_BATCH_DIR', str(BASE_DIR / 'llm_batches')),
+        'completion_window': os.getenv('LLM_BATCH_COMPLETION_WINDOW', '24h'),
+    },
+}
+# Requests per batch (the Batch API accepts up to 50,000) and seconds between polls of a submitted batch
+LLM_BATCH_MAX_REQUESTS = int(os.getenv('LLM_BATCH_MAX_REQUESTS', 5000))
+LLM_BATCH_POLL_INTERVAL = int(os.getenv('LLM_BATCH_POLL_INTERVAL', 300))
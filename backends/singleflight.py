@@ -0,0 +1,32 @@
+"""
+Idempotent Celery task submission backed by the object's own status row.
+"""
+import uuid
+
+from django.utils import timezone
+
+
+def submit_once(queryset, pk, task, status_field, task_id_field, in_flight_status, reset_status, args=()):
+    """
+    Enqueues `task` for the row `pk` unless one is already in flight. Returns (task_id, started).
+
+    The row is claimed with a single compare-and-set UPDATE (status -> `in_flight_status`, only if it
+    isn't already) that also stores a pre-allocated task id, so of several concurrent submissions exactly
+    one enqueues and the others get the in-flight task id back. If enqueueing fails the row goes back
+    to `reset_status`.
+    """
+    task_id = str(uuid.uuid4())
+    claim = {status_field: in_flight_status, task_id_field: task_id}
+    # update() skips auto_now, but the stuck-task cleanups measure the claim's age with updated_at
+    if any(field.name == 'updated_at' for field in queryset.model._meta.concrete_fields):
+        claim['updated_at'] = timezone.now()
+    claimed = queryset.filter(pk=pk).exclude(**{status_field: in_flight_status}).update(**claim)
+    if not claimed:
+        return queryset.filter(pk=pk).values_list(task_id_field, flat=True).first(), False
+
+    try:
+        task.apply_async(args=args, task_id=task_id)
+    except Exception:
+        queryset.filter(pk=pk, **{task_id_field: task_id}).update(**{status_field: reset_status})
+        raise
+    return task_id, True
@@ -0,0 +1,172 @@
+import os
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+import openai
+import redis
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from . import metrics, ratelimit
+from .batch import LOCAL_BATCH_CALL_SITE, LocalFileBatchBackend, request_line, response_body, write_requests
+
+
+def fake_llm_call(call_site, fn, **body):
+    if body["messages"] == "fail":
+        raise openai.APIConnectionError(request=None)
+    return {"model": body["model"], "echo": body["messages"], "usage": {"prompt_tokens": 3, "completion_tokens": 1}}
+
+
+class LocalFileBatchBackendTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.backend = LocalFileBatchBackend(directory.name, workers=2)
+        self.input_file = os.path.join(directory.name, "input.jsonl")
+
+    def submit(self, *messages):
+        lines = [
+            request_line(f"req-{i}", "/v1/chat/completions", {"model": "gpt-5", "messages": m})
+            for i, m in enumerate(messages)
+        ]
+        write_requests(self.input_file, lines)
+        return self.backend.submit(self.input_file, "/v1/chat/completions", metadata={"run": "1"})
+
+    def test_round_trip(self):
+        batch_id = self.submit("hello", "fail")
+        with mock.patch("backends.batch.llm_call", side_effect=fake_llm_call) as llm_call:
+            state = self.backend.retrieve(batch_id)
+
+        self.assertEqual({call.args[0] for call in llm_call.call_args_list}, {LOCAL_BATCH_CALL_SITE})
+        self.assertEqual((state["status"], state["total"], state["completed"], state["failed"]), ("completed", 2, 1, 1))
+        results = {line["custom_id"]: line for line in self.backend.results(batch_id)}
+        self.assertEqual(response_body(results["req-0"])[0]["echo"], "hello")
+        body, error = response_body(results["req-1"])
+        self.assertIsNone(body)
+        self.assertTrue(error)
+
+    def test_answered_once(self):
+        batch_id = self.submit("hello")
+        with mock.patch("backends.batch.llm_call", side_effect=fake_llm_call) as llm_call:
+            self.backend.retrieve(batch_id)
+            state = self.backend.retrieve(batch_id)
+        self.assertEqual(llm_call.call_count, 1)
+        self.assertEqual(state["status"], "completed")
+        self.assertEqual(len(self.backend.results(batch_id)), 1)
+
+    def test_claimed_by_another_poller(self):
+        batch_id = self.submit("hello")
+        self.assertTrue(self.backend.claim(batch_id))
+        self.assertFalse(self.backend.claim(batch_id))
+        with mock.patch("backends.batch.llm_call", side_effect=fake_llm_call) as llm_call:
+            state = self.backend.retrieve(batch_id)
+        self.assertEqual(state["status"], "in_progress")
+        llm_call.assert_not_called()
+
+    def test_cancelled_before_answered(self):
+        batch_id = self.submit("hello")
+        self.backend.cancel(batch_id)
+        with mock.patch("backends.batch.llm_call", side_effect=fake_llm_call) as llm_call:
+            state = self.backend.retrieve(batch_id)
+        self.assertEqual(state["status"], "cancelled")
+        llm_call.assert_not_called()
+        self.assertEqual(self.backend.results(batch_id), [])
+
+
+class MetricsViewTests(SimpleTestCase):
+
+    def setUp(self):
+        self.enterContext(mock.patch.object(metrics, 'render_metrics', return_value="llm_calls_total 1\n"))
+
+    def scrape(self, user=None, **headers):
+        request = RequestFactory().get("/metrics/", headers=headers)
+        request.user = user or AnonymousUser()
+        return metrics.metrics_view(request).status_code
+
+    @override_settings(METRICS_AUTH_TOKEN="secret")
+    def test_token(self):
+        self.assertEqual(self.scrape(), 401)
+        self.assertEqual(self.scrape(Authorization="Bearer wrong"), 401)
+        self.assertEqual(self.scrape(mock.Mock(is_staff=True)), 401)
+        self.assertEqual(self.scrape(Authorization="Bearer secret"), 200)
+
+    @override_settings(METRICS_AUTH_TOKEN=None, DEBUG=False)
+    def test_without_a_token_only_staff(self):
+        self.assertEqual(self.scrape(), 401)
+        self.assertEqual(self.scrape(mock.Mock(is_staff=False)), 401)
+        self.assertEqual(self.scrape(mock.Mock(is_staff=True)), 200)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.scrape(), 200)
+
+
+def redis_available():
+    try:
+        return ratelimit.get_redis().ping()
+    except redis.RedisError:
+        return False
+
+
+RATE_LIMITS = {'gpt-5': {'rpm': 10, 'tpm': 1000}, 'gpt-5-mini': {'rpm': 100, 'tpm': 100_000}}
+
+
+@override_settings(LLM_RATE_LIMIT_ENABLED=True, LLM_RATE_LIMITS=RATE_LIMITS, LLM_RATE_LIMIT_HEADROOM=1.0)
+class RateLimitTests(SimpleTestCase):
+
+    def test_model_limits(self):
+        self.assertEqual(ratelimit.model_limits('gpt-5-2025-08-07'), (10, 1000))
+        self.assertEqual(ratelimit.model_limits('gpt-5-mini'), (100, 100_000))
+        self.assertIsNone(ratelimit.model_limits('o3'))
+        with override_settings(LLM_RATE_LIMIT_HEADROOM=0.5):
+            self.assertEqual(ratelimit.model_limits('gpt-5'), (5, 500))
+        with override_settings(LLM_RATE_LIMIT_ENABLED=False):
+            self.assertIsNone(ratelimit.model_limits('gpt-5'))
+
+    def test_acquire_waits_until_granted(self):
+        with mock.patch.object(ratelimit, 'try_acquire', side_effect=[2.0, 0.5, 0]) as try_acquire, \
+                mock.patch.object(ratelimit.time, 'sleep') as sleep:
+            ratelimit.acquire('gpt-5', tokens=100, timeout=0)
+        self.assertEqual(try_acquire.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertGreaterEqual(sleep.call_args_list[0].args[0], 2.0)
+
+    def test_acquire_timeout(self):
+        with mock.patch.object(ratelimit, 'try_acquire', return_value=30.0), mock.patch.object(ratelimit.time, 'sleep'):
+            with self.assertRaises(ratelimit.RateLimitTimeout):
+                ratelimit.acquire('gpt-5', tokens=100, timeout=10)
+
+    def test_unreachable_redis_does_not_throttle(self):
+        script = mock.Mock(side_effect=redis.ConnectionError("refused"))
+        with mock.patch.object(ratelimit, '_script', return_value=script):
+            self.assertEqual(ratelimit.try_acquire('gpt-5', tokens=100), 0)
+            ratelimit.settle('gpt-5', 100, 50)
+        self.assertEqual(script.call_count, 2)
+
+
+@unittest.skipUnless(redis_available(), "needs the rate limiter's Redis")
+@override_settings(LLM_RATE_LIMIT_ENABLED=True, LLM_RATE_LIMITS=RATE_LIMITS, LLM_RATE_LIMIT_HEADROOM=1.0)
+class TokenBucketTests(SimpleTestCase):
+
+    def setUp(self):
+        prefix = f"test-ratelimit:{uuid.uuid4().hex}"
+        self.enterContext(override_settings(LLM_RATE_LIMIT_KEY_PREFIX=prefix))
+        self.addCleanup(lambda: [ratelimit.get_redis().delete(key) for key in ratelimit._keys('gpt-5')])
+
+    def test_request_bucket(self):
+        for _ in range(10):
+            self.assertEqual(ratelimit.try_acquire('gpt-5'), 0)
+        # Empty: the next request refills in 60s / 10 rpm
+        self.assertAlmostEqual(ratelimit.try_acquire('gpt-5'), 6, delta=0.5)
+
+    def test_token_bucket_is_not_debited_when_refused(self):
+        self.assertEqual(ratelimit.try_acquire('gpt-5', tokens=900), 0)
+        self.assertGreater(ratelimit.try_acquire('gpt-5', tokens=900), 40)
+        # The refused call took nothing, so a smaller one still fits
+        self.assertEqual(ratelimit.try_acquire('gpt-5', tokens=50), 0)
+
+    def test_settle_gives_back_unused_tokens(self):
+        self.assertEqual(ratelimit.try_acquire('gpt-5', tokens=900), 0)
+        ratelimit.settle('gpt-5', reserved_tokens=900, used_tokens=100)
+        self.assertEqual(ratelimit.try_acquire('gpt-5', tokens=800), 0)
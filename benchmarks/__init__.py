@@ -0,0 +1,19 @@
+"""
+Offline benchmarks for the ranking and resume-parsing hot paths.
+Run from the repository root, e.g. `python -m benchmarks.ranking_modes --dry-run`.
+
+    seed               synthetic candidates / job posts at 1k, 10k or 100k scale
+    fake_openai        local OpenAI stand-in with configurable latency and token counts
+    ranking_pipeline   per-stage wall time, DB time, peak memory and tokens for a full ranking
+    ranking_modes      single vs batched scoring prompt sizes
+    pdf_extraction     resume PDF text extraction: linear join, budget stop and process pool
+    resume_condenser   section-aware token budget vs a fixed character cut: tokens and facts kept
+"""
+import os
+
+
+def setup_django():
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backends.settings')
+    django.setup()
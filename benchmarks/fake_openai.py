@@ -0,0 +1,283 @@
+"""
+Local stand-in for the OpenAI endpoints the app uses, so benchmarks run without network or cost:
+/v1/chat/completions (candidate scoring, single and listwise), /v1/responses (skill expansion,
+single and grouped resume parsing) and /v1/embeddings. Answers are deterministic; latency and token
+counts are configurable.
+
+    python -m benchmarks.fake_openai --port 8765 --latency 0.4
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake python manage.py ...
+
+Token usage is estimated at ~4 characters per token and totalled per endpoint (GET /stats).
+--failure-rate makes that share of POSTs fail with a 429 or 500, to exercise retries.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from .synthetic import synthetic_resume
+
+CANDIDATE_RE = re.compile(r"CANDIDATE (\d+) RESUME:")
+SKILLS_RE = re.compile(r"for each of the given Skills: (.*)$", re.S)
+RESUME_RE = re.compile(r"=== Resume (\d+) ===")
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def stable_int(text):
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'little')
+
+
+def message_text(messages):
+    """Flattens chat `messages` / responses `input` into one string."""
+    if isinstance(messages, str):
+        return messages
+    parts = []
+    for message in messages or []:
+        content = message.get('content') if isinstance(message, dict) else message
+        if isinstance(content, list):
+            content = " ".join(part.get('text', '') for part in content if isinstance(part, dict))
+        parts.append(str(content or ""))
+    return "\n".join(parts)
+
+
+def score_for(key):
+    """Deterministic 0-100 score, so repeated runs rank identically."""
+    return stable_int(key) % 101
+
+
+def chat_content(prompt):
+    reasons = ["Relevant skills", "Comparable experience", "Some gaps in requirements"]
+    candidate_ids = CANDIDATE_RE.findall(prompt)
+    if candidate_ids:
+        return json.dumps({"scores": [
+            {"candidate_id": int(i), "score": score_for(f"{prompt[:2000]}|{i}"), "reasons": reasons} for i in candidate_ids
+        ]})
+    return json.dumps({"score": score_for(prompt), "reasons": reasons})
+
+
+def responses_content(schema_name, prompt):
+    if schema_name == "SkillExpansionOutput":
+        match = SKILLS_RE.search(prompt)
+        skills = [s.strip() for s in match.group(1).split(",") if s.strip()] if match else []
+        return json.dumps({"skills": [
+            {"skill": skill, "keywords": [skill, f"{skill} development", f"{skill} engineering"]} for skill in skills
+        ]})
+    if schema_name == "ResumeData":
+        return json.dumps(synthetic_resume(random.Random(stable_int(prompt))))
+    if schema_name == "ResumeDataBatch":
+        return json.dumps({"resumes": [
+            {"index": int(i), **synthetic_resume(random.Random(stable_int(f"{prompt}|{i}")))} for i in RESUME_RE.findall(prompt)
+        ]})
+    raise ValueError(f"Unsupported structured output format: {schema_name}")
+
+
+def embedding_vector(text, dimensions):
+    rng = np.random.default_rng(stable_int(text))
+    vector = rng.standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, output_tokens=None, failure_rate=0.0):
+        super().__init__(address, FakeOpenAIHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.output_tokens = output_tokens
+        self.failure_rate = failure_rate
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record(self, endpoint, prompt_tokens, completion_tokens):
+        with self.stats_lock:
+            stats = self.stats.setdefault(endpoint, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            stats["requests"] += 1
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+
+    def snapshot(self):
+        with self.stats_lock:
+            return {endpoint: dict(stats) for endpoint, stats in self.stats.items()}
+
+    def sleep(self):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def should_fail(self):
+        if self.failure_rate and random.random() < self.failure_rate:
+            self.record("failures", 0, 0)
+            return True
+        return False
+
+    def completion_tokens(self, content):
+        return self.output_tokens if self.output_tokens is not None else estimate_tokens(content)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_failure(self):
+        if random.random() < 0.5:
+            self.send_json(429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}})
+        else:
+            self.send_json(500, {"error": {"message": "The server had an error processing your request", "type": "server_error"}})
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self.send_json(200, self.server.snapshot())
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        handlers = {
+            "/v1/chat/completions": self.handle_chat_completions,
+            "/v1/responses": self.handle_responses,
+            "/v1/embeddings": self.handle_embeddings,
+        }
+        handler = handlers.get(self.path.split("?")[0].rstrip("/"))
+        if handler is None:
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        try:
+            self.server.sleep()
+            if self.server.should_fail():
+                self.send_failure()
+                return
+            self.send_json(200, handler(body))
+        except ValueError as e:
+            self.send_json(400, {"error": {"message": str(e), "type": "invalid_request_error"}})
+
+    def handle_chat_completions(self, body):
+        prompt = message_text(body.get("messages"))
+        content = chat_content(prompt)
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), self.server.completion_tokens(content)
+        self.server.record("chat.completions", prompt_tokens, completion_tokens)
+        return {
+            "id": f"chatcmpl-{stable_int(prompt):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-5"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def handle_responses(self, body):
+        prompt = message_text(body.get("input"))
+        schema_name = ((body.get("text") or {}).get("format") or {}).get("name")
+        content = responses_content(schema_name, prompt)
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), self.server.completion_tokens(content)
+        self.server.record("responses", prompt_tokens, completion_tokens)
+        return {
+            "id": f"resp_{stable_int(prompt):x}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "status": "completed",
+            "output": [{
+                "type": "message",
+                "id": f"msg_{stable_int(content):x}",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": content, "annotations": []}],
+            }],
+            "parallel_tool_calls": False,
+            "tool_choice": "auto",
+            "tools": [],
+            "text": body.get("text"),
+            "usage": {
+                "input_tokens": prompt_tokens,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens": completion_tokens,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def handle_embeddings(self, body):
+        texts = body.get("input")
+        texts = [texts] if isinstance(texts, str) else texts
+        dimensions = body.get("dimensions") or 1536
+        data = []
+        for index, text in enumerate(texts):
+            vector = embedding_vector(text, dimensions)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        prompt_tokens = sum(estimate_tokens(text) for text in texts)
+        self.server.record("embeddings", prompt_tokens, 0)
+        return {
+            "object": "list",
+            "model": body.get("model"),
+            "data": data,
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        }
+
+
+def start_server(host="127.0.0.1", port=0, latency=0.0, jitter=0.0, output_tokens=None, failure_rate=0.0):
+    """Starts the fake API on a background thread (port 0 picks a free port). Returns the server."""
+    server = FakeOpenAIServer((host, port), latency=latency, jitter=jitter, output_tokens=output_tokens,
+                              failure_rate=failure_rate)
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra random delay of up to this many seconds")
+    parser.add_argument('--output-tokens', type=int, default=None, help="Fixed completion token count to report")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of requests answered with a 429/500")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                              output_tokens=args.output_tokens, failure_rate=args.failure_rate)
+    print(f"Fake OpenAI API listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
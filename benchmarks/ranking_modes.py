@@ -0,0 +1,57 @@
+"""
+Compares single vs batched (listwise) candidate scoring: input tokens and latency per candidate.
+
+    python -m benchmarks.ranking_modes --candidates 40 --dry-run   # token counts only, no API calls
+    python -m benchmarks.ranking_modes --candidates 40             # also times real calls
+
+Without --dry-run, calls go to whatever OPENAI_BASE_URL points at (the real API or benchmarks.fake_openai).
+"""
+import argparse
+import json
+import time
+
+from . import setup_django
+from .synthetic import synthetic_job_description, synthetic_resumes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--candidates', type=int, default=40)
+    parser.add_argument('--dry-run', action='store_true', help="Only count prompt tokens, make no API calls")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    from main import jobpost_candidate_ranker as ranker
+
+    job_description = synthetic_job_description()
+    candidate_data = [
+        {"id": i + 1, "slug": f"candidate-{i + 1}", "resume_data": json.dumps(resume)}
+        for i, resume in enumerate(synthetic_resumes(args.candidates, seed=args.seed))
+    ]
+    encoding = ranker.get_token_encoding()
+
+    single_tokens = sum(
+        ranker.count_prompt_tokens(ranker.build_scoring_prompt(job_description, c), encoding) for c in candidate_data
+    )
+    batches = ranker.pack_batches(job_description, candidate_data, encoding)
+    batched_tokens = sum(
+        ranker.count_prompt_tokens(ranker.build_batch_prompt(job_description, batch), encoding) for batch in batches
+    )
+
+    n = len(candidate_data)
+    print(f"{n} candidates, {len(batches)} batches (budget {ranker.settings.RANKING_BATCH_TOKEN_BUDGET} tokens)")
+    print(f"{'mode':<8} {'calls':>6} {'in tok/cand':>12} {'s/cand':>8} {'$/cand':>9}")
+    for mode, calls, input_tokens in (("single", n, single_tokens), ("batched", len(batches), batched_tokens)):
+        line = f"{mode:<8} {calls:>6} {input_tokens / n:>12.1f}"
+        if not args.dry_run:
+            started = time.perf_counter()
+            _, usage, cost = ranker.rank_candidates_by_match(job_description, candidate_data, mode=mode)
+            elapsed = time.perf_counter() - started
+            line += f" {elapsed / n:>8.3f} {cost / n:>9.5f}"
+        print(line)
+    print(f"batched saves {100 * (1 - batched_tokens / single_tokens):.1f}% of input tokens")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+End-to-end ranking benchmark against the fake OpenAI API: wall time, DB time, peak Python memory
+and tokens for every stage of ranking_algo, with no network and no API cost.
+
+    python -m benchmarks.ranking_pipeline --scale 10k --latency 0.3
+    python -m benchmarks.ranking_pipeline --job-id 42 --runs 2     # second run shows warm caches
+
+Needs the configured database (seeded on demand via benchmarks.seed). The cache defaults to an
+in-process locmem cache so Redis is not required; pass --cache configured to use the real one.
+Memory is traced with tracemalloc, which slows the Python-heavy stages down somewhat.
+"""
+import argparse
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from . import setup_django
+from .fake_openai import start_server
+from .seed import BENCH_EMAIL_DOMAIN, SCALES, seed_candidates, seed_job_posts
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class DatabaseTimer:
+    """execute_wrapper that totals query count and time on the current connection."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+class StageRecorder:
+    def __init__(self, server):
+        self.server = server
+        self.stages = []
+
+    def _tokens(self):
+        stats = self.server.snapshot()
+        return (sum(s["prompt_tokens"] for s in stats.values()),
+                sum(s["completion_tokens"] for s in stats.values()),
+                sum(s["requests"] for s in stats.values()))
+
+    @contextmanager
+    def stage(self, name):
+        from django.db import connection
+
+        timer = DatabaseTimer()
+        tokens_before = self._tokens()
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            yield
+        wall = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] - memory_before
+        tokens_after = self._tokens()
+        self.stages.append({
+            "stage": name,
+            "wall": wall,
+            "db": timer.seconds,
+            "queries": timer.queries,
+            "peak_mb": peak / 2**20,
+            "input_tokens": tokens_after[0] - tokens_before[0],
+            "output_tokens": tokens_after[1] - tokens_before[1],
+            "api_calls": tokens_after[2] - tokens_before[2],
+        })
+
+    def report(self):
+        print(f"{'stage':<24} {'wall s':>8} {'db s':>8} {'queries':>8} {'peak MB':>8} {'calls':>6} {'in tok':>9} {'out tok':>8}")
+        for s in self.stages:
+            print(f"{s['stage']:<24} {s['wall']:>8.3f} {s['db']:>8.3f} {s['queries']:>8} {s['peak_mb']:>8.1f} "
+                  f"{s['api_calls']:>6} {s['input_tokens']:>9} {s['output_tokens']:>8}")
+
+
+def ensure_seeded(scale, seed):
+    from candidates.models import CandidateProfile
+    from main.models import JobPost
+
+    wanted = SCALES[scale]
+    existing = CandidateProfile.objects.filter(user__email__endswith=f"@{BENCH_EMAIL_DOMAIN}").count()
+    if existing < wanted:
+        seed_candidates(wanted - existing, seed=seed + existing)
+    jobs = JobPost.objects.filter(user__email__endswith=f"@{BENCH_EMAIL_DOMAIN}").order_by('id')
+    return list(jobs) or seed_job_posts(seed=seed)
+
+
+def run(job_id, recorder, embed):
+    from candidates.embeddings import embed_candidates, get_embedding_store
+    from candidates.features import get_feature_matrix
+    from candidates.models import CandidateProfile
+    from main.jobpost_candidate_ranker import prepare_ranking, save_ranking_result, score_shortlist, with_final_tier
+    from main.models import JobPost
+
+    with recorder.stage("feature matrix refresh"):
+        get_feature_matrix()
+
+    if embed:
+        with recorder.stage("embed missing candidates"):
+            missing = CandidateProfile.objects.filter(resume_data__isnull=False, embedding__isnull=True).only('id', 'resume_data')
+            batch = []
+            for profile in missing.iterator(chunk_size=1000):
+                batch.append(profile)
+                if len(batch) == 1000:
+                    embed_candidates(batch)
+                    batch = []
+            embed_candidates(batch)
+
+    with recorder.stage("embedding store refresh"):
+        get_embedding_store()
+
+    with recorder.stage("prepare + screen"):
+        job_query, job_description, selected_ids, cascade = prepare_ranking(job_id)
+
+    started_at = time.time()
+    with recorder.stage(f"score shortlist ({len(selected_ids)})"):
+        ranked_candidates, total_tokens, total_cost = score_shortlist(job_description, selected_ids)
+    cascade = with_final_tier(cascade, ranked_candidates, total_tokens, total_cost, started_at)
+
+    with recorder.stage("save ranking"):
+        save_ranking_result(JobPost.objects.get(id=job_id), ranked_candidates, total_tokens, total_cost, cascade)
+
+    for tier in cascade:
+        print(f"  tier {tier['tier']:<8} {tier['considered']:>7} -> {tier['kept']:<5} cutoff {tier['cutoff_score']}  "
+              f"{tier['seconds']:.3f}s  ${tier['cost']:.4f}")
+    return sum(tier["cost"] for tier in cascade)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=SCALES, default="1k", help="Seed up to this many candidates first")
+    parser.add_argument('--job-id', type=int, default=None, help="Rank this job (default: first seeded job)")
+    parser.add_argument('--runs', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.2, help="Fake API latency per request, seconds")
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--output-tokens', type=int, default=None)
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of fake API calls failing with 429/500")
+    parser.add_argument('--cache', choices=["locmem", "configured"], default="locmem")
+    parser.add_argument('--skip-embed', action='store_true', help="Don't backfill missing candidate embeddings")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # The OpenAI clients are created at import time, so point them at the fake API before Django loads the apps
+    server = start_server(latency=args.latency, jitter=args.jitter, output_tokens=args.output_tokens,
+                          failure_rate=args.failure_rate)
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["OPENAI_API_KEY"] = "fake-key"
+    setup_django()
+
+    from django.test import override_settings
+
+    with override_settings(**({"CACHES": LOCMEM_CACHES} if args.cache == "locmem" else {})):
+        jobs = ensure_seeded(args.scale, args.seed)
+        job_id = args.job_id or jobs[0].id
+
+        tracemalloc.start()
+        for run_number in range(1, args.runs + 1):
+            recorder = StageRecorder(server)
+            started = time.perf_counter()
+            cost = run(job_id, recorder, embed=not args.skip_embed)
+            print(f"\nRun {run_number}: job {job_id}, {time.perf_counter() - started:.2f}s total, estimated cost ${cost:.4f}")
+            recorder.report()
+        tracemalloc.stop()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""
+Resume condenser vs the old `text[:10000]` cut: prompt tokens per document and, per ResumeData
+field (email, phone, skills, employers, job titles, degrees), how many values survive.
+
+    python -m benchmarks.resume_condenser --resumes 200 --pages 1 2 4 8
+    python -m benchmarks.resume_condenser --budget 2500
+    python -m benchmarks.resume_condenser --pdfs ~/resumes --limit 50
+
+Synthetic resumes are rendered as PDF-extracted text would look: repeated page headers and footers,
+page numbers, layout whitespace, and long experience, projects and interests sections in random
+order; a field's share is the share of its values found in the prompt text.
+
+With --pdfs, real resume PDFs are parsed three times with PARSE_MODEL (3 calls per resume, needs the
+OpenAI API): from the full text (the reference), from the old cut and from the condensed text; a
+field's share is the share of the reference's values the other parse also extracted.
+"""
+import argparse
+import random
+
+from . import setup_django
+from .synthetic import DUTIES, synthetic_resume
+
+OLD_CHAR_LIMIT = 10000
+FILLER = ("Hiking", "Chess club organiser", "Amateur photography", "Marathon running", "Community garden volunteer")
+
+
+def render_resume_text(resume, rng, pages):
+    """Plain text of `resume` spread over about `pages` pages, with the noise PDF extraction brings."""
+    person = resume["personal_info"]
+    skills = [skill["name"] for skill in resume["skills"]]
+
+    experience = ["WORK EXPERIENCE"]
+    for job in resume["work_experience"]:
+        experience += [f"{job['job_title']}    {job['company_name']}", f"   {job['duration']}   "]
+        duties = job["key_responsbilities"] + [
+            rng.choice(DUTIES).format(skill=rng.choice(skills), n=rng.randint(2, 90)) for _ in range(6 * pages)
+        ]
+        experience += [f"•  {duty}" for duty in duties]
+    sections = {
+        "summary": ["Professional Summary", " ".join(
+            f"Experienced professional skilled in {rng.choice(skills)} with a passion for delivering results."
+            for _ in range(4 * pages))],
+        "experience": experience,
+        "education": ["Education"] + [f"{q['title']}  -  {q['description']}" for q in resume["qualifications"]],
+        "projects": ["Projects"] + [f"Project {i}: built a {rng.choice(skills)} tool for internal teams, "
+                                    f"used by {rng.randint(2, 90)} people" for i in range(8 * pages)],
+        "skills": ["Technical Skills", ", ".join(skills)],
+        "interests": ["Hobbies & Interests"] + [rng.choice(FILLER) for _ in range(5 * pages)],
+        "references": ["References", "Available upon request"],
+    }
+    # Skills often come last, which is what a fixed character cut loses first
+    order = ["summary", "experience", "projects", "education", "interests", "skills", "references"]
+    rng.shuffle(order[:4])
+
+    header = [f"{person['name']}", f"{person['email']}  |  {person['contact_no']}  |  {person['linkedin']}", ""]
+    body = [line for name in order for line in sections[name] + [""]]
+    lines_per_page = max(20, len(body) // pages + 1)
+
+    text, page_count = [], -(-len(body) // lines_per_page)
+    for page in range(page_count):
+        text += header if page == 0 else [f"{person['name']} - Curriculum Vitae   {person['email']}", ""]
+        text += body[page * lines_per_page:(page + 1) * lines_per_page]
+        text += ["", f"Page {page + 1} of {page_count}", "\f"]
+    return "\n".join(text)
+
+
+FIELDS = ("email", "phone", "skills", "employers", "titles", "degrees")
+
+
+def resume_fields(resume):
+    """The values of each benchmarked field of a ResumeData dict (lowercased, without '-' placeholders)."""
+    person = resume["personal_info"]
+    values = {
+        "email": [person["email"]],
+        "phone": [person["contact_no"]],
+        "skills": [skill["name"] for skill in resume["skills"]],
+        "employers": [job["company_name"] for job in resume["work_experience"]],
+        "titles": [job["job_title"] for job in resume["work_experience"]],
+        "degrees": [q["title"] for q in resume["qualifications"]],
+    }
+    return {field: {v.strip().lower() for v in found if v and v.strip() not in ("", "-")} for field, found in values.items()}
+
+
+def share(expected, found):
+    """Share of `expected` values in `found` (a set of values, or a text they should appear in); None if none expected."""
+    if not expected:
+        return None
+    if isinstance(found, str):
+        found = found.lower()
+        return sum(1 for value in expected if value in found) / len(expected)
+    return len(expected & found) / len(expected)
+
+
+class FieldShares:
+    """Averages per-field shares over documents (documents without values for a field don't count)."""
+
+    def __init__(self):
+        self.totals = {field: [0.0, 0] for field in FIELDS}
+
+    def add(self, expected, found):
+        for field in FIELDS:
+            value = share(expected[field], found if isinstance(found, str) else found[field])
+            if value is not None:
+                self.totals[field][0] += value
+                self.totals[field][1] += 1
+
+    def row(self):
+        return " ".join(f"{(total / count if count else 0):>9.1%}" for total, count in self.totals.values())
+
+
+def field_header(label):
+    return " ".join(f"{field:>9}" for field in FIELDS) + f"   ({label})"
+
+
+def parse_text(text):
+    """ResumeData (as a dict) the parse model extracts from `text` as given (not condensed again)."""
+    from backends.llm import llm_call
+    from candidates.resume_parser import PARSE_MODEL, ResumeData, client, extraction_input
+
+    response = llm_call("resume_parse_benchmark", client.responses.parse, model=PARSE_MODEL,
+                        input=extraction_input(text), text_format=ResumeData)
+    return response.output_parsed.model_dump()
+
+
+def synthetic_benchmark(args, budget, encoding):
+    from candidates.resume_condenser import condense_resume
+
+    rng = random.Random(args.seed)
+    print(f"Token budget {budget}; old cut {OLD_CHAR_LIMIT} characters; {args.resumes} synthetic resumes per row")
+    for pages in args.pages:
+        raw = cut = condensed_total = 0
+        cut_fields, condensed_fields = FieldShares(), FieldShares()
+        for _ in range(args.resumes):
+            resume = synthetic_resume(rng)
+            text = render_resume_text(resume, rng, pages)
+            expected = resume_fields(resume)
+
+            cut_text = text[:OLD_CHAR_LIMIT]
+            condensed, report = condense_resume(text, budget=budget, encoding=encoding)
+            raw += report["original_tokens"]
+            cut += len(encoding.encode(cut_text))
+            condensed_total += report["condensed_tokens"]
+            cut_fields.add(expected, cut_text)
+            condensed_fields.add(expected, condensed)
+
+        n = args.resumes
+        print(f"\n{pages} page(s): {raw / n:.0f} tokens raw, {cut / n:.0f} cut, {condensed_total / n:.0f} condensed "
+              f"({(cut - condensed_total) / n:+.0f} saved vs the cut)")
+        print(f"{'':>10} {field_header('share of the values in the prompt')}")
+        print(f"{'cut':>10} {cut_fields.row()}")
+        print(f"{'condensed':>10} {condensed_fields.row()}")
+
+
+def pdf_benchmark(args, budget, encoding):
+    from pathlib import Path
+
+    from candidates.resume_condenser import condense_resume
+    from candidates.resume_parser import extract_text_from_bytes
+
+    paths = sorted(Path(args.pdfs).expanduser().rglob("*.pdf"))[:args.limit]
+    print(f"Token budget {budget}; old cut {OLD_CHAR_LIMIT} characters; {len(paths)} resumes from {args.pdfs}")
+    tokens = {"full": 0, "cut": 0, "condensed": 0}
+    cut_fields, condensed_fields = FieldShares(), FieldShares()
+    parsed = 0
+    for path in paths:
+        try:
+            text = extract_text_from_bytes(path.read_bytes())
+        except Exception as e:
+            print(f"{path.name}: unreadable ({e}), skipped")
+            continue
+        if not text.strip():
+            print(f"{path.name}: no text, skipped")
+            continue
+        parsed += 1
+        cut_text = text[:OLD_CHAR_LIMIT]
+        condensed, _ = condense_resume(text, budget=budget, encoding=encoding)
+        for name, prompt in (("full", text), ("cut", cut_text), ("condensed", condensed)):
+            tokens[name] += len(encoding.encode(prompt))
+
+        reference = resume_fields(parse_text(text))
+        cut_fields.add(reference, resume_fields(parse_text(cut_text)))
+        condensed_fields.add(reference, resume_fields(parse_text(condensed)))
+
+    n = max(parsed, 1)
+    print(f"{parsed} resumes parsed. Prompt tokens per resume: {tokens['full'] / n:.0f} full text, {tokens['cut'] / n:.0f} cut, "
+          f"{tokens['condensed'] / n:.0f} condensed")
+    print(f"{'':>10} {field_header('share of the full-text parse extracted')}")
+    print(f"{'cut':>10} {cut_fields.row()}")
+    print(f"{'condensed':>10} {condensed_fields.row()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resumes', type=int, default=100, help="Synthetic resumes per page count")
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--budget', type=int, default=None, help="Token budget (default: RESUME_TOKEN_BUDGET)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--pdfs', default=None, help="Directory of real resume PDFs to parse instead of synthetic resumes")
+    parser.add_argument('--limit', type=int, default=50, help="PDFs parsed with --pdfs")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    from candidates.resume_condenser import get_token_encoding
+
+    encoding = get_token_encoding()
+    budget = args.budget or settings.RESUME_TOKEN_BUDGET
+    if args.pdfs:
+        pdf_benchmark(args, budget, encoding)
+    else:
+        synthetic_benchmark(args, budget, encoding)
+
+
+if __name__ == '__main__':
+    main()
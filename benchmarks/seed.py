@@ -0,0 +1,143 @@
+"""
+Fills the configured database with synthetic candidates and job posts for the benchmarks.
+
+    python -m benchmarks.seed --scale 10k          # 10,000 candidates + job posts
+    python -m benchmarks.seed --clear              # remove everything the benchmarks created
+
+Rows are written with bulk_create (no signals, no parsing/ranking tasks; search documents are built
+inline) and are tagged by the BENCH_EMAIL_DOMAIN of their users so --clear never touches real data.
+"""
+import argparse
+import random
+import time
+
+from . import setup_django
+from .synthetic import SKILL_FAMILIES, synthetic_resume
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+BENCH_EMAIL_DOMAIN = "bench.example.com"
+BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+WORK_MODES = ["Remote", "On-site", "Hybrid"]
+EMPLOYMENT_TYPES = ["Full-time", "Part-time", "Contract", "Internship"]
+
+
+def referral_code(index):
+    """Unique 6-character code per seeded profile ('b' + 5 base36 digits)."""
+    digits = ""
+    for _ in range(5):
+        index, remainder = divmod(index, 36)
+        digits = BASE36[remainder] + digits
+    return "b" + digits
+
+
+def seed_candidates(count, seed=0, batch_size=1000, parsed_ratio=0.9):
+    """
+    Creates `count` users with profiles and candidate profiles. About `parsed_ratio` of them carry
+    resume_data, the rest look freshly uploaded. Returns the number created.
+    """
+    from django.db import transaction
+    from candidates.models import CandidateProfile
+    from candidates.search import update_search_documents
+    from users.models import Profile, User
+
+    rng = random.Random(seed)
+    offset = User.objects.filter(email__endswith=f"@{BENCH_EMAIL_DOMAIN}").count()
+
+    for start in range(0, count, batch_size):
+        indexes = range(offset + start, offset + min(start + batch_size, count))
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(email=f"candidate-{i}@{BENCH_EMAIL_DOMAIN}", password="!", first_name="Bench", last_name=str(i))
+                for i in indexes
+            ])
+            Profile.objects.bulk_create([
+                Profile(user=user, referral_code=referral_code(i)) for i, user in zip(indexes, users)
+            ])
+
+            profiles = []
+            for i, user in zip(indexes, users):
+                parsed = rng.random() < parsed_ratio
+                profiles.append(CandidateProfile(
+                    user=user,
+                    resume_file=f"Candidates-Resume/bench-{i}.pdf",
+                    resume_data=synthetic_resume(rng) if parsed else None,
+                    parsing_status='parsed' if parsed else 'not_parsed',
+                    slug=f"bench-{i}",
+                    employment_type_preferences=rng.sample(EMPLOYMENT_TYPES, k=rng.randint(1, 2)),
+                    work_mode_preferences=rng.sample(WORK_MODES, k=rng.randint(1, 3)),
+                    has_workvisa=rng.random() < 0.6,
+                    accommodation_needs="NO",
+                    disclosure_preference="NOT_APPLICABLE",
+                    is_available=rng.random() < 0.85,
+                ))
+            CandidateProfile.objects.bulk_create(profiles)
+            update_search_documents(p for p in profiles if p.resume_data)
+        print(f"Seeded {min(start + batch_size, count)}/{count} candidates")
+    return count
+
+
+def seed_job_posts(count=None, seed=0):
+    """Creates one job post per role in SKILL_FAMILIES (or `count`, cycling roles). Returns the posts."""
+    from organization.models import Organization
+    from main.models import JobPost, Skills
+    from users.models import User
+
+    rng = random.Random(seed)
+    owner, _ = User.objects.get_or_create(email=f"recruiter@{BENCH_EMAIL_DOMAIN}")
+    organization, _ = Organization.objects.get_or_create(
+        root_user=owner,
+        defaults={"headquarter_location": "Toronto", "about": "Benchmark organization", "employee_size": 1,
+                  "name": "Bench Org", "industry": 1},
+    )
+
+    roles = list(SKILL_FAMILIES)
+    jobs = []
+    for i in range(count or len(roles)):
+        role = roles[i % len(roles)]
+        job = JobPost.objects.create(
+            user=owner,
+            organization=organization,
+            title=role,
+            job_desc=f"We are hiring a {role} to build and operate the systems behind our hiring platform.",
+            workplace_type=rng.choice([1, 2, 3]),
+            location="Toronto",
+            job_type=1,
+            estimated_salary=str(rng.randrange(60_000, 160_000, 5_000)),
+            visa_required=rng.random() < 0.3,
+        )
+        job.skills.set([Skills.objects.get_or_create(name=name)[0] for name in SKILL_FAMILIES[role][:5]])
+        jobs.append(job)
+    return jobs
+
+
+def clear_seeded_data():
+    """Deletes every user (and, by cascade, profile/candidate/job/organization) the benchmarks created."""
+    from users.models import User
+
+    deleted, _ = User.objects.filter(email__endswith=f"@{BENCH_EMAIL_DOMAIN}").delete()
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=SCALES, default="1k")
+    parser.add_argument('--jobs', type=int, default=None, help="Job posts to create (default: one per role)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--clear', action='store_true', help="Only delete previously seeded data")
+    args = parser.parse_args()
+
+    setup_django()
+    if args.clear:
+        print(f"Deleted {clear_seeded_data()} rows")
+        return
+
+    started = time.perf_counter()
+    seed_candidates(SCALES[args.scale], seed=args.seed)
+    jobs = seed_job_posts(args.jobs, seed=args.seed)
+    print(f"Seeded {SCALES[args.scale]} candidates and job posts {[job.id for job in jobs]} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
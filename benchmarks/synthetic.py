@@ -0,0 +1,86 @@
+"""
+Synthetic, deterministic resume data in the resume_parser.ResumeData shape.
+"""
+import random
+
+FIRST_NAMES = ["Aisha", "Ben", "Chen", "Diego", "Elena", "Farah", "Gus", "Hana", "Ivan", "Jaya", "Kofi", "Lena"]
+LAST_NAMES = ["Ahmed", "Brown", "Castro", "Dubois", "Evans", "Fischer", "Garcia", "Hughes", "Ito", "Jones"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Health", "Stark Industries", "Hooli", "Vandelay Imports"]
+
+SKILL_FAMILIES = {
+    "Backend Developer": ["Python", "Django", "Flask", "FastAPI", "PostgreSQL", "Redis", "Celery", "REST APIs", "Docker"],
+    "Frontend Developer": ["JavaScript", "TypeScript", "React", "Next.js", "CSS", "HTML", "Redux", "Accessibility"],
+    "Data Scientist": ["Python", "Pandas", "NumPy", "Machine Learning", "scikit-learn", "SQL", "Statistics", "PyTorch"],
+    "DevOps Engineer": ["AWS", "Terraform", "Kubernetes", "Docker", "CI/CD", "Linux", "Prometheus", "Bash"],
+    "Registered Nurse": ["Patient Care", "Triage", "Electronic Health Records", "Medication Administration", "BLS"],
+    "Accountant": ["Financial Reporting", "Excel", "QuickBooks", "Auditing", "Tax Preparation", "GAAP"],
+}
+SOFT_SKILLS = ["Communication", "Teamwork", "Problem Solving", "Time Management", "Leadership", "Mentoring"]
+DUTIES = [
+    "Designed and maintained {skill} services used by {n} customers",
+    "Led migration of legacy systems to {skill}",
+    "Collaborated with product and design teams to deliver {skill} features",
+    "Improved {skill} performance by {n}% through profiling and optimization",
+    "Mentored {n} junior colleagues on {skill} best practices",
+]
+DEGREES = ["B.Sc. Computer Science", "M.Sc. Data Science", "B.A. Economics", "B.Sc. Nursing", "B.Com. Accounting"]
+
+
+def synthetic_resume(rng, role=None):
+    """Returns one resume_data dict; `rng` is a random.Random so output is reproducible."""
+    role = role or rng.choice(list(SKILL_FAMILIES))
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    skills = rng.sample(SKILL_FAMILIES[role], k=min(len(SKILL_FAMILIES[role]), rng.randint(4, 8)))
+    skills += rng.sample(SOFT_SKILLS, k=2)
+
+    work_experience = []
+    for _ in range(rng.randint(1, 4)):
+        start = rng.randint(2008, 2022)
+        work_experience.append({
+            "company_name": rng.choice(COMPANIES),
+            "job_title": f"{rng.choice(['Junior', 'Senior', 'Lead', ''])} {role}".strip(),
+            "duration": f"{start} - {start + rng.randint(1, 4)}",
+            "key_responsbilities": [
+                rng.choice(DUTIES).format(skill=rng.choice(skills), n=rng.randint(2, 90)) for _ in range(rng.randint(2, 5))
+            ],
+        })
+
+    return {
+        "personal_info": {
+            "name": f"{first} {last}",
+            "gender": "-",
+            "contact_no": f"+1-555-{rng.randint(1000, 9999)}",
+            "email": f"{first}.{last}{rng.randint(1, 999)}@example.com".lower(),
+            "github": "-",
+            "linkedin": f"https://linkedin.com/in/{first}{last}".lower(),
+            "website": "-",
+        },
+        "qualifications": [{"title": rng.choice(DEGREES), "description": f"Graduated {rng.randint(2005, 2020)}"}],
+        "skills": [{"name": skill} for skill in skills],
+        "work_experience": work_experience,
+    }
+
+
+def synthetic_resumes(count, seed=0):
+    rng = random.Random(seed)
+    return [synthetic_resume(rng) for _ in range(count)]
+
+
+def synthetic_job_description(role="Backend Developer"):
+    skills = ", ".join(SKILL_FAMILIES[role][:5])
+    return f"""
+Job Overview
+============
+Title: {role}
+Location: Toronto
+Workplace Type: Remote
+Job Type: Full-time
+Estimated Salary: 120000
+Visa Sponsorship Required: No
+
+Job Description:
+We are hiring a {role} to build and operate the systems behind our hiring platform.
+
+Skills Required:
+{skills}
+"""
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import CandidateProfile, Notes
+from .models import CandidateProfile, LLMBatchRun, Notes, ParsedResume, ResumeImport
 
 admin.site.register(CandidateProfile)
-admin.site.register(Notes)
\ No newline at end of file
+admin.site.register(Notes)
+admin.site.register(ParsedResume)
+admin.site.register(ResumeImport)
+admin.site.register(LLMBatchRun)
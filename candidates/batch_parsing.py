@@ -0,0 +1,159 @@
+"""
+Batch API mode for the resume parse backlog (see backends.batch and candidates.llm_batches).
+
+submit_parse_batch() claims queued profiles (parsing_status 'not_parsed'), parses the ones whose
+PDF bytes are already in the parse cache right away and writes one extraction request per distinct
+remaining PDF. apply_parse_results() stores each parse in the cache and fans it out to every claimed
+profile with those bytes, as parse_resume_task would have; profiles whose request got no answer
+(an expired or cancelled batch) go back to the queue.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from backends.batch import request_line, response_body
+from backends.metrics import RESUME_PARSE_CACHE
+from main.signals import queue_reverse_matching
+from .bulk_ingest import index_profiles
+from .llm_batches import count_result, create_run, finish_run, submit_run
+from .models import CandidateProfile, ParsedResume
+from .parse_cache import resume_digest, store_parse
+from .resume_parser import (
+    PARSE_MODEL, PARSER_VERSION, ResumeData, extract_text_from_bytes, extraction_request, extraction_result,
+    resume_bytes,
+)
+
+
+def queued_profile_ids(limit=None):
+    """Profiles waiting for a parse, oldest first."""
+    return list(
+        CandidateProfile.objects.filter(parsing_status='not_parsed').exclude(resume_file='')
+        .order_by('id').values_list('id', flat=True)[:limit or settings.LLM_BATCH_MAX_REQUESTS]
+    )
+
+
+def read_resume(profile):
+    """(SHA-256, extracted text) of a profile's PDF, or the exception."""
+    try:
+        with resume_bytes(profile.resume_file.name) as data:
+            return resume_digest(data), extract_text_from_bytes(data)
+    except Exception as e:
+        return e
+
+
+def save_parses(run, profile_ids, parsed):
+    """
+    Stores `parsed` on those of the profiles the run still owns, indexes them and queues their
+    reverse matching (bulk_update sends no post_save). Returns how many.
+    """
+    profiles = list(CandidateProfile.objects.filter(id__in=profile_ids, parsing_task_id=run.tag, parsing_status='parsing'))
+    data = parsed.model_dump()
+    for profile in profiles:
+        profile.resume_data = data
+        profile.parsing_status = 'parsed'
+    CandidateProfile.objects.bulk_update(profiles, ['resume_data', 'parsing_status'])
+    CandidateProfile.objects.filter(id__in=[p.id for p in profiles]).update(updated_at=timezone.now())
+    if profiles:
+        index_profiles(profiles)
+        queue_reverse_matching(profiles)
+    return len(profiles)
+
+
+def release_profiles(run, profile_ids, status):
+    return CandidateProfile.objects.filter(id__in=profile_ids, parsing_task_id=run.tag, parsing_status='parsing').update(
+        parsing_status=status, updated_at=timezone.now()
+    )
+
+
+def submit_parse_batch(profile_ids=None, limit=None):
+    """
+    Claims the given profiles (default: the queued ones) and submits the parses the cache can't
+    serve as one batch. Returns the run, or None when no profile could be claimed.
+    """
+    if profile_ids is None:
+        profile_ids = queued_profile_ids(limit)
+    if not profile_ids:
+        return None
+
+    run = create_run('parse', model=PARSE_MODEL)
+    CandidateProfile.objects.filter(id__in=profile_ids).exclude(parsing_status='parsing').exclude(resume_file='').update(
+        parsing_status='parsing', parsing_task_id=run.tag, updated_at=timezone.now()
+    )
+    profiles = list(CandidateProfile.objects.filter(parsing_task_id=run.tag, parsing_status='parsing').only('id', 'resume_file'))
+    if not profiles:
+        run.delete()
+        return None
+
+    with ThreadPoolExecutor(settings.BULK_IMPORT_FETCH_THREADS) as threads:
+        read = dict(zip((p.id for p in profiles), threads.map(read_resume, profiles)))
+
+    profiles_by_digest, unreadable = {}, []
+    for profile_id, outcome in read.items():
+        if isinstance(outcome, Exception) or not outcome[1].strip():
+            print(f"Batch parse: unreadable resume of candidate {profile_id}: "
+                  f"{str(outcome) if isinstance(outcome, Exception) else 'no text found (scanned image?)'}")
+            unreadable.append(profile_id)
+        else:
+            profiles_by_digest.setdefault(outcome[0], []).append(profile_id)
+    release_profiles(run, unreadable, 'failed')
+
+    # Bytes parsed before (by any profile) don't need a request
+    entries = ParsedResume.objects.filter(content_hash__in=list(profiles_by_digest), parser_version=PARSER_VERSION)
+    for entry in entries:
+        save_parses(run, profiles_by_digest.pop(entry.content_hash), ResumeData.model_validate(entry.data))
+    ParsedResume.objects.filter(id__in=[entry.id for entry in entries]).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    RESUME_PARSE_CACHE.inc(len(entries), result="hit")
+
+    lines = []
+    for index, (digest, ids) in enumerate(profiles_by_digest.items()):
+        custom_id = f"resume-{index}"
+        run.items[custom_id] = {"digest": digest, "profiles": ids}
+        text = read[ids[0]][1]
+        lines.append(request_line(custom_id, "/v1/responses", extraction_request(text)))
+    run.context = {"cache_hits": len(entries), "unreadable": len(unreadable)}
+    print(f"Batch parse run {run.id}: {len(profiles)} profiles, {len(entries)} cache hits, "
+          f"{len(unreadable)} unreadable, {len(lines)} requests")
+    if not lines:
+        finish_run(run)
+        return run
+
+    try:
+        return submit_run(run, lines, "/v1/responses")
+    except Exception as e:
+        release_profiles(run, [p for ids in profiles_by_digest.values() for p in ids], 'not_parsed')
+        finish_run(run, f"Submitting failed: {str(e)}")
+        raise
+
+
+def apply_parse_results(run, results):
+    """Fans the batch's parses out to the claimed profiles (see module docstring)."""
+    unanswered = []
+    for custom_id, item in run.items.items():
+        result = results.get(custom_id)
+        if result is None:
+            count_result(run, failed=True)
+            unanswered += item["profiles"]
+            continue
+
+        body, error = response_body(result)
+        parsed = None
+        if error is None:
+            try:
+                parsed = extraction_result(body)
+            except ValueError as e:
+                error = f"Unparseable response: {str(e)}"
+        count_result(run, body, failed=parsed is None)
+        if parsed is None:
+            print(f"Batch parse of {item['profiles']} failed: {error}")
+            release_profiles(run, item["profiles"], 'failed')
+            continue
+
+        store_parse(item["digest"], parsed)
+        RESUME_PARSE_CACHE.inc(result="miss")
+        save_parses(run, item["profiles"], parsed)
+
+    if unanswered:
+        print(f"Batch parse run {run.id}: {len(unanswered)} profiles got no answer, back in the queue")
+        release_profiles(run, unanswered, 'not_parsed')
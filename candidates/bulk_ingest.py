@@ -0,0 +1,497 @@
+"""
+Bulk resume ingestion, for onboarding a partner organization's thousands of resumes at once.
+
+    resume_import = create_import('zip', 'acme.zip', organization=organization)
+    add_zip_items(resume_import, 'acme.zip')      # copies the PDFs into storage, one item each
+    start_import(resume_import)                   # Celery lanes; run_import() processes in-process
+
+Every source file is copied into default_storage and recorded as a ResumeImportItem first, so any
+worker can process it and an interrupted import resumes where it stopped. At most `max_concurrency`
+lanes (Celery tasks on BULK_IMPORT_QUEUE) then claim BULK_IMPORT_BATCH_SIZE pending items at a time
+and, per batch:
+
+1. fetch and hash the PDFs (threads); resumes in the parse cache skip steps 2 and 3
+2. extract the text of the rest in the PDF process pool (candidates.pdf_text)
+3. parse BULK_IMPORT_LLM_GROUP_SIZE resumes per LLM call, BULK_IMPORT_LLM_CONCURRENCY calls at a time
+4. write users, profiles and items with bulk_create / bulk_update, then index the new profiles and
+   queue their reverse matching into existing job rankings
+"""
+import hashlib
+import math
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from backends.metrics import RESUME_PARSE_CACHE
+from main.signals import queue_reverse_matching
+from users.models import Profile, User, generate_referral_code
+from .embeddings import embed_candidates
+from .models import CandidateProfile, ParsedResume, ResumeImport, ResumeImportItem, candidate_slug
+from .pdf_text import extract_files
+from .resume_parser import (
+    PARSER_VERSION, ResumeData, extract_structured_data, extract_structured_data_batch, read_storage_object,
+)
+from .search import update_search_documents
+
+# Where copied source files are stored, under the import's id
+IMPORT_UPLOAD_DIR = 'Candidates-Resume/imports'
+# Email domain of users created for resumes that show no usable address (.invalid never resolves)
+PLACEHOLDER_EMAIL_DOMAIN = 'imports.invalid'
+# Source files copied into storage (and recorded) per round
+UPLOAD_CHUNK_SIZE = 100
+
+
+def create_import(source_type, source, organization=None, created_by=None, max_concurrency=None):
+    return ResumeImport.objects.create(
+        source_type=source_type,
+        source=source,
+        organization=organization,
+        created_by=created_by,
+        max_concurrency=max_concurrency or settings.BULK_IMPORT_MAX_CONCURRENCY,
+    )
+
+
+def _record_items(resume_import, rows):
+    """Records (source_key, file_name, email) rows; keys already recorded are left alone."""
+    ResumeImportItem.objects.bulk_create([
+        ResumeImportItem(resume_import=resume_import, source_key=key, file_name=file_name, email=email)
+        for key, file_name, email in rows
+    ], ignore_conflicts=True)
+    total = resume_import.items.count()
+    ResumeImport.objects.filter(id=resume_import.id).update(total=total)
+    resume_import.total = total
+
+
+def _copy_into_storage(resume_import, pending):
+    """Uploads [(source_key, read)] (read() returns the file's bytes) in parallel and records them."""
+    def upload(entry):
+        key, read = entry
+        file_name = default_storage.save(f"{IMPORT_UPLOAD_DIR}/{resume_import.id}/{key}", ContentFile(read()))
+        return key, file_name, ''
+
+    with ThreadPoolExecutor(settings.BULK_IMPORT_FETCH_THREADS) as threads:
+        _record_items(resume_import, list(threads.map(upload, pending)))
+
+
+def _safe_key(name):
+    # Relative name that can't climb out of the import's storage directory
+    return "/".join(part for part in PurePosixPath(name.replace("\\", "/")).parts if part not in ("", "/", "..", "."))
+
+
+def _add_files(resume_import, files):
+    """Copies [(source_key, read)] into storage in chunks, skipping keys recorded by an earlier run."""
+    recorded = set(resume_import.items.values_list('source_key', flat=True))
+    pending = []
+    for key, read in files:
+        if key in recorded:
+            continue
+        pending.append((key, read))
+        if len(pending) >= UPLOAD_CHUNK_SIZE:
+            _copy_into_storage(resume_import, pending)
+            print(f"Import {resume_import.id}: {resume_import.total} resumes collected")
+            pending = []
+    if pending:
+        _copy_into_storage(resume_import, pending)
+    return resume_import.total
+
+
+def add_directory_items(resume_import, directory):
+    """Copies every PDF under a local `directory` into storage. Returns the import's item count."""
+    def files():
+        for root, _, names in os.walk(directory):
+            for name in sorted(names):
+                if name.lower().endswith('.pdf'):
+                    path = Path(root, name)
+                    yield _safe_key(path.relative_to(directory).as_posix()), path.read_bytes
+
+    return _add_files(resume_import, files())
+
+
+def add_zip_items(resume_import, zip_file, storage=None):
+    """Copies every PDF in a zip archive (a local path, or a name in `storage` when given) into storage."""
+    source = storage.open(zip_file, 'rb') if storage is not None else open(zip_file, 'rb')
+    with source, zipfile.ZipFile(source) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and info.filename.lower().endswith('.pdf') and not info.filename.startswith('__MACOSX/')
+        ]
+        return _add_files(resume_import, (
+            (_safe_key(info.filename), lambda info=info: archive.read(info)) for info in members
+        ))
+
+
+def manifest_prefix(organization):
+    """Storage prefix an organization's manifest keys must be under."""
+    return f"{IMPORT_UPLOAD_DIR}/org-{organization.id}/"
+
+
+def validate_manifest_keys(entries, prefix=None):
+    """
+    Raises ValidationError unless every key is a plain relative storage name (no '..', '.' or absolute
+    parts) under `prefix`, so a manifest can only point at the files its organization put there.
+    """
+    invalid = []
+    for entry in entries:
+        key = entry.get('key') or ''
+        parts = key.split('/')
+        if (key.startswith('/') or '\\' in key or any(part in ('', '.', '..') for part in parts)
+                or (prefix is not None and not key.startswith(prefix))):
+            invalid.append(key)
+    if invalid:
+        where = f" under {prefix}" if prefix is not None else ""
+        raise ValidationError(f"Manifest keys must be relative storage names{where}: {', '.join(invalid[:10])}")
+
+
+def parse_manifest(lines):
+    """Manifest lines are `<storage key>[,<candidate email>]`; blank lines and # comments are skipped."""
+    entries = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        key, _, email = line.partition(',')
+        entries.append({'key': key.strip(), 'email': email.strip()})
+    return entries
+
+
+def add_manifest_items(resume_import, entries, prefix=None):
+    """
+    Records resumes already in storage ([{'key': ..., 'email': ...}]); nothing is copied. Keys are
+    checked with validate_manifest_keys(); `prefix` restricts them to one organization's files.
+    """
+    validate_manifest_keys(entries, prefix)
+    rows = [(entry['key'], entry['key'], (entry.get('email') or '').lower()) for entry in entries if entry.get('key')]
+    for start in range(0, len(rows), 1000):
+        _record_items(resume_import, rows[start:start + 1000])
+    return resume_import.total
+
+
+def requeue_items(resume_import, retry_failed=False):
+    """Puts items an interrupted run left 'processing' (and, with `retry_failed`, failed ones) back in the queue."""
+    resume_import.items.filter(status='processing').update(status='pending')
+    if retry_failed:
+        retried = resume_import.items.filter(status='failed').update(status='pending', error='')
+        ResumeImport.objects.filter(id=resume_import.id).update(failed_count=F('failed_count') - retried)
+
+
+def start_import(resume_import, restart=False, retry_failed=False):
+    """
+    Queues up to `max_concurrency` lanes. A running import is only restarted with `restart` (its lanes
+    are presumed dead). Returns the number of lanes queued.
+    """
+    from .tasks import ingest_resume_batch_task
+
+    imports = ResumeImport.objects.filter(id=resume_import.id)
+    if not restart:
+        imports = imports.exclude(status='running')
+    if not imports.update(status='running', error='', finished_at=None):
+        return 0
+    requeue_items(resume_import, retry_failed)
+
+    pending = resume_import.items.filter(status='pending').count()
+    lanes = max(1, min(resume_import.max_concurrency, math.ceil(pending / settings.BULK_IMPORT_BATCH_SIZE)))
+    for _ in range(lanes):
+        ingest_resume_batch_task.apply_async(args=(resume_import.id,), queue=settings.BULK_IMPORT_QUEUE)
+    return lanes
+
+
+def claim_batch(resume_import, size=None):
+    """Marks up to `size` pending items as processing for this lane; concurrent lanes skip each other's rows."""
+    with transaction.atomic():
+        ids = list(
+            resume_import.items.filter(status='pending').order_by('id')
+            .select_for_update(skip_locked=True).values_list('id', flat=True)[:size or settings.BULK_IMPORT_BATCH_SIZE]
+        )
+        ResumeImportItem.objects.filter(id__in=ids).update(status='processing')
+    return list(ResumeImportItem.objects.filter(id__in=ids).order_by('id'))
+
+
+def finish_import(resume_import):
+    if resume_import.items.filter(status__in=('pending', 'processing')).exists():
+        return False
+    return bool(ResumeImport.objects.filter(id=resume_import.id, status='running').update(
+        status='completed', finished_at=timezone.now()
+    ))
+
+
+def ingest_next_batch(import_id):
+    """Processes one batch of the import. Returns False once there is nothing left for this lane."""
+    resume_import = ResumeImport.objects.select_related('organization').get(id=import_id)
+    if resume_import.status != 'running':
+        return False
+    items = claim_batch(resume_import)
+    if not items:
+        finish_import(resume_import)
+        return False
+
+    try:
+        process_batch(resume_import, items)
+    except Exception as e:
+        print(f"Import {import_id}: batch of {len(items)} failed: {str(e)}")
+        for item in items:
+            fail(item, f"Batch failed: {str(e)}")
+        save_items(resume_import, items)
+    return True
+
+
+def run_import(resume_import, retry_failed=False):
+    """Processes the whole import in this process (no Celery), e.g. from the management command."""
+    ResumeImport.objects.filter(id=resume_import.id).update(status='running', error='', finished_at=None)
+    requeue_items(resume_import, retry_failed)
+    while ingest_next_batch(resume_import.id):
+        resume_import.refresh_from_db()
+        print(f"Import {resume_import.id}: {resume_import.processed}/{resume_import.total} processed")
+
+
+def fail(item, error):
+    item.status = 'failed'
+    item.error = str(error)[:2000]
+
+
+def fetch_resumes(items, directory):
+    """Local path and SHA-256 of each item's PDF (remote files are downloaded into `directory`), or the error."""
+    def fetch(item):
+        try:
+            try:
+                path = default_storage.path(item.file_name)
+            except NotImplementedError:
+                path = os.path.join(directory, f"{item.id}.pdf")
+                with open(path, 'wb') as f:
+                    f.write(read_storage_object(item.file_name, default_storage))
+            with open(path, 'rb') as f:
+                return path, hashlib.file_digest(f, 'sha256').hexdigest()
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(settings.BULK_IMPORT_FETCH_THREADS) as threads:
+        return dict(zip((item.id for item in items), threads.map(fetch, items)))
+
+
+def parse_texts(texts):
+    """
+    ResumeData (or the exception) per text. Texts are parsed BULK_IMPORT_LLM_GROUP_SIZE per call,
+    BULK_IMPORT_LLM_CONCURRENCY calls at a time; resumes a grouped call skipped or failed on are
+    parsed on their own.
+    """
+    size = max(1, settings.BULK_IMPORT_LLM_GROUP_SIZE)
+
+    def parse_group(group):
+        results = [None] * len(group)
+        if len(group) > 1:
+            try:
+                results = extract_structured_data_batch(group)
+            except Exception as e:
+                print(f"Grouped resume parse failed, parsing one by one: {str(e)}")
+        for index, parsed in enumerate(results):
+            if parsed is None:
+                try:
+                    results[index] = extract_structured_data(group[index])
+                except Exception as e:
+                    results[index] = e
+        return results
+
+    groups = [texts[start:start + size] for start in range(0, len(texts), size)]
+    with ThreadPoolExecutor(max(1, settings.BULK_IMPORT_LLM_CONCURRENCY)) as threads:
+        return [parsed for results in threads.map(parse_group, groups) for parsed in results]
+
+
+def parse_resumes(items, fetched):
+    """ResumeData per content hash of the batch: cached parses, then fresh ones (stored in the cache)."""
+    digests = {item.content_hash for item in items if item.status == 'processing'}
+    entries = ParsedResume.objects.filter(content_hash__in=digests, parser_version=PARSER_VERSION).only('id', 'content_hash', 'data')
+    parsed = {entry.content_hash: ResumeData.model_validate(entry.data) for entry in entries}
+    ParsedResume.objects.filter(id__in=[entry.id for entry in entries]).update(hits=F('hits') + 1, last_used_at=timezone.now())
+
+    misses = sorted(digests - set(parsed))
+    path_of = {item.content_hash: fetched[item.id][0] for item in items if item.content_hash in misses}
+    texts = extract_files([path_of[digest] for digest in misses])
+
+    to_parse = []
+    for digest, text in zip(misses, texts):
+        if isinstance(text, Exception):
+            parsed[digest] = ValueError(f"Unreadable PDF: {str(text)}")
+        elif not text.strip():
+            parsed[digest] = ValueError("No text found in the PDF (scanned image?)")
+        else:
+            to_parse.append((digest, text))
+
+    fresh = dict(zip((digest for digest, _ in to_parse), parse_texts([text for _, text in to_parse])))
+    ParsedResume.objects.bulk_create([
+        ParsedResume(content_hash=digest, parser_version=PARSER_VERSION, data=result.model_dump())
+        for digest, result in fresh.items() if isinstance(result, ResumeData)
+    ], ignore_conflicts=True)
+    parsed.update(fresh)
+    return parsed, len(digests) - len(misses)
+
+
+def placeholder_email(item):
+    return f"import-{item.resume_import_id}-{item.id}@{PLACEHOLDER_EMAIL_DOMAIN}"
+
+
+def candidate_email(item, parsed):
+    """The manifest's email, else the resume's, else a placeholder unique to the item."""
+    for email in (item.email, parsed.personal_info.email):
+        email = (email or '').strip().lower()
+        try:
+            validate_email(email)
+            return email
+        except ValidationError:
+            continue
+    return placeholder_email(item)
+
+
+def reusable_users(resume_import, emails):
+    """
+    Emails of existing users `resume_import` may attach a resume to: only users an import of the same
+    organization created. Any other account (a recruiter, an admin, a candidate who signed up, a
+    candidate another organization imported) is never matched by email.
+    """
+    return set(
+        User.objects.filter(
+            email__in=emails,
+            candidateprofile__resumeimportitem__status='created',
+            candidateprofile__resumeimportitem__resume_import__organization=resume_import.organization,
+        ).values_list('email', flat=True)
+    )
+
+
+def unique_referral_codes(count):
+    codes = set()
+    while len(codes) < count:
+        wanted = {generate_referral_code() for _ in range(count - len(codes))} - codes
+        codes |= wanted - set(Profile.objects.filter(referral_code__in=wanted).values_list('referral_code', flat=True))
+    return list(codes)
+
+
+def create_profiles(resume_import, entries):
+    """
+    Creates the users (with their Profile) and candidate profiles for [(item, ResumeData)] in bulk
+    and points the items at them. Candidates an earlier import of the organization already created,
+    including a second resume of the same candidate in this batch, are marked duplicate (see
+    reusable_users). Returns the new CandidateProfiles.
+    """
+    emails = [candidate_email(item, parsed) for item, parsed in entries]
+
+    with transaction.atomic():
+        known = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+        # Resumes whose email belongs to an account no import of this organization created get a user
+        # of their own
+        taken = known - reusable_users(resume_import, known)
+        by_email = {}
+        for (item, parsed), email in zip(entries, emails):
+            by_email.setdefault(placeholder_email(item) if email in taken else email, []).append((item, parsed))
+
+        new_users = []
+        for email, [(_, parsed), *_] in by_email.items():
+            if email not in known:
+                name = parsed.personal_info.name.strip()
+                first_name, _, last_name = ('' if name == '-' else name).partition(' ')
+                new_users.append(User(
+                    email=email, password=make_password(None), first_name=first_name[:150], last_name=last_name[:150]
+                ))
+        # Another lane may create the same user meanwhile; whoever wins, the rows are re-read below
+        User.objects.bulk_create(new_users, ignore_conflicts=True)
+        users = {user.email: user for user in User.objects.filter(email__in=by_email).only('id', 'email')}
+
+        without_profile = set(users[email].id for email in by_email) - set(
+            Profile.objects.filter(user_id__in=[user.id for user in users.values()]).values_list('user_id', flat=True)
+        )
+        Profile.objects.bulk_create([
+            Profile(user_id=user_id, referral_code=code)
+            for user_id, code in zip(sorted(without_profile), unique_referral_codes(len(without_profile)))
+        ], ignore_conflicts=True)
+
+        candidates = []
+        for email, group in by_email.items():
+            item, parsed = group[0]
+            candidates.append(CandidateProfile(
+                user=users[email],
+                organization=resume_import.organization,
+                resume_file=item.file_name,
+                resume_data=parsed.model_dump(),
+                parsing_status='parsed',
+                slug=candidate_slug(item.file_name),
+                accommodation_needs='PREFER_TO_DISCUSS_LATER',
+                disclosure_preference='NOT_APPLICABLE',
+            ))
+        CandidateProfile.objects.bulk_create(candidates, ignore_conflicts=True)
+        profile_of = {
+            profile.user_id: profile
+            for profile in CandidateProfile.objects.filter(user_id__in=[user.id for user in users.values()])
+        }
+
+        created = []
+        for candidate, group in zip(candidates, by_email.values()):
+            profile = profile_of[candidate.user.id]
+            if profile.slug == candidate.slug:
+                created.append(profile)
+            for position, (item, _) in enumerate(group):
+                item.profile = profile
+                item.status = 'created' if position == 0 and profile.slug == candidate.slug else 'duplicate'
+    return created
+
+
+def save_items(resume_import, items, cache_hits=0):
+    ResumeImportItem.objects.bulk_update(items, ['status', 'content_hash', 'profile', 'error'])
+    counts = {status: sum(1 for item in items if item.status == status) for status in ('created', 'duplicate', 'failed')}
+    ResumeImport.objects.filter(id=resume_import.id).update(
+        created_count=F('created_count') + counts['created'],
+        duplicate_count=F('duplicate_count') + counts['duplicate'],
+        failed_count=F('failed_count') + counts['failed'],
+        cache_hits=F('cache_hits') + cache_hits,
+        updated_at=timezone.now(),
+    )
+
+
+def index_profiles(profiles):
+    # Same as index_candidate_profile, a batch at a time; the backfill commands can catch up on failures
+    for name, index in (("Search documents", update_search_documents), ("Embeddings", embed_candidates)):
+        try:
+            index(profiles)
+        except Exception as e:
+            print(f"{name} indexing failed for {len(profiles)} imported candidates: {str(e)}")
+
+
+def process_batch(resume_import, items):
+    """Runs claimed items through fetch, cache, extraction, parsing and the bulk writes."""
+    with tempfile.TemporaryDirectory() as directory:
+        fetched = fetch_resumes(items, directory)
+        for item in items:
+            if isinstance(fetched[item.id], Exception):
+                fail(item, f"Could not read {item.file_name}: {str(fetched[item.id])}")
+            else:
+                item.content_hash = fetched[item.id][1]
+        parsed, cache_hits = parse_resumes(items, fetched)
+
+    RESUME_PARSE_CACHE.inc(cache_hits, result="hit")
+    RESUME_PARSE_CACHE.inc(sum(1 for result in parsed.values() if isinstance(result, ResumeData)) - cache_hits, result="miss")
+
+    entries = []
+    for item in items:
+        if item.status != 'processing':
+            continue
+        result = parsed[item.content_hash]
+        if isinstance(result, Exception):
+            fail(item, result)
+        else:
+            entries.append((item, result))
+
+    created = create_profiles(resume_import, entries) if entries else []
+    save_items(resume_import, items, cache_hits)
+    if created:
+        index_profiles(created)
+        # bulk_create sends no post_save, so rank-on-write is queued here
+        queue_reverse_matching(created)
+    print(f"Import {resume_import.id}: batch of {len(items)} done, {len(created)} profiles created, {cache_hits} cache hits")
@@ -0,0 +1,219 @@
+import hashlib
+import re
+import threading
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils.module_loading import import_string
+from dotenv import load_dotenv
+from openai import OpenAI
+
+from backends.llm import llm_call
+from .models import CandidateEmbedding
+from .resume_text import resume_summary_text
+
+load_dotenv()
+
+
+class BaseEmbedder:
+    """
+    Turns texts into L2-normalized float32 vectors of a fixed size.
+    `name` identifies the vector space, vectors from different embedders are never compared.
+    """
+    dimensions = None
+
+    @property
+    def name(self):
+        raise NotImplementedError
+
+    def embed(self, texts):
+        """Returns a (len(texts), dimensions) float32 matrix."""
+        raise NotImplementedError
+
+
+def normalize_rows(matrix):
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class OpenAIEmbedder(BaseEmbedder):
+    BATCH_SIZE = 256
+
+    def __init__(self, model="text-embedding-3-small", dimensions=512):
+        self.model = model
+        self.dimensions = dimensions
+        self.client = OpenAI()
+
+    @property
+    def name(self):
+        return f"openai:{self.model}:{self.dimensions}"
+
+    def embed(self, texts):
+        vectors = []
+        for start in range(0, len(texts), self.BATCH_SIZE):
+            response = llm_call(
+                "candidate_embeddings", self.client.embeddings.create,
+                model=self.model,
+                input=[text or " " for text in texts[start:start + self.BATCH_SIZE]],
+                dimensions=self.dimensions,
+            )
+            vectors.extend(item.embedding for item in response.data)
+        return normalize_rows(np.array(vectors, dtype=np.float32).reshape(len(texts), self.dimensions))
+
+
+class HashingEmbedder(BaseEmbedder):
+    """
+    Deterministic local embedder (signed feature hashing of word unigrams and bigrams).
+    No network and stable across processes, for offline runs and tests.
+    """
+    TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+    def __init__(self, dimensions=512, **kwargs):
+        self.dimensions = dimensions
+
+    @property
+    def name(self):
+        return f"hashing:{self.dimensions}"
+
+    def _features(self, text):
+        tokens = [token.rstrip('.') for token in self.TOKEN_RE.findall((text or "").lower())]
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), 'little')
+                matrix[row, digest % self.dimensions] += 1.0 if (digest >> 63) else -1.0
+        return normalize_rows(matrix)
+
+
+_embedder = None
+
+
+def get_embedder():
+    """Returns the embedder configured in settings.CANDIDATE_EMBEDDER."""
+    global _embedder
+    if _embedder is None:
+        config = settings.CANDIDATE_EMBEDDER
+        _embedder = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _embedder
+
+
+def candidate_embedding_text(profile):
+    return resume_summary_text(profile.resume_data)
+
+
+def embed_candidates(profiles, embedder=None):
+    """Embeds and stores vectors for the given parsed profiles. Returns the number stored."""
+    embedder = embedder or get_embedder()
+    profiles = [p for p in profiles if p.resume_data]
+    if not profiles:
+        return 0
+
+    vectors = embedder.embed([candidate_embedding_text(p) for p in profiles])
+    for profile, vector in zip(profiles, vectors):
+        CandidateEmbedding.objects.update_or_create(
+            profile_id=profile.id,
+            defaults={
+                'embedder': embedder.name,
+                'dimensions': embedder.dimensions,
+                'vector': vector.astype(np.float32).tobytes(),
+            }
+        )
+    return len(profiles)
+
+
+def embed_candidate(profile):
+    return embed_candidates([profile])
+
+
+class CandidateEmbeddingStore:
+    """
+    Per-process copy of the stored candidate vectors: one contiguous float32 matrix
+    plus a parallel id array. refresh() only pulls rows changed since the last sync
+    (less CANDIDATE_SYNC_OVERLAP_SECONDS).
+    """
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.matrix = np.zeros((0, embedder.dimensions), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.size = 0
+        self.row_of = {}
+        self.synced_at = None
+        self.lock = threading.Lock()
+
+    def _grow(self, needed):
+        capacity = self.matrix.shape[0]
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        matrix = np.zeros((capacity, self.embedder.dimensions), dtype=np.float32)
+        matrix[:self.size] = self.matrix[:self.size]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:self.size] = self.ids[:self.size]
+        self.matrix, self.ids = matrix, ids
+
+    def refresh(self):
+        with self.lock:
+            rows = CandidateEmbedding.objects.filter(embedder=self.embedder.name)
+            if self.synced_at is not None:
+                # Re-read an overlap before the last sync: updated_at is set before commit, so a
+                # row committed after the last scan can carry an older timestamp
+                overlap = timedelta(seconds=settings.CANDIDATE_SYNC_OVERLAP_SECONDS)
+                rows = rows.filter(updated_at__gte=self.synced_at - overlap)
+
+            rows = rows.values_list('profile_id', 'vector', 'updated_at').iterator(chunk_size=settings.CANDIDATE_SCAN_CHUNK_SIZE)
+            for profile_id, vector, updated_at in rows:
+                row = self.row_of.get(profile_id)
+                if row is None:
+                    self._grow(self.size + 1)
+                    row = self.size
+                    self.size += 1
+                    self.row_of[profile_id] = row
+                    self.ids[row] = profile_id
+                self.matrix[row] = np.frombuffer(vector, dtype=np.float32)
+                if self.synced_at is None or updated_at > self.synced_at:
+                    self.synced_at = updated_at
+        return self
+
+    def __contains__(self, profile_id):
+        return profile_id in self.row_of
+
+    def __len__(self):
+        return self.size
+
+    def top_n(self, query_vector, n, candidate_ids=None):
+        """
+        Returns [(profile_id, cosine_similarity)] for the n most similar candidates,
+        optionally restricted to `candidate_ids`.
+        """
+        matrix, ids = self.matrix[:self.size], self.ids[:self.size]
+        similarities = matrix @ np.asarray(query_vector, dtype=np.float32)
+        if candidate_ids is not None:
+            allowed = np.isin(ids, np.fromiter(candidate_ids, dtype=np.int64))
+            similarities = np.where(allowed, similarities, -np.inf)
+            n = min(n, int(allowed.sum()))
+        n = min(n, self.size)
+        if n <= 0:
+            return []
+
+        top = np.argpartition(-similarities, n - 1)[:n]
+        top = top[np.argsort(-similarities[top], kind='stable')]
+        return [(int(ids[i]), float(similarities[i])) for i in top]
+
+
+_store = None
+
+
+def get_embedding_store():
+    """Returns this process's embedding store, refreshed with any new or changed vectors."""
+    global _store
+    embedder = get_embedder()
+    if _store is None or _store.embedder.name != embedder.name:
+        _store = CandidateEmbeddingStore(embedder)
+    return _store.refresh()
@@ -0,0 +1,255 @@
+import threading
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, ExpressionWrapper, Q
+
+from .models import CandidateProfile
+from .resume_text import skill_names
+
+# Bumped on every profile deletion (see main.signals), so each process's matrix knows to rebuild
+DELETIONS_CACHE_KEY = 'candidate_features:deletions'
+
+
+def record_deletion():
+    cache.add(DELETIONS_CACHE_KEY, 0, timeout=None)
+    try:
+        cache.incr(DELETIONS_CACHE_KEY)
+    except ValueError:
+        # Evicted in between; any change of the value makes the matrices rebuild
+        cache.set(DELETIONS_CACHE_KEY, 1, timeout=None)
+
+
+def deletions_seen():
+    return cache.get(DELETIONS_CACHE_KEY, 0)
+
+
+class CandidateFeatureMatrix:
+    """
+    Per-process, column-oriented features for every candidate profile, used for heuristic pre-scoring:
+    - one packed bitset over candidate rows per skill term in the vocabulary
+    - one-hot work mode / employment type preferences
+    - has_workvisa, is_available and parsed masks
+    - per-row skill term counts (document lengths for BM25)
+    refresh() only pulls profiles changed since the last sync (less CANDIDATE_SYNC_OVERLAP_SECONDS), or rebuilds
+    after a profile deletion.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.size = 0
+        self.capacity = 0
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.row_of = {}
+        self.synced_at = None
+        self.deletions = None
+
+        self.skill_vocab = {}
+        self.skill_bits = np.zeros((0, 0), dtype=np.uint8)  # (skill terms, ceil(rows / 8))
+        self._column_cache = {}
+
+        self.work_mode_vocab = {}
+        self.work_mode_onehot = np.zeros((0, 0), dtype=bool)
+        self.employment_vocab = {}
+        self.employment_onehot = np.zeros((0, 0), dtype=bool)
+
+        self.has_workvisa = np.zeros(0, dtype=bool)
+        self.is_available = np.zeros(0, dtype=bool)
+        self.is_parsed = np.zeros(0, dtype=bool)
+        self.skill_count = np.zeros(0, dtype=np.int32)
+
+    # Storage
+
+    @staticmethod
+    def _resized(array, shape):
+        resized = np.zeros(shape, dtype=array.dtype)
+        resized[tuple(slice(0, n) for n in array.shape)] = array
+        return resized
+
+    def _ensure_rows(self, rows):
+        if rows <= self.capacity:
+            return
+        self.capacity = max(rows, self.capacity * 2, 1024)
+        self.ids = self._resized(self.ids, (self.capacity,))
+        self.skill_bits = self._resized(self.skill_bits, (self.skill_bits.shape[0], (self.capacity + 7) // 8))
+        self.work_mode_onehot = self._resized(self.work_mode_onehot, (self.capacity, self.work_mode_onehot.shape[1]))
+        self.employment_onehot = self._resized(self.employment_onehot, (self.capacity, self.employment_onehot.shape[1]))
+        self.has_workvisa = self._resized(self.has_workvisa, (self.capacity,))
+        self.is_available = self._resized(self.is_available, (self.capacity,))
+        self.is_parsed = self._resized(self.is_parsed, (self.capacity,))
+        self.skill_count = self._resized(self.skill_count, (self.capacity,))
+
+    def _skill_column(self, term):
+        column = self.skill_vocab.get(term)
+        if column is None:
+            column = self.skill_vocab[term] = len(self.skill_vocab)
+            self._column_cache.clear()
+            if column >= self.skill_bits.shape[0]:
+                self.skill_bits = self._resized(self.skill_bits, (max(64, column * 2), self.skill_bits.shape[1]))
+        return column
+
+    def _onehot_column(self, vocab, attr, value):
+        column = vocab.get(value)
+        if column is None:
+            column = vocab[value] = len(vocab)
+            onehot = getattr(self, attr)
+            if column >= onehot.shape[1]:
+                setattr(self, attr, self._resized(onehot, (onehot.shape[0], max(8, column * 2))))
+        return column
+
+    @staticmethod
+    def _normalized_values(values):
+        if not isinstance(values, list):
+            return set()
+        return {str(v).lower().strip() for v in values if str(v).strip()}
+
+    def _set_row(self, profile_id, skills, work_modes, employment_types, has_workvisa, is_available, is_parsed):
+        row = self.row_of.get(profile_id)
+        if row is None:
+            self._ensure_rows(self.size + 1)
+            row = self.size
+            self.size += 1
+            self.row_of[profile_id] = row
+            self.ids[row] = profile_id
+            changed = False
+        else:
+            changed = True
+
+        byte, bit = row >> 3, np.uint8(0x80 >> (row & 7))
+        if changed:
+            # Drop the profile's previous skill bits
+            self.skill_bits[:, byte] &= ~bit
+        for term in set(skills):
+            column = self._skill_column(term)  # may grow skill_bits, so look it up first
+            self.skill_bits[column, byte] |= bit
+        self.skill_count[row] = len(set(skills))
+
+        self.work_mode_onehot[row] = False
+        for value in self._normalized_values(work_modes):
+            column = self._onehot_column(self.work_mode_vocab, 'work_mode_onehot', value)
+            self.work_mode_onehot[row, column] = True
+        self.employment_onehot[row] = False
+        for value in self._normalized_values(employment_types):
+            column = self._onehot_column(self.employment_vocab, 'employment_onehot', value)
+            self.employment_onehot[row, column] = True
+
+        self.has_workvisa[row] = bool(has_workvisa)
+        self.is_available[row] = bool(is_available)
+        self.is_parsed[row] = bool(is_parsed)
+
+    def refresh(self):
+        with self.lock:
+            # Deleted profiles leave stale rows behind; rebuild from scratch when there were any.
+            # Read before the scan, so a deletion during it triggers the next rebuild
+            deletions = deletions_seen()
+            if deletions != self.deletions:
+                self._reset()
+                self.deletions = deletions
+
+            profiles = CandidateProfile.objects.order_by()  # no need to sort the scan
+            if self.synced_at is not None:
+                # Re-read an overlap before the last sync: updated_at is set before commit, so a
+                # profile committed after the last scan can carry an older timestamp
+                overlap = timedelta(seconds=settings.CANDIDATE_SYNC_OVERLAP_SECONDS)
+                profiles = profiles.filter(updated_at__gte=self.synced_at - overlap)
+
+            # Project only the JSON keys the pre-scorer needs and stream them through a server-side
+            # cursor, so full resume documents never reach this process
+            rows = profiles.annotate(
+                is_parsed=ExpressionWrapper(Q(resume_data__isnull=False), output_field=BooleanField()),
+            ).values_list(
+                'id', 'resume_data__skills', 'resume_data__Skills', 'work_mode_preferences',
+                'employment_type_preferences', 'has_workvisa', 'is_available', 'is_parsed', 'updated_at'
+            ).iterator(chunk_size=settings.CANDIDATE_SCAN_CHUNK_SIZE)
+            for profile_id, skills, legacy_skills, work_modes, employment_types, has_workvisa, is_available, is_parsed, updated_at in rows:
+                self._set_row(profile_id, skill_names(skills or legacy_skills), work_modes, employment_types,
+                              has_workvisa, is_available, is_parsed)
+                if self.synced_at is None or updated_at > self.synced_at:
+                    self.synced_at = updated_at
+        return self
+
+    # Scoring
+
+    def skill_columns(self, skill):
+        """Vocabulary columns matching an expanded skill: the same term, or a term containing it as whole words."""
+        skill = skill.lower().strip()
+        columns = self._column_cache.get(skill)
+        if columns is None:
+            padded = f" {skill} "
+            columns = [column for term, column in self.skill_vocab.items() if term == skill or padded in f" {term} "]
+            self._column_cache[skill] = columns
+        return columns
+
+    def skill_matches(self, skills):
+        """Yields (skill, per-row 0/1 match vector) for each distinct skill found in the vocabulary."""
+        nbytes = (self.size + 7) // 8
+        for skill in {s.lower().strip() for s in skills if s and s.strip()}:
+            columns = self.skill_columns(skill)
+            if columns:
+                matched = np.bitwise_or.reduce(self.skill_bits[columns, :nbytes], axis=0)
+                yield skill, np.unpackbits(matched, count=self.size)
+
+    def skill_overlap(self, skills):
+        """Per-row count of the given skills found among the candidate's skill terms."""
+        overlap = np.zeros(self.size, dtype=np.int32)
+        for _, matched in self.skill_matches(skills):
+            overlap += matched
+        return overlap
+
+    def bm25_scores(self, skills, k1=1.2, b=0.75):
+        """
+        Okapi BM25 of every row for the given skills, with binary term frequencies (a skill is listed or not):
+        rare skills weigh more (idf) and long skill lists are normalized towards the average length.
+        """
+        scores = np.zeros(self.size, dtype=np.float32)
+        if not self.size:
+            return scores
+        parsed = self.is_parsed[:self.size]
+        lengths = self.skill_count[:self.size].astype(np.float32)
+        average_length = lengths[parsed].mean() if parsed.any() else 0.0
+        documents = max(int(parsed.sum()), 1)
+        for _, matched in self.skill_matches(skills):
+            frequency = int(matched[parsed].sum())
+            scores += matched * np.float32(np.log(1 + (documents - frequency + 0.5) / (frequency + 0.5)))
+        if average_length > 0:
+            scores *= (k1 + 1) / (1 + k1 * (1 - b + b * lengths / average_length))
+        return scores
+
+    def preference_match(self, vocab, onehot, value):
+        column = vocab.get(str(value).lower().strip()) if value else None
+        if column is None:
+            return np.zeros(self.size, dtype=np.int32)
+        return onehot[:self.size, column].astype(np.int32)
+
+    def heuristic_scores(self, skills, work_mode=None, employment_type=None):
+        """skill_overlap * 3 + work_mode_bonus + employment_bonus for every row."""
+        return (
+            self.skill_overlap(skills) * 3
+            + self.preference_match(self.work_mode_vocab, self.work_mode_onehot, work_mode)
+            + self.preference_match(self.employment_vocab, self.employment_onehot, employment_type)
+        )
+
+    def eligible_mask(self, visa_required=False):
+        """Rows for available, parsed profiles (with a work visa when the job requires one)."""
+        mask = self.is_available[:self.size] & self.is_parsed[:self.size]
+        if visa_required:
+            mask &= self.has_workvisa[:self.size]
+        return mask
+
+
+_matrix = None
+_matrix_lock = threading.Lock()
+
+
+def get_feature_matrix():
+    """Returns this process's feature matrix, built on first use and refreshed incrementally after that."""
+    global _matrix
+    with _matrix_lock:
+        if _matrix is None:
+            _matrix = CandidateFeatureMatrix()
+    return _matrix.refresh()
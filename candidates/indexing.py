@@ -0,0 +1,15 @@
+from .embeddings import embed_candidate
+from .search import update_search_document
+
+
+def index_candidate_profile(profile):
+    """
+    Refreshes the derived search structures of a freshly parsed profile: the full-text
+    search document and the ranking prefilter's embedding. A failure here is logged
+    and must not fail the parse, the backfill commands can catch up later.
+    """
+    for name, index in (("Search document", update_search_document), ("Embedding", embed_candidate)):
+        try:
+            index(profile)
+        except Exception as e:
+            print(f"{name} indexing failed for candidate {profile.id}: {str(e)}")
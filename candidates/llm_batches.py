@@ -0,0 +1,120 @@
+"""
+Lifecycle of an LLMBatchRun (see backends.batch).
+
+A run's requests are written to a JSONL file and submitted to the configured batch backend. Polls
+check the batch; once it is final, its result lines are handed to the kind's apply function
+(candidates.batch_parsing, main.batch_ranking) by exactly one poller, and the run's tokens and cost
+are recorded at batch prices.
+"""
+import os
+
+from django.utils import timezone
+
+from backends.batch import FINAL_STATUSES, get_batch_backend, write_requests
+from backends.metrics import llm_cost, record_llm_batch_results
+from .models import LLMBatchRun
+
+# Metrics call_site of each run kind's requests
+CALL_SITES = {
+    'parse': 'resume_parse_batch_api',
+    'rank': 'ranking_batch_api',
+}
+
+
+def create_run(kind, model=''):
+    return LLMBatchRun.objects.create(kind=kind, backend=get_batch_backend().name, model=model)
+
+
+def submit_run(run, lines, endpoint):
+    """Writes the request `lines` to the run's input file and submits it as one batch."""
+    backend = get_batch_backend()
+    run.input_file = os.path.join(backend.directory, f"run-{run.id}-{run.kind}.jsonl")
+    run.request_count = write_requests(run.input_file, lines)
+    run.batch_id = backend.submit(run.input_file, endpoint, metadata={"run": str(run.id), "kind": run.kind})
+    run.status, run.batch_status, run.submitted_at = 'submitted', 'validating', timezone.now()
+    run.save()
+    print(f"Submitted LLM batch run {run.id}: {run.request_count} {run.kind} requests as {run.batch_id}")
+    return run
+
+
+def finish_run(run, error=''):
+    run.status = 'failed' if error else 'completed'
+    run.error = error
+    run.finished_at = timezone.now()
+    run.save()
+
+
+def body_usage(body):
+    """(input, output) tokens of a response body (responses or chat completions usage)."""
+    usage = (body or {}).get("usage") or {}
+    input_tokens = usage.get("input_tokens") or usage.get("prompt_tokens") or 0
+    output_tokens = usage.get("output_tokens") or usage.get("completion_tokens") or 0
+    return input_tokens, output_tokens
+
+
+def count_result(run, body=None, failed=False):
+    """
+    Counts one result on the run: a success with its response `body`, or a failure (failed requests
+    have no body and are not billed; an answer we couldn't use still is).
+    Returns the request's (input tokens, output tokens, cost).
+    """
+    if body is None:
+        run.failed_count += 1
+        return 0, 0, 0.0
+    input_tokens, output_tokens = body_usage(body)
+    cost = llm_cost(body.get("model") or run.model, input_tokens, output_tokens, batch=True)
+    if failed:
+        run.failed_count += 1
+    else:
+        run.succeeded_count += 1
+    run.input_tokens += input_tokens
+    run.output_tokens += output_tokens
+    run.cost += cost
+    return input_tokens, output_tokens, cost
+
+
+def poll_run(run_id, apply_results):
+    """
+    Checks a submitted run. Once its batch is final, `apply_results(run, results)` gets the result
+    lines by custom_id (requests without one were not answered) and the run is closed.
+    Returns True while the batch is still pending.
+    """
+    run = LLMBatchRun.objects.get(id=run_id)
+    if run.status != 'submitted':
+        return False
+    backend = get_batch_backend()
+    if run.backend != backend.name:
+        raise ValueError(f"LLM batch run {run.id} was submitted to {run.backend}, not {backend.name}")
+
+    state = backend.retrieve(run.batch_id)
+    LLMBatchRun.objects.filter(id=run.id).update(batch_status=state["status"], updated_at=timezone.now())
+    if state["status"] not in FINAL_STATUSES:
+        return True
+
+    # Only one poller applies the results
+    if not LLMBatchRun.objects.filter(id=run.id, status='submitted').update(status='applying', updated_at=timezone.now()):
+        return False
+    run.refresh_from_db()
+    results = {line["custom_id"]: line for line in backend.results(run.batch_id)}
+    try:
+        apply_results(run, results)
+    except Exception as e:
+        print(f"Applying LLM batch run {run.id} failed: {str(e)}")
+        finish_run(run, f"Applying results failed: {str(e)}")
+        raise
+
+    error = ''
+    if state["status"] != 'completed':
+        error = f"Batch {state['status']}" + (f": {state['error']}" if state.get("error") else "")
+    finish_run(run, error)
+    record_llm_batch_results(CALL_SITES[run.kind], run.model, run.succeeded_count, run.failed_count,
+                             run.input_tokens, run.output_tokens)
+    print(f"LLM batch run {run.id} {run.status}: {run.succeeded_count} succeeded, {run.failed_count} failed, "
+          f"{run.input_tokens + run.output_tokens} tokens, ${run.cost:.4f}")
+    return False
+
+
+def cancel_run(run):
+    """Cancels a submitted run's batch; its results so far are applied by the next poll."""
+    if run.status == 'submitted':
+        get_batch_backend().cancel(run.batch_id)
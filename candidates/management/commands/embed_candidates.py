@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from candidates.embeddings import embed_candidates, get_embedder
+from candidates.models import CandidateProfile
+
+
+class Command(BaseCommand):
+    help = "Backfills resume embeddings for parsed candidate profiles"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-embed profiles that already have a vector")
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        embedder = get_embedder()
+        profiles = CandidateProfile.objects.filter(resume_data__isnull=False).only('id', 'resume_data').order_by('id')
+        if not options['all']:
+            profiles = profiles.exclude(embedding__embedder=embedder.name)
+
+        batch, total = [], 0
+        for profile in profiles.iterator(chunk_size=options['batch_size']):
+            batch.append(profile)
+            if len(batch) >= options['batch_size']:
+                total += embed_candidates(batch, embedder)
+                batch = []
+                self.stdout.write(f"Embedded {total} profiles")
+        total += embed_candidates(batch, embedder)
+
+        self.stdout.write(self.style.SUCCESS(f"Embedded {total} profiles with {embedder.name}"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from candidates.models import CandidateProfile
+from candidates.search import update_search_documents
+
+
+class Command(BaseCommand):
+    help = "Backfills the full-text search document of parsed candidate profiles"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Rebuild documents that already exist")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        profiles = CandidateProfile.objects.filter(resume_data__isnull=False).only('id', 'resume_data').order_by('id')
+        if not options['all']:
+            profiles = profiles.filter(search_document__isnull=True)
+
+        batch, total = [], 0
+        for profile in profiles.iterator(chunk_size=options['batch_size']):
+            batch.append(profile)
+            if len(batch) >= options['batch_size']:
+                total += update_search_documents(batch)
+                batch = []
+                self.stdout.write(f"Indexed {total} profiles")
+        total += update_search_documents(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} profiles"))
@@ -0,0 +1,92 @@
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from candidates.bulk_ingest import (
+    add_directory_items, add_manifest_items, add_zip_items, create_import, parse_manifest, run_import, start_import,
+    validate_manifest_keys,
+)
+from candidates.models import ResumeImport
+from organization.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-imports resumes as candidate profiles from a directory of PDFs, a zip archive or a manifest "
+        "file of storage keys (one `key[,email]` per line). Re-running with --resume continues an import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', nargs='?', help="Directory, .zip file or manifest file")
+        parser.add_argument('--manifest', action='store_true', help="Treat `source` as a manifest of storage keys")
+        parser.add_argument('--organization', type=int, default=None, help="Organization id the candidates belong to")
+        parser.add_argument('--concurrency', type=int, default=None, help="Batches processed at the same time")
+        parser.add_argument('--resume', type=int, default=None, metavar='IMPORT_ID', help="Continue an earlier import")
+        parser.add_argument('--retry-failed', action='store_true', help="With --resume, retry resumes that failed")
+        parser.add_argument('--inline', action='store_true', help="Process in this process instead of Celery workers")
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            resume_import = ResumeImport.objects.filter(id=options['resume']).first()
+            if resume_import is None:
+                raise CommandError(f"No resume import {options['resume']}")
+            # A directory or zip import that was interrupted while collecting files picks up where it stopped
+            if resume_import.source_type == 'directory':
+                add_directory_items(resume_import, resume_import.source)
+            elif resume_import.source_type == 'zip':
+                add_zip_items(resume_import, resume_import.source)
+        else:
+            resume_import = self.create(options)
+
+        self.stdout.write(f"Import {resume_import.id}: {resume_import.total} resumes")
+        if options['inline']:
+            run_import(resume_import, retry_failed=options['retry_failed'])
+            resume_import.refresh_from_db()
+            self.stdout.write(self.style.SUCCESS(
+                f"Import {resume_import.id} {resume_import.status}: {resume_import.created_count} created, "
+                f"{resume_import.duplicate_count} duplicates, {resume_import.failed_count} failed, "
+                f"{resume_import.cache_hits} parse cache hits"
+            ))
+            return
+
+        lanes = start_import(resume_import, restart=bool(options['resume']), retry_failed=options['retry_failed'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Import {resume_import.id} queued on {lanes} lanes; follow it at /candidates/imports/{resume_import.id}/"
+        ))
+
+    def create(self, options):
+        if not options['source']:
+            raise CommandError("Give a source, or --resume an earlier import")
+        source = Path(options['source']).resolve()
+        organization = None
+        if options['organization']:
+            organization = Organization.objects.filter(id=options['organization']).first()
+            if organization is None:
+                raise CommandError(f"No organization {options['organization']}")
+
+        if options['manifest']:
+            source_type = 'manifest'
+        elif source.is_dir():
+            source_type = 'directory'
+        elif source.suffix.lower() == '.zip':
+            source_type = 'zip'
+        else:
+            raise CommandError(f"{source} is not a directory or a .zip file (use --manifest for manifests)")
+
+        if source_type == 'manifest':
+            with open(source) as f:
+                entries = parse_manifest(f)
+            try:
+                validate_manifest_keys(entries)
+            except ValidationError as e:
+                raise CommandError(e.messages[0])
+
+        resume_import = create_import(source_type, str(source), organization, max_concurrency=options['concurrency'])
+        if source_type == 'manifest':
+            add_manifest_items(resume_import, entries)
+        elif source_type == 'directory':
+            add_directory_items(resume_import, source)
+        else:
+            add_zip_items(resume_import, source)
+        return resume_import
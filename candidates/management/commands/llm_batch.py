@@ -0,0 +1,82 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from candidates.batch_parsing import apply_parse_results, submit_parse_batch
+from candidates.llm_batches import cancel_run, poll_run
+from candidates.models import LLMBatchRun
+
+
+class Command(BaseCommand):
+    help = (
+        "Offline Batch API mode: `parse` submits the queued resume parses, `rank` the final-tier scoring of "
+        "job posts (default: never ranked ones) as one batch at batch prices. `poll` checks submitted runs "
+        "and applies the results of finished ones, `status` lists runs, `cancel` cancels one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['parse', 'rank', 'poll', 'status', 'cancel'])
+        parser.add_argument('runs', nargs='*', type=int, metavar='RUN_ID', help="Runs to poll or cancel (default: all submitted)")
+        parser.add_argument('--limit', type=int, default=None, help="Profiles / jobs per batch (default: LLM_BATCH_MAX_REQUESTS)")
+        parser.add_argument('--jobs', type=int, nargs='+', default=None, help="Job post ids to rank")
+        parser.add_argument('--wait', action='store_true', help="Keep polling until the runs are done")
+        parser.add_argument('--interval', type=int, default=None, help="Seconds between polls with --wait (default: LLM_BATCH_POLL_INTERVAL)")
+
+    def handle(self, *args, **options):
+        action = options['action']
+        if action == 'status':
+            for run in LLMBatchRun.objects.all()[:20]:
+                self.stdout.write(self.describe(run))
+            return
+        if action == 'cancel':
+            for run in LLMBatchRun.objects.filter(id__in=options['runs']):
+                cancel_run(run)
+                self.stdout.write(f"Cancelled run {run.id}; poll it to apply the results it got")
+            return
+
+        if action in ('parse', 'rank'):
+            run = self.submit(action, options)
+            if run is None:
+                self.stdout.write("Nothing queued")
+                return
+            self.stdout.write(self.describe(run))
+            run_ids = [run.id] if run.status == 'submitted' and options['wait'] else []
+        else:
+            run_ids = options['runs'] or list(LLMBatchRun.objects.filter(status='submitted').values_list('id', flat=True))
+
+        interval = options['interval'] if options['interval'] is not None else settings.LLM_BATCH_POLL_INTERVAL
+        while run_ids:
+            run_ids = [run_id for run_id in run_ids if self.poll(run_id)]
+            if not options['wait'] or not run_ids:
+                break
+            time.sleep(interval)
+
+    def submit(self, action, options):
+        if action == 'parse':
+            return submit_parse_batch(limit=options['limit'])
+        from main.batch_ranking import submit_ranking_batch
+
+        return submit_ranking_batch(options['jobs'], limit=options['limit'])
+
+    def poll(self, run_id):
+        run = LLMBatchRun.objects.filter(id=run_id).first()
+        if run is None:
+            raise CommandError(f"No LLM batch run {run_id}")
+        if run.kind == 'parse':
+            apply_results = apply_parse_results
+        else:
+            from main.batch_ranking import apply_ranking_results
+
+            apply_results = apply_ranking_results
+        pending = poll_run(run_id, apply_results)
+        run.refresh_from_db()
+        self.stdout.write(self.describe(run))
+        return pending
+
+    def describe(self, run):
+        return (
+            f"Run {run.id} [{run.kind}] {run.status} (batch {run.batch_id or '-'}: {run.batch_status or '-'}): "
+            f"{run.request_count} requests, {run.succeeded_count} succeeded, {run.failed_count} failed, "
+            f"{run.input_tokens + run.output_tokens} tokens, ${run.cost:.4f}" + (f" - {run.error}" if run.error else "")
+        )
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 14:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0002_candidateprofile_candidates__is_avai_2939fb_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('embedder', models.CharField(help_text='Name of the embedder that produced the vector', max_length=100)),
+                ('dimensions', models.PositiveIntegerField()),
+                ('vector', models.BinaryField(help_text='L2-normalized float32 vector bytes')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='embedding', to='candidates.candidateprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['embedder', 'updated_at'], name='candidates__embedde_57b0f7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 14:49
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0004_candidateprofile_updated_at_and_more'),
+        ('organization', '0003_alter_organization_industry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidateprofile',
+            name='search_document',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Weighted full-text document of the parsed resume (see candidates.search)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='candidateprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='candidate_search_document_gin'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0006_candidateprofile_structured_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidateprofile',
+            name='parsing_task_id',
+            field=models.CharField(blank=True, help_text='Celery task ID for tracking', max_length=255, null=True),
+        ),
+    ]
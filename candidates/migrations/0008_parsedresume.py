@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0007_candidateprofile_parsing_task_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParsedResume',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(help_text='SHA-256 of the PDF bytes', max_length=64)),
+                ('parser_version', models.CharField(max_length=20)),
+                ('data', models.JSONField(help_text='ResumeData as returned by the parser')),
+                ('hits', models.PositiveIntegerField(default=0, help_text='Parses served from this entry')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_used_at'], name='candidates__last_us_3bd70e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('content_hash', 'parser_version'), name='unique_parsed_resume_version')],
+            },
+        ),
+    ]
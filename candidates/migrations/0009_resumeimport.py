@@ -0,0 +1,59 @@
+# Generated by Django 5.2 on 2026-10-18 15:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0008_parsedresume'),
+        ('organization', '0003_alter_organization_industry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumeImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(choices=[('directory', 'Directory'), ('zip', 'Zip archive'), ('manifest', 'Manifest of storage keys')], max_length=20)),
+                ('source', models.TextField(help_text='Directory path, stored zip name or manifest description')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('preparing', 'Collecting Files'), ('running', 'Ingesting'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+                ('max_concurrency', models.PositiveSmallIntegerField(default=2, help_text='Batches of this import processed at the same time')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('created_count', models.PositiveIntegerField(default=0, help_text='Candidate profiles created')),
+                ('duplicate_count', models.PositiveIntegerField(default=0, help_text='Resumes of candidates that already had a profile')),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('cache_hits', models.PositiveIntegerField(default=0, help_text='Resumes served from the parse cache')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='organization.organization')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumeImportItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_key', models.CharField(help_text="Path of the file within the import's source", max_length=500)),
+                ('file_name', models.CharField(help_text='Name of the resume in default_storage', max_length=500)),
+                ('email', models.EmailField(blank=True, default='', help_text='Candidate email from the manifest, if given', max_length=254)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('created', 'Profile Created'), ('duplicate', 'Candidate Already Exists'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('content_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('error', models.TextField(blank=True, default='')),
+                ('profile', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='candidates.candidateprofile')),
+                ('resume_import', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='candidates.resumeimport')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['resume_import', 'status'], name='candidates__resume__1f98a6_idx')],
+                'constraints': [models.UniqueConstraint(fields=('resume_import', 'source_key'), name='unique_resume_import_item')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-18 15:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0009_resumeimport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMBatchRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('parse', 'Resume Parsing'), ('rank', 'Candidate Ranking')], max_length=20)),
+                ('status', models.CharField(choices=[('preparing', 'Writing Requests'), ('submitted', 'Submitted'), ('applying', 'Applying Results'), ('completed', 'Completed'), ('failed', 'Failed')], default='preparing', max_length=20)),
+                ('backend', models.CharField(help_text='Batch backend the run was submitted to', max_length=100)),
+                ('batch_id', models.CharField(blank=True, default='', help_text="The backend's batch id", max_length=255)),
+                ('batch_status', models.CharField(blank=True, default='', help_text='Last status reported by the backend', max_length=20)),
+                ('input_file', models.CharField(blank=True, default='', help_text='Path of the JSONL request file', max_length=500)),
+                ('model', models.CharField(blank=True, default='', max_length=100)),
+                ('items', models.JSONField(default=dict, help_text='What each request answers, by custom_id')),
+                ('context', models.JSONField(default=dict, help_text='State needed to apply the results (e.g. per-job ranking runs)')),
+                ('error', models.TextField(blank=True, default='')),
+                ('request_count', models.PositiveIntegerField(default=0)),
+                ('succeeded_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('input_tokens', models.PositiveIntegerField(default=0)),
+                ('output_tokens', models.PositiveIntegerField(default=0)),
+                ('cost', models.FloatField(default=0, help_text='Estimated spend at batch prices')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status'], name='candidates__status_001aa5_idx')],
+            },
+        ),
+    ]
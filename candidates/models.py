@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.text import slugify
 from django.core.validators import FileExtensionValidator
 from organization.models import Organization
@@ -7,6 +9,7 @@ import uuid
 from openai import OpenAI
 from dotenv import load_dotenv
 from users.models import User
+from backends.llm import llm_call
 
 load_dotenv()
 client= OpenAI()
@@ -26,6 +29,11 @@ DISCLOSURE_PREFERENCE= (
     ("AFTER_STARTING_WORK", "AFTER_STARTING_WORK"),
     ("NOT_APPLICABLE", "NOT_APPLICABLE")
 )
+def candidate_slug(resume_file_name):
+    """Unique profile slug: the resume file name plus a short random suffix."""
+    return f"{slugify(resume_file_name)}-{str(uuid.uuid4())[:8]}"
+
+
 class CandidateProfile(models.Model):
     PARSING_STATUS = (
         ('not_parsed', 'Not Parsed'),
@@ -40,6 +48,7 @@ class CandidateProfile(models.Model):
     willing_to_relocate= models.BooleanField(default=True)
     slug= models.SlugField(max_length=255, unique=True, blank=True)
     parsing_status = models.CharField(max_length=20, choices=PARSING_STATUS, default='not_parsed')
+    parsing_task_id = models.CharField(max_length=255, blank=True, null=True, help_text="Celery task ID for tracking")
 
     employment_type_preferences= models.JSONField(default=list, help_text="Array of employment types like ['Full-time', 'Part-time', 'Contract']")
     work_mode_preferences= models.JSONField(default=list, help_text="Array of work modes like ['Remote', 'On-site', 'Hybrid']")
@@ -53,6 +62,8 @@ class CandidateProfile(models.Model):
     video_pitch_url = models.FileField(upload_to='Candidates-VideoPitches', validators=[FileExtensionValidator(allowed_extensions=['mp4','mov','wmv','avi','avchd','flv','f4v','swf','mkv'])],
                                        null=True, blank=True)
     is_available = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    search_document = SearchVectorField(null=True, editable=False, help_text="Weighted full-text document of the parsed resume (see candidates.search)")
 
     def __str__(self):
         return f"Candidate {self.user.email} Profile"
@@ -64,9 +75,7 @@ class CandidateProfile(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.resume_file.name)
-            unique_id = str(uuid.uuid4())[:8] 
-            self.slug = f"{base_slug}-{unique_id}"
+            self.slug = candidate_slug(self.resume_file.name)
         super().save(*args, **kwargs)
     
     class Meta:
@@ -76,6 +85,177 @@ class CandidateProfile(models.Model):
             models.Index(fields=['has_workvisa']),
             models.Index(fields=['slug']),
             models.Index(fields=['user']),
+            models.Index(fields=['updated_at']),
+            GinIndex(fields=['search_document'], name='candidate_search_document_gin'),
+            # jsonb_path_ops GIN indexes serve the structured search's @> containment filters
+            GinIndex(fields=['work_mode_preferences'], name='candidate_work_mode_gin', opclasses=['jsonb_path_ops']),
+            GinIndex(fields=['employment_type_preferences'], name='candidate_employment_type_gin', opclasses=['jsonb_path_ops']),
+            GinIndex(fields=['disability_categories'], name='candidate_disability_gin', opclasses=['jsonb_path_ops']),
+            GinIndex(fields=['workplace_accommodations'], name='candidate_accommodations_gin', opclasses=['jsonb_path_ops']),
+            models.Index(fields=['accommodation_needs'], name='candidate_accommodation_idx'),
+        ]
+
+
+class CandidateEmbedding(models.Model):
+    profile= models.OneToOneField(CandidateProfile, on_delete=models.CASCADE, related_name='embedding')
+    embedder= models.CharField(max_length=100, help_text="Name of the embedder that produced the vector")
+    dimensions= models.PositiveIntegerField()
+    vector= models.BinaryField(help_text="L2-normalized float32 vector bytes")
+    updated_at= models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Embedding for candidate {self.profile_id}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['embedder', 'updated_at']),
+        ]
+
+
+class ParsedResume(models.Model):
+    """Structured parse of a resume PDF, shared by every upload of the same bytes (see candidates.parse_cache)."""
+    content_hash= models.CharField(max_length=64, help_text="SHA-256 of the PDF bytes")
+    parser_version= models.CharField(max_length=20)
+    data= models.JSONField(help_text="ResumeData as returned by the parser")
+    hits= models.PositiveIntegerField(default=0, help_text="Parses served from this entry")
+    created_at= models.DateTimeField(auto_now_add=True)
+    last_used_at= models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Parsed resume {self.content_hash[:12]} (v{self.parser_version})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['content_hash', 'parser_version'], name='unique_parsed_resume_version'),
+        ]
+        indexes = [
+            models.Index(fields=['last_used_at']),
+        ]
+
+
+class ResumeImport(models.Model):
+    """A bulk ingestion of resumes (see candidates.bulk_ingest); progress is counted per item."""
+    SOURCE_TYPES = (
+        ('directory', 'Directory'),
+        ('zip', 'Zip archive'),
+        ('manifest', 'Manifest of storage keys'),
+    )
+    STATUS = (
+        ('pending', 'Pending'),
+        ('preparing', 'Collecting Files'),
+        ('running', 'Ingesting'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    organization= models.ForeignKey(Organization, on_delete=models.CASCADE, blank=True, null=True)
+    created_by= models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True)
+    source_type= models.CharField(max_length=20, choices=SOURCE_TYPES)
+    source= models.TextField(help_text="Directory path, stored zip name or manifest description")
+    status= models.CharField(max_length=20, choices=STATUS, default='pending')
+    error= models.TextField(blank=True, default='')
+    max_concurrency= models.PositiveSmallIntegerField(default=2, help_text="Batches of this import processed at the same time")
+
+    total= models.PositiveIntegerField(default=0)
+    created_count= models.PositiveIntegerField(default=0, help_text="Candidate profiles created")
+    duplicate_count= models.PositiveIntegerField(default=0, help_text="Resumes of candidates that already had a profile")
+    failed_count= models.PositiveIntegerField(default=0)
+    cache_hits= models.PositiveIntegerField(default=0, help_text="Resumes served from the parse cache")
+
+    created_at= models.DateTimeField(auto_now_add=True)
+    updated_at= models.DateTimeField(auto_now=True)
+    finished_at= models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Resume import {self.id} ({self.source_type})"
+
+    @property
+    def processed(self):
+        return self.created_count + self.duplicate_count + self.failed_count
+
+    class Meta:
+        ordering= ['-created_at']
+
+
+class ResumeImportItem(models.Model):
+    STATUS = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('created', 'Profile Created'),
+        ('duplicate', 'Candidate Already Exists'),
+        ('failed', 'Failed'),
+    )
+    resume_import= models.ForeignKey(ResumeImport, on_delete=models.CASCADE, related_name='items')
+    source_key= models.CharField(max_length=500, help_text="Path of the file within the import's source")
+    file_name= models.CharField(max_length=500, help_text="Name of the resume in default_storage")
+    email= models.EmailField(blank=True, default='', help_text="Candidate email from the manifest, if given")
+    status= models.CharField(max_length=20, choices=STATUS, default='pending')
+    content_hash= models.CharField(max_length=64, blank=True, default='')
+    profile= models.ForeignKey(CandidateProfile, on_delete=models.SET_NULL, blank=True, null=True)
+    error= models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return self.source_key
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['resume_import', 'source_key'], name='unique_resume_import_item'),
+        ]
+        indexes = [
+            models.Index(fields=['resume_import', 'status']),
+        ]
+
+
+class LLMBatchRun(models.Model):
+    """
+    One Batch API submission (see backends.batch): queued resume parses or job ranking scores,
+    answered offline at batch prices and fanned back into the profiles / rankings.
+    """
+    KINDS = (
+        ('parse', 'Resume Parsing'),
+        ('rank', 'Candidate Ranking'),
+    )
+    STATUS = (
+        ('preparing', 'Writing Requests'),
+        ('submitted', 'Submitted'),
+        ('applying', 'Applying Results'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    kind= models.CharField(max_length=20, choices=KINDS)
+    status= models.CharField(max_length=20, choices=STATUS, default='preparing')
+    backend= models.CharField(max_length=100, help_text="Batch backend the run was submitted to")
+    batch_id= models.CharField(max_length=255, blank=True, default='', help_text="The backend's batch id")
+    batch_status= models.CharField(max_length=20, blank=True, default='', help_text="Last status reported by the backend")
+    input_file= models.CharField(max_length=500, blank=True, default='', help_text="Path of the JSONL request file")
+    model= models.CharField(max_length=100, blank=True, default='')
+    items= models.JSONField(default=dict, help_text="What each request answers, by custom_id")
+    context= models.JSONField(default=dict, help_text="State needed to apply the results (e.g. per-job ranking runs)")
+    error= models.TextField(blank=True, default='')
+
+    request_count= models.PositiveIntegerField(default=0)
+    succeeded_count= models.PositiveIntegerField(default=0)
+    failed_count= models.PositiveIntegerField(default=0)
+    input_tokens= models.PositiveIntegerField(default=0)
+    output_tokens= models.PositiveIntegerField(default=0)
+    cost= models.FloatField(default=0, help_text="Estimated spend at batch prices")
+
+    created_at= models.DateTimeField(auto_now_add=True)
+    updated_at= models.DateTimeField(auto_now=True)
+    submitted_at= models.DateTimeField(blank=True, null=True)
+    finished_at= models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"LLM batch run {self.id} ({self.kind})"
+
+    @property
+    def tag(self):
+        """Stored as the claimed profiles' parsing_task_id / jobs' ranking_task_id while the run owns them."""
+        return f"batch-{self.id}"
+
+    class Meta:
+        ordering= ['-created_at']
+        indexes = [
+            models.Index(fields=['status']),
         ]
 
 
@@ -124,7 +304,8 @@ def get_resume_context(resume_slug: str, user_query: str, thread_id=None, messag
     messages.append({"role": "user", "content": user_query})
     
     # Get response from LLM
-    response = client.chat.completions.create(
+    response = llm_call(
+        "resume_chat", client.chat.completions.create,
         model="gpt-5",
         messages=messages
     )
@@ -168,7 +349,8 @@ def get_career_coach(resume_slug: str, user_query: str, thread_id=None, messages
     messages.append({"role": "user", "content": user_query})
     
     # Get response from LLM
-    response = client.chat.completions.create(
+    response = llm_call(
+        "career_coach", client.chat.completions.create,
         model="gpt-5",
         messages=messages
     )
@@ -0,0 +1,77 @@
+"""
+Content-addressed cache of resume parses.
+
+Re-uploads of the same PDF (a recruiter re-adding a candidate, a candidate uploading again) are
+common, so parses are stored by SHA-256 of the PDF bytes plus resume_parser.PARSER_VERSION. A hit
+skips both the PDF text extraction and the LLM call; bumping the parser version retires every
+entry at once.
+"""
+import hashlib
+
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from backends.metrics import RESUME_PARSE_CACHE
+from .models import CandidateProfile, ParsedResume
+from .resume_parser import PARSER_VERSION, ResumeData, extract_structured_data, extract_text_from_bytes, resume_bytes
+
+
+def resume_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def cached_parse(digest, version=PARSER_VERSION):
+    """The cached ResumeData for these PDF bytes, counting the hit; None on a miss."""
+    entry = ParsedResume.objects.filter(content_hash=digest, parser_version=version).only('id', 'data').first()
+    if entry is None:
+        return None
+    ParsedResume.objects.filter(id=entry.id).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    return ResumeData.model_validate(entry.data)
+
+
+def store_parse(digest, parsed, version=PARSER_VERSION):
+    # A concurrent parse of the same bytes may have stored it first; either copy is equally good
+    ParsedResume.objects.get_or_create(
+        content_hash=digest, parser_version=version, defaults={'data': parsed.model_dump()}
+    )
+
+
+def parse_resume_cached(file_name, storage=None):
+    """
+    parse_resume_file() through the cache. Returns (ResumeData, cache_hit). The PDF is read
+    (and hashed) once; on a miss its text is extracted from the same buffer.
+    """
+    with resume_bytes(file_name, storage) as data:
+        digest = resume_digest(data)
+        parsed = cached_parse(digest)
+        if parsed is None:
+            text = extract_text_from_bytes(data)
+
+    RESUME_PARSE_CACHE.inc(result="hit" if parsed is not None else "miss")
+    if parsed is not None:
+        print(f"Parse cache hit for {file_name} ({digest[:12]})")
+        return parsed, True
+
+    parsed = extract_structured_data(text)
+    store_parse(digest, parsed)
+    return parsed, False
+
+
+def parse_cache_stats():
+    """
+    Parse statistics: profiles per parsing status plus the cache's size and hit rate. Every entry
+    was created by one miss, so misses are counted as entries (concurrent duplicate misses aside).
+    """
+    cache = ParsedResume.objects.filter(parser_version=PARSER_VERSION).aggregate(entries=Count('id'), hits=Sum('hits'))
+    hits, misses = cache['hits'] or 0, cache['entries']
+    statuses = dict(CandidateProfile.objects.values_list('parsing_status').annotate(count=Count('id')).order_by())
+    return {
+        'parsing_status': statuses,
+        'cache': {
+            'parser_version': PARSER_VERSION,
+            'entries': cache['entries'],
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        },
+    }
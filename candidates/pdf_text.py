@@ -0,0 +1,163 @@
+"""
+PDF text extraction for resume parsing.
+
+Page texts are collected in a list and joined once (linear in the document size), separated by
+PAGE_BREAK so the condenser can tell running headers and footers from body text, and extraction
+stops as soon as a character budget is met: the condenser (candidates.resume_condenser) keeps only
+RESUME_TOKEN_BUDGET tokens of it, so MAX_RESUME_CHARS is a generous cap rather than a cut.
+Documents of PDF_PARALLEL_MIN_PAGES pages or more are split into page ranges extracted by a process
+pool (PyMuPDF holds the GIL, so threads would not help); ranges are consumed in page order, so the
+budget stop still applies.
+
+This module only depends on PyMuPDF at import time: pool workers are spawned and import it alone.
+"""
+import multiprocessing
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import fitz
+
+# Characters of resume text extracted for the condenser; several times its token budget, so sections
+# late in long resumes are still seen
+MAX_RESUME_CHARS = 40000
+# Between the texts of consecutive pages (a form feed, as pdftotext writes)
+PAGE_BREAK = "\f"
+
+_pool = None
+
+
+def extract_page_range(doc, start, stop, max_chars=None):
+    """Text of pages [start, stop) of an open document, stopping once `max_chars` characters are collected."""
+    parts, length = [], 0
+    for number in range(start, stop):
+        text = doc.load_page(number).get_text()
+        parts.append(text)
+        length += len(text)
+        if max_chars is not None and length >= max_chars:
+            break
+    return PAGE_BREAK.join(parts)
+
+
+def _extract_range_from_file(path, start, stop, max_chars):
+    # Runs in a pool worker; each worker opens the file itself instead of receiving the bytes
+    doc = fitz.open(path)
+    try:
+        return extract_page_range(doc, start, doc.page_count if stop is None else stop, max_chars)
+    finally:
+        doc.close()
+
+
+def extraction_pool():
+    """Shared process pool (spawned, so it is safe from threaded gunicorn/Celery processes)."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=pool_size(), mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def pool_size():
+    from django.conf import settings
+
+    return settings.PDF_EXTRACT_WORKERS or os.cpu_count() or 1
+
+
+def _reset_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+
+def extract_text_parallel(path, page_count, max_chars=None, chunk_pages=None):
+    """
+    Text of the PDF at `path`, extracted in `chunk_pages`-page ranges by the process pool. At most one
+    range per worker is in flight and results are joined in page order, so once the budget is met
+    little work has been wasted.
+    """
+    from django.conf import settings
+
+    pool, workers = extraction_pool(), pool_size()
+    chunk_pages = chunk_pages or settings.PDF_EXTRACT_CHUNK_PAGES
+    ranges = deque((start, min(start + chunk_pages, page_count)) for start in range(0, page_count, chunk_pages))
+    in_flight = deque()
+    parts, length = [], 0
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < workers:
+                start, stop = ranges.popleft()
+                in_flight.append(pool.submit(_extract_range_from_file, path, start, stop, max_chars))
+            text = in_flight.popleft().result()
+            parts.append(text)
+            length += len(text)
+            if max_chars is not None and length >= max_chars:
+                break
+    finally:
+        for future in in_flight:
+            future.cancel()
+    return PAGE_BREAK.join(parts)
+
+
+def extract_text(doc, data=None, path=None, max_chars=MAX_RESUME_CHARS):
+    """
+    Text of an open document, up to about `max_chars` characters (None extracts everything). Large
+    documents go through the process pool, which needs the file's `path` or its `data`; when the pool
+    can't be used (e.g. from a daemonic worker process) extraction falls back to this process.
+    """
+    from django.conf import settings
+
+    page_count = doc.page_count
+    min_pages = settings.PDF_PARALLEL_MIN_PAGES
+    if not min_pages or page_count < min_pages or (path is None and data is None):
+        return extract_page_range(doc, 0, page_count, max_chars)
+
+    temp_path = None
+    try:
+        if path is None:
+            # Workers get a file to open rather than a pickled copy of the bytes per range
+            fd, temp_path = tempfile.mkstemp(suffix=".pdf")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        return extract_text_parallel(path or temp_path, page_count, max_chars)
+    except (BrokenProcessPool, AssertionError, OSError) as e:
+        print(f"Parallel PDF extraction unavailable, extracting in-process: {str(e)}")
+        _reset_pool()
+        return extract_page_range(doc, 0, page_count, max_chars)
+    finally:
+        if temp_path:
+            os.unlink(temp_path)
+
+
+def extract_files(paths, max_chars=MAX_RESUME_CHARS):
+    """
+    Texts of several PDFs, one pool task per file, in the order given. A file that can't be read
+    yields its exception instead of a text, so one corrupt resume doesn't fail the rest.
+    """
+    def extract_here():
+        results = []
+        for path in paths:
+            try:
+                results.append(_extract_range_from_file(path, 0, None, max_chars))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    if len(paths) < 2:
+        return extract_here()
+    try:
+        futures = [extraction_pool().submit(_extract_range_from_file, path, 0, None, max_chars) for path in paths]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                results.append(e)
+        return results
+    except (BrokenProcessPool, AssertionError, OSError) as e:
+        print(f"Parallel PDF extraction unavailable, extracting in-process: {str(e)}")
+        _reset_pool()
+        return extract_here()
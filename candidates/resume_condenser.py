@@ -0,0 +1,239 @@
+"""
+Section-aware condensing of extracted resume text before LLM extraction.
+
+Cutting the raw text at a fixed length drops whatever comes last, often the skills or experience
+section, while keeping page headers and layout whitespace. condense_resume() instead:
+
+1. normalizes whitespace and drops page numbers and, for resumes over the budget, running page
+   headers/footers (lines repeated at the same edge of several pages)
+2. splits the text into sections by their headings (Experience, Skills, Education, ...)
+3. keeps sections by how much they matter to ResumeData within RESUME_TOKEN_BUDGET tokens
+   (tiktoken), trimming a long section from its end rather than dropping the next one
+
+and reports the tokens saved, so the parse prompt shrinks without losing the fields we extract.
+"""
+import re
+from collections import Counter
+
+import tiktoken
+from django.conf import settings
+
+from backends.metrics import record_resume_condensed
+from .pdf_text import PAGE_BREAK
+
+# Section kinds by keep priority (lower first). "header" is the text before the first heading,
+# which holds the name and contact details.
+SECTION_PRIORITY = {
+    "header": 0,
+    "skills": 1,
+    "experience": 2,
+    "education": 3,
+    "certifications": 4,
+    "summary": 5,
+    "projects": 6,
+    "languages": 7,
+    "awards": 8,
+    "publications": 9,
+    "volunteering": 10,
+    "interests": 11,
+    "references": 12,
+}
+
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "profile", "professional profile", "objective", "career objective",
+                "about", "about me", "overview"),
+    "experience": ("experience", "work experience", "professional experience", "employment", "employment history",
+                   "work history", "career history", "relevant experience", "internships", "internship experience"),
+    "education": ("education", "academic background", "academics", "education and training", "qualifications",
+                  "academic qualifications", "educational qualifications"),
+    "skills": ("skills", "technical skills", "key skills", "core skills", "core competencies", "competencies",
+               "technologies", "tech stack", "tools", "tools and technologies", "areas of expertise", "expertise",
+               "skills and abilities", "soft skills"),
+    "certifications": ("certifications", "certificates", "licenses", "licenses and certifications",
+                       "certifications and licenses", "courses", "training"),
+    "projects": ("projects", "personal projects", "key projects", "academic projects", "selected projects"),
+    "languages": ("languages",),
+    "awards": ("awards", "honors", "honours", "achievements", "awards and honors", "accomplishments"),
+    "publications": ("publications", "research", "patents"),
+    "volunteering": ("volunteering", "volunteer experience", "volunteer work", "community service"),
+    "interests": ("interests", "hobbies", "hobbies and interests", "activities", "extracurricular activities"),
+    "references": ("references", "referees"),
+}
+HEADING_KIND = {heading: kind for kind, headings in SECTION_HEADINGS.items() for heading in headings}
+
+PAGE_NUMBER_RE = re.compile(r"^(page\s*)?\d{1,3}(\s*(of|/)\s*\d{1,3})?$|^-\s*\d{1,3}\s*-$", re.I)
+INLINE_PAGE_NUMBER_RE = re.compile(r"\bpage\s*\d{1,3}(\s*(of|/)\s*\d{1,3})?\b", re.I)
+BULLET_RE = re.compile(r"^[•●▪◦∙·*\-–]\s*")
+HEADING_CLEAN_RE = re.compile(r"[^a-z& ]+")
+SPACES_RE = re.compile(r"[ \t\u00a0\u2000-\u200b\u3000]+")
+# Lines this close to the top or bottom of a page may be running headers/footers...
+PAGE_EDGE_LINES = 2
+# ...when they recur at the same edge of this share of the pages (and at least two); only the first
+# copy is kept, so repeated job titles or bullets in the body are never dropped
+REPEATED_EDGE_MIN_SHARE = 0.5
+# Smallest leftover allowance worth filling with the start of a line that doesn't fit
+MIN_PARTIAL_LINE_TOKENS = 20
+# Share of the budget one section may take before lower-priority sections get theirs
+SECTION_SHARE = 0.5
+
+
+def get_token_encoding():
+    try:
+        return tiktoken.encoding_for_model("gpt-4o")
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def heading_kind(line):
+    """Section kind when `line` is a section heading, else None."""
+    if len(line) > 40:
+        return None
+    key = HEADING_CLEAN_RE.sub("", line.lower().replace("&", " and ")).strip()
+    return HEADING_KIND.get(" ".join(key.split()))
+
+
+def edge_key(line):
+    # Running headers often carry the page number ("Jane Doe - CV   Page 2")
+    return INLINE_PAGE_NUMBER_RE.sub("", line.lower()).strip()
+
+
+def page_edges(pages):
+    """Keys of the lines at the top and at the bottom edge of each page: [(top keys, bottom keys)]."""
+    return [
+        ({edge_key(line) for line in page[:PAGE_EDGE_LINES]}, {edge_key(line) for line in page[-PAGE_EDGE_LINES:]})
+        for page in pages
+    ]
+
+
+def clean_lines(text, drop_repeated=True):
+    """
+    Normalized, non-empty lines without page numbers and, with `drop_repeated`, without the second
+    and later copies of running headers/footers (see REPEATED_EDGE_MIN_SHARE).
+    """
+    pages = []
+    for page in text.split(PAGE_BREAK):
+        lines = (SPACES_RE.sub(" ", raw).strip() for raw in page.splitlines())
+        pages.append([line for line in lines if line and not PAGE_NUMBER_RE.match(line)])
+    pages = [page for page in pages if page]
+    if not drop_repeated or len(pages) < 2:
+        return [line for page in pages for line in page]
+
+    edges = page_edges(pages)
+    min_pages = max(2, int(len(pages) * REPEATED_EDGE_MIN_SHARE))
+    repeated = []
+    for side in (0, 1):
+        counts = Counter(key for page in edges for key in page[side])
+        repeated.append({key for key, count in counts.items() if count >= min_pages})
+    lines, seen = [], set()
+    for page in pages:
+        for position, line in enumerate(page):
+            key = edge_key(line)
+            at_edge = [position < PAGE_EDGE_LINES, position >= len(page) - PAGE_EDGE_LINES]
+            if any(at_edge[side] and key in repeated[side] for side in (0, 1)):
+                if key in seen:
+                    continue
+                seen.add(key)
+            lines.append(line)
+    return lines
+
+
+def split_sections(lines):
+    """[(kind, lines)] in document order; a heading line stays with its section."""
+    sections = [("header", [])]
+    for line in lines:
+        kind = heading_kind(line)
+        if kind is not None:
+            sections.append((kind, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(kind, body) for kind, body in sections if body]
+
+
+def _allocate(section_tokens, budget):
+    """
+    Tokens granted per section: in priority order each gets up to SECTION_SHARE of the budget, then
+    what is left goes to the sections that still want more, again by priority.
+    """
+    order = sorted(range(len(section_tokens)), key=lambda i: (SECTION_PRIORITY[section_tokens[i][0]], i))
+    granted = [0] * len(section_tokens)
+    remaining = budget
+    for cap in (int(budget * SECTION_SHARE), budget):
+        for i in order:
+            want = min(section_tokens[i][1] - granted[i], cap - granted[i], remaining)
+            if want > 0:
+                granted[i] += want
+                remaining -= want
+    return granted
+
+
+def _fit_lines(body, tokens, allowance):
+    """
+    The lines of a section that fit its allowance, in document order, and whether that is all of
+    them. Lines that aren't bullet points (headings, job titles, employers, dates) are kept before
+    bullets, so a trimmed experience section still lists every job. A long paragraph that doesn't
+    fit is cut rather than lost when a useful share of the allowance is left.
+    """
+    if sum(tokens) <= allowance:
+        return body, True
+
+    kept, used = {}, 0
+    for bullets in (False, True):
+        for i, (line, cost) in enumerate(zip(body, tokens)):
+            if i not in kept and bool(BULLET_RE.match(line)) == bullets and used + cost <= allowance:
+                kept[i] = line
+                used += cost
+    if allowance - used >= MIN_PARTIAL_LINE_TOKENS:
+        i = next(i for i in range(len(body)) if i not in kept)
+        kept[i] = body[i][:len(body[i]) * (allowance - used) // tokens[i]]
+    return [kept[i] for i in sorted(kept)], False
+
+
+def condense_resume(text, budget=None, encoding=None):
+    """
+    Returns (condensed_text, report). The report has the document's tokens before and after, the
+    tokens saved and the section kinds that were trimmed or dropped.
+    """
+    budget = budget or settings.RESUME_TOKEN_BUDGET
+    encoding = encoding or get_token_encoding()
+    original_tokens = len(encoding.encode(text))
+    # A resume within the budget is only normalized: nothing is dropped or trimmed
+    within_budget = original_tokens <= budget
+
+    sections = split_sections(clean_lines(text, drop_repeated=not within_budget))
+    line_tokens = [[len(encoding.encode(line)) + 1 for line in body] for _, body in sections]
+    section_tokens = [(kind, sum(tokens)) for (kind, _), tokens in zip(sections, line_tokens)]
+    granted = [tokens for _, tokens in section_tokens] if within_budget else _allocate(section_tokens, budget)
+
+    kept, trimmed, dropped = [], [], []
+    for (kind, body), tokens, allowance in zip(sections, line_tokens, granted):
+        lines, complete = _fit_lines(body, tokens, allowance)
+        if not lines or (len(lines) == 1 and heading_kind(lines[0])):
+            dropped.append(kind)
+            continue
+        if not complete:
+            trimmed.append(kind)
+        kept.append("\n".join(lines))
+
+    condensed = "\n\n".join(kept)
+    condensed_tokens = len(encoding.encode(condensed))
+    report = {
+        "original_tokens": original_tokens,
+        "condensed_tokens": condensed_tokens,
+        "saved_tokens": max(0, original_tokens - condensed_tokens),
+        "sections": [kind for kind, _ in sections],
+        "trimmed": trimmed,
+        "dropped": dropped,
+    }
+    return condensed, report
+
+
+def condense_for_extraction(text):
+    """condense_resume() for the parse prompt: logs and records the tokens saved."""
+    condensed, report = condense_resume(text)
+    record_resume_condensed(report["original_tokens"], report["condensed_tokens"])
+    saved_share = report["saved_tokens"] / report["original_tokens"] if report["original_tokens"] else 0
+    print(f"Condensed resume {report['original_tokens']} -> {report['condensed_tokens']} tokens "
+          f"(saved {report['saved_tokens']}, {saved_share:.0%})"
+          + (f", trimmed {report['trimmed']}" if report["trimmed"] else "")
+          + (f", dropped {report['dropped']}" if report["dropped"] else ""))
+    return condensed, report
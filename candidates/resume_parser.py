@@ -1,29 +1,41 @@
 import fitz  # PyMuPDF - MUCH faster than PyPDF2
+import mmap
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from pydantic import BaseModel
-from io import BytesIO
 from openai import OpenAI
 import requests
+from django.core.files.storage import default_storage
+from backends.llm import llm_call
+from .pdf_text import MAX_RESUME_CHARS, extract_text
+from .resume_condenser import condense_for_extraction
 
 load_dotenv()
 client= OpenAI()
+# Reused across downloads so repeated resume URLs share connections (and TLS sessions)
+http = requests.Session()
 
+# Part of the parse cache key (candidates.parse_cache): bump whenever the extraction, the prompt,
+# the model or ResumeData change so that stale cached parses are not served.
+PARSER_VERSION = "2"
+PARSE_MODEL = "gpt-4o"  # Using gpt-4o instead of non-existent gpt-5
 
 
+
+def extract_text_from_document(doc, data=None, path=None, max_chars=MAX_RESUME_CHARS):
+    """Text of an open PyMuPDF document, up to the LLM's character budget (see pdf_text.extract_text)."""
+    print("Converting PDF...")
+    text = extract_text(doc, data=data, path=path, max_chars=max_chars)
+    print("Extraction complete.")
+    return text
+
 def extract_text_from_pdf(pdf_path):
     """Extract text using PyMuPDF - 5-10x faster than PyPDF2"""
     print(f"Reading {pdf_path}...")
     
     doc = fitz.open(pdf_path)
-    text = ""
-    print("Converting PDF...")
-    
-    for page in doc:
-        text += page.get_text()
-    
+    text = extract_text_from_document(doc, path=pdf_path)
     doc.close()
-    print("Extraction complete.")
-    
     return text
 
 def extract_text_from_pdf_url(pdf_url):
@@ -31,24 +43,63 @@ def extract_text_from_pdf_url(pdf_url):
     print(f"Downloading PDF from {pdf_url}...")
     
     # Download the PDF content with timeout
-    response = requests.get(pdf_url, timeout=30)
+    response = http.get(pdf_url, timeout=30)
     response.raise_for_status()
     
-    # Create a file-like object from the content
-    pdf_file = BytesIO(response.content)
-    
-    # Extract text using PyMuPDF (fitz) - much faster
-    doc = fitz.open(stream=pdf_file, filetype="pdf")
-    text = ""
-    print("Converting PDF...")
-    
-    for page in doc:
-        text += page.get_text()
-    
+    # PyMuPDF reads the downloaded bytes in place (a BytesIO would be copied again)
+    doc = fitz.open(stream=response.content, filetype="pdf")
+    text = extract_text_from_document(doc, data=response.content)
     doc.close()
-    print("Extraction complete.")
     return text
 
+def read_storage_object(file_name, storage):
+    """Bytes of a stored file, through storage.open() (S3Storage reads over its pooled boto3 client)."""
+    with storage.open(file_name, "rb") as f:
+        return f.read()
+
+@contextmanager
+def resume_bytes(file_name, storage=None):
+    """
+    Contents of a stored resume without going through a (signed) public URL. Local files are
+    memory-mapped (a memoryview, valid only inside the block); remote ones are read straight from storage.
+    """
+    storage = storage or default_storage
+    try:
+        path = storage.path(file_name)
+    except NotImplementedError:
+        path = None
+
+    if path is None:
+        yield read_storage_object(file_name, storage)
+        return
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            yield view
+        finally:
+            view.release()
+
+def extract_text_from_bytes(data):
+    """Text of a PDF held in memory; PyMuPDF parses `data` in place."""
+    doc = fitz.open(stream=data, filetype="pdf")
+    try:
+        return extract_text_from_document(doc, data=data)
+    finally:
+        doc.close()
+        del doc
+
+@contextmanager
+def open_resume_pdf(file_name, storage=None):
+    """Opens a stored resume as a PyMuPDF document (see resume_bytes)."""
+    with resume_bytes(file_name, storage) as data:
+        doc = fitz.open(stream=data, filetype="pdf")
+        try:
+            yield doc
+        finally:
+            doc.close()
+            del doc
+
 class PersonalInfo(BaseModel):
     name: str
     gender: str
@@ -82,32 +133,82 @@ class ResumeData(BaseModel):
     skills: list[Skill]
     work_experience: list[WorkEXP]
 
+class IndexedResumeData(ResumeData):
+    index: int
 
-def extract_structured_data(text):
-    """Extract structured data from text using OpenAI's model."""
-    print('Extracting structured information with LLM...')
-    
-    # Truncate text to 10k characters to speed up LLM processing
-    # This should capture most of the resume content without overwhelming the model
-    if len(text) > 10000:
-        text = text[:10000]
-        print(f'Text truncated to 10k characters for faster processing')
-    
-    # Optimized, shorter prompt for faster LLM response
-    system_prompt = """Extract structured resume information. Use "-" for missing fields. Format:
+class ResumeDataBatch(BaseModel):
+    resumes: list[IndexedResumeData]
+
+
+# Optimized, shorter prompt for faster LLM response
+EXTRACTION_PROMPT = """Extract structured resume information. Use "-" for missing fields. Format:
 - Personal: name, email, phone, LinkedIn, GitHub, website
 - Education: degree type, institution, field, graduation year
 - Skills: technical and soft skills
 - Experience: company, role, duration, responsibilities
 Be concise and accurate."""
+
+
+def extraction_input(text):
+    """Responses API input parsing one (already condensed) resume text."""
+    return [
+        {"role": "developer", "content": EXTRACTION_PROMPT},
+        {"role": "user", "content": f"Parse this resume:\n\n{text}"},
+    ]
+
+def strict_json_schema(schema):
+    """A JSON schema in Structured Outputs' strict form: every object closed, all of its properties required."""
+    if isinstance(schema, list):
+        return [strict_json_schema(value) for value in schema]
+    if not isinstance(schema, dict):
+        return schema
+    schema = {key: strict_json_schema(value) for key, value in schema.items()}
+    if schema.get("type") == "object" and "properties" in schema:
+        schema["additionalProperties"] = False
+        schema["required"] = list(schema["properties"])
+    return schema
+
+# Structured output format of extraction_request(), what responses.parse(text_format=ResumeData) sends
+RESUME_TEXT_FORMAT = {
+    "type": "json_schema",
+    "name": ResumeData.__name__,
+    "schema": strict_json_schema(ResumeData.model_json_schema()),
+    "strict": True,
+}
+
+def extraction_request(text):
+    """Body of the structured-output Responses API request for one resume text (for the Batch API)."""
+    condensed, _ = condense_for_extraction(text)
+    return {
+        "model": PARSE_MODEL,
+        "input": extraction_input(condensed),
+        "text": {"format": RESUME_TEXT_FORMAT},
+    }
+
+def extraction_result(body):
+    """ResumeData from the body of a Responses API response to extraction_request()."""
+    texts = [
+        content["text"]
+        for item in body.get("output") or [] if item.get("type") == "message"
+        for content in item.get("content") or [] if content.get("type") == "output_text"
+    ]
+    if not texts:
+        raise ValueError(f"No output text in response {body.get('id')} (status {body.get('status')})")
+    return ResumeData.model_validate_json("".join(texts))
+
+def extract_structured_data(text):
+    """Extract structured data from text using OpenAI's model."""
+    print('Extracting structured information with LLM...')
+    
+    # Keep the sections ResumeData needs within the token budget (instead of the first N characters),
+    # without page headers, footers and layout whitespace
+    text, _ = condense_for_extraction(text)
     
     try:
-        completion = client.responses.parse(
-            model="gpt-4o",  # Using gpt-4o instead of non-existent gpt-5
-            input=[
-                {"role": "developer", "content": system_prompt},
-                {"role": "user", "content": f"Parse this resume:\n\n{text}"},
-            ],
+        completion = llm_call(
+            "resume_parse", client.responses.parse,
+            model=PARSE_MODEL,
+            input=extraction_input(text),
             text_format=ResumeData,
             timeout=60,  # Add timeout to prevent hanging
         )
@@ -117,6 +218,39 @@ Be concise and accurate."""
         print(f'LLM extraction error: {str(e)}')
         raise
 
+def extract_structured_data_batch(texts):
+    """
+    Parses several resumes with one LLM call, so the instructions are sent once per group instead
+    of once per resume. Returns a ResumeData per text, in order; None where the model skipped one.
+    """
+    print(f'Extracting structured information for {len(texts)} resumes with LLM...')
+    resumes = "\n\n".join(
+        f"=== Resume {index} ===\n{condense_for_extraction(text)[0]}" for index, text in enumerate(texts)
+    )
+    completion = llm_call(
+        "resume_parse_batch", client.responses.parse,
+        model=PARSE_MODEL,
+        input=[
+            {"role": "developer", "content": EXTRACTION_PROMPT + "\nParse every resume separately and "
+                                                              "set `index` to its resume number."},
+            {"role": "user", "content": f"Parse these {len(texts)} resumes:\n\n{resumes}"},
+        ],
+        text_format=ResumeDataBatch,
+        timeout=60 * len(texts),
+    )
+    by_index = {}
+    for resume in completion.output_parsed.resumes:
+        by_index.setdefault(resume.index, ResumeData.model_validate(resume.model_dump(exclude={"index"})))
+    return [by_index.get(index) for index in range(len(texts))]
+
+def parse_resume_file(file_name, storage=None):
+    """Parse a resume stored in `storage` (default_storage) under `file_name`."""
+    print(f"Parsing resume {file_name}")
+    
+    with open_resume_pdf(file_name, storage) as doc:
+        text = extract_text_from_document(doc)
+    return extract_structured_data(text)
+
 def parse_resume(resume_url):
     """Parse a resume from a URL."""
     print(f"Parsing resume from URL: {resume_url}")
@@ -0,0 +1,72 @@
+"""
+Helpers for reading the parsed `resume_data` JSON (see resume_parser.ResumeData).
+"""
+
+# Placeholder the parser uses for missing fields
+MISSING_VALUE = "-"
+
+
+def _clean(value):
+    value = str(value).strip() if value is not None else ""
+    return "" if value == MISSING_VALUE else value
+
+
+def resume_skill_names(resume_data):
+    """Returns the resume's skill names, lowercased. Accepts [{'name': ...}] and plain string lists."""
+    if not isinstance(resume_data, dict):
+        return []
+    return skill_names(resume_data.get('skills') or resume_data.get('Skills'))
+
+
+def skill_names(skills):
+    """Same as resume_skill_names, for an already extracted `skills` value (e.g. a resume_data__skills projection)."""
+    if not isinstance(skills, list):
+        return []
+
+    names = []
+    for skill in skills:
+        name = skill.get('name') if isinstance(skill, dict) else skill
+        name = _clean(name).lower()
+        if name:
+            names.append(name)
+    return names
+
+
+def resume_job_titles(resume_data):
+    if not isinstance(resume_data, dict):
+        return []
+    return [_clean(exp.get('job_title')) for exp in resume_data.get('work_experience') or []
+            if isinstance(exp, dict) and _clean(exp.get('job_title'))]
+
+
+def resume_responsibilities(resume_data):
+    if not isinstance(resume_data, dict):
+        return []
+    lines = []
+    for exp in resume_data.get('work_experience') or []:
+        if isinstance(exp, dict):
+            lines.extend(_clean(line) for line in exp.get('key_responsbilities') or [] if _clean(line))
+    return lines
+
+
+def resume_qualifications(resume_data):
+    if not isinstance(resume_data, dict):
+        return []
+    lines = []
+    for qualification in resume_data.get('qualifications') or []:
+        if isinstance(qualification, dict):
+            text = " - ".join(part for part in (_clean(qualification.get('title')), _clean(qualification.get('description'))) if part)
+            if text:
+                lines.append(text)
+    return lines
+
+
+def resume_summary_text(resume_data, max_chars=8000):
+    """Flattens the matching-relevant parts of a resume into plain text (skills, titles, duties, education)."""
+    sections = [
+        "Skills: " + ", ".join(resume_skill_names(resume_data)),
+        "Job titles: " + ", ".join(resume_job_titles(resume_data)),
+        "Responsibilities: " + " ".join(resume_responsibilities(resume_data)),
+        "Qualifications: " + "; ".join(resume_qualifications(resume_data)),
+    ]
+    return "\n".join(sections)[:max_chars]
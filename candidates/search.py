@@ -0,0 +1,120 @@
+"""
+Postgres full-text search over parsed resumes.
+
+Every parsed CandidateProfile carries a `search_document` tsvector (GIN indexed), weighted
+skills (A) > job titles (B) > responsibilities (C) > qualifications (D), so keyword lookups are
+an index scan instead of a LIKE over the resume JSON.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import transaction
+from django.db.models import F, Q, TextField, Value
+
+from .models import CandidateProfile
+from .resume_text import resume_job_titles, resume_qualifications, resume_responsibilities, resume_skill_names
+
+SEARCH_CONFIG = 'english'
+
+# Search parameter -> JSON array field, matched with indexed containment (@>, jsonb_path_ops GIN)
+JSON_ARRAY_FILTERS = {
+    'work_mode': 'work_mode_preferences',
+    'employment_type': 'employment_type_preferences',
+    'disability_category': 'disability_categories',
+    'workplace_accommodation': 'workplace_accommodations',
+}
+EXACT_FILTERS = ('has_workvisa', 'accommodation_needs', 'willing_to_relocate')
+
+
+def search_vector_for(resume_data):
+    """Builds the weighted tsvector expression for one resume."""
+    sections = (
+        (", ".join(resume_skill_names(resume_data)), 'A'),
+        (", ".join(resume_job_titles(resume_data)), 'B'),
+        (" ".join(resume_responsibilities(resume_data)), 'C'),
+        ("; ".join(resume_qualifications(resume_data)), 'D'),
+    )
+    vector = None
+    for text, weight in sections:
+        part = SearchVector(Value(text, output_field=TextField()), weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def update_search_documents(profiles):
+    """Rebuilds the search document of the given profiles (unparsed ones are cleared). Returns the number updated."""
+    profiles = list(profiles)
+    with transaction.atomic():
+        for profile in profiles:
+            CandidateProfile.objects.filter(id=profile.id).update(
+                search_document=search_vector_for(profile.resume_data) if profile.resume_data else None
+            )
+    return len(profiles)
+
+
+def update_search_document(profile):
+    return update_search_documents([profile])
+
+
+def keyword_query(keywords):
+    """OR of the given keywords/phrases; each multi-word keyword matches when all its words do."""
+    query = None
+    for keyword in keywords:
+        part = SearchQuery(keyword, config=SEARCH_CONFIG, search_type='plain')
+        query = part if query is None else query | part
+    return query
+
+
+def search_candidates(query, queryset=None):
+    """
+    Ranked full-text search. `query` is either web-search syntax text ("python -java", "\"data engineer\"")
+    or a (combined) SearchQuery (see keyword_query). Returns the matching profiles annotated with
+    `search_rank` (ts_rank), best first.
+    """
+    if queryset is None:
+        queryset = CandidateProfile.objects.all()
+    if isinstance(query, str):
+        query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.filter(search_document=query).annotate(
+        search_rank=SearchRank(F('search_document'), query)
+    ).order_by('-search_rank', 'id')
+
+
+def keyword_search(keywords, limit=None, queryset=None):
+    """Returns [(candidate_id, rank)] for available candidates matching any of the keywords, best first."""
+    query = keyword_query(keywords)
+    if query is None:
+        return []
+    if queryset is None:
+        queryset = CandidateProfile.objects.filter(is_available=True)
+    matches = search_candidates(query, queryset).values_list('id', 'search_rank')
+    return list(matches[:limit] if limit else matches)
+
+
+def structured_filter(filters):
+    """
+    Compiles validated search filters into one Q. A JSON array filter with several values matches
+    candidates whose array contains any of them (an OR of `@>` containments); values are exact,
+    e.g. work_mode=["Remote", "Hybrid"]. Different filters are ANDed.
+    """
+    condition = Q()
+    for param, field in JSON_ARRAY_FILTERS.items():
+        any_of = Q()
+        for value in filters.get(param) or []:
+            any_of |= Q(**{f"{field}__contains": [value]})
+        condition &= any_of
+    for field in EXACT_FILTERS:
+        if filters.get(field) is not None:
+            condition &= Q(**{field: filters[field]})
+    return condition
+
+
+def find_candidates(filters, queryset=None):
+    """
+    Structured (and optionally full-text, `q`) search over available candidates, entirely in SQL.
+    Ordered by search rank when `q` is given, otherwise most recently updated first.
+    """
+    if queryset is None:
+        queryset = CandidateProfile.objects.all()
+    queryset = queryset.filter(is_available=True).filter(structured_filter(filters))
+    if filters.get('q'):
+        return search_candidates(filters['q'], queryset)
+    return queryset.order_by('-updated_at', 'id')
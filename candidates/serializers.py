@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import FileExtensionValidator
 from rest_framework import serializers
 from . import models
+from .bulk_ingest import manifest_prefix, validate_manifest_keys
 from users.serializers import UserSerializer
 from organization.serializers import OrganizationSerializer
 
@@ -29,6 +33,61 @@ class CandidateProfileSerializer(serializers.ModelSerializer):
         
 
         
+class CandidateSearchParamsSerializer(serializers.Serializer):
+    q= serializers.CharField(required=False, allow_blank=True)
+    work_mode= serializers.ListField(child=serializers.CharField(), required=False)
+    employment_type= serializers.ListField(child=serializers.CharField(), required=False)
+    disability_category= serializers.ListField(child=serializers.CharField(), required=False)
+    workplace_accommodation= serializers.ListField(child=serializers.CharField(), required=False)
+    has_workvisa= serializers.BooleanField(required=False, allow_null=True)
+    willing_to_relocate= serializers.BooleanField(required=False, allow_null=True)
+    accommodation_needs= serializers.ChoiceField(choices=models.NEEDS, required=False)
+
+
+class CandidateSearchResultSerializer(serializers.ModelSerializer):
+    search_rank= serializers.FloatField(read_only=True)
+    class Meta:
+        model= models.CandidateProfile
+        # Disability and accommodation details are filterable but never listed
+        fields= ['id', 'slug', 'search_rank', 'employment_type_preferences', 'work_mode_preferences', 'has_workvisa',
+                 'willing_to_relocate', 'expected_salary_range']
+
+
+class ResumeImportSerializer(serializers.ModelSerializer):
+    processed= serializers.IntegerField(read_only=True)
+    class Meta:
+        model= models.ResumeImport
+        fields= ['id', 'source_type', 'source', 'status', 'error', 'max_concurrency', 'total', 'processed',
+                 'created_count', 'duplicate_count', 'failed_count', 'cache_hits', 'created_at', 'updated_at', 'finished_at']
+
+
+class ManifestEntrySerializer(serializers.Serializer):
+    key= serializers.CharField(max_length=500)
+    email= serializers.EmailField(required=False, allow_blank=True)
+
+
+class CreateResumeImportSerializer(serializers.Serializer):
+    """Manifest keys must be under the importing organization's prefix (context 'organization')."""
+    zip_file= serializers.FileField(required=False, validators=[FileExtensionValidator(allowed_extensions=['zip'])])
+    manifest= ManifestEntrySerializer(many=True, required=False, help_text="Resumes already in storage")
+    max_concurrency= serializers.IntegerField(required=False, min_value=1, max_value=settings.BULK_IMPORT_MAX_CONCURRENCY)
+
+    def validate(self, data):
+        if bool(data.get('zip_file')) == bool(data.get('manifest')):
+            raise serializers.ValidationError("Send either a zip_file or a manifest.")
+        if data.get('manifest'):
+            try:
+                validate_manifest_keys(data['manifest'], manifest_prefix(self.context['organization']))
+            except DjangoValidationError as e:
+                raise serializers.ValidationError({'manifest': e.messages})
+        return data
+
+
+class ResumeImportActionSerializer(serializers.Serializer):
+    retry_failed= serializers.BooleanField(default=False)
+    restart= serializers.BooleanField(default=False, help_text="Restart an import whose workers died mid-run")
+
+
 class CreateNoteSerializer(serializers.ModelSerializer):
     class Meta:
         model= models.Notes
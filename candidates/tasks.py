@@ -1,7 +1,8 @@
 from celery import shared_task
-from django.core.files.storage import default_storage
-from .models import CandidateProfile
-from .resume_parser import parse_resume
+from django.conf import settings
+from .models import CandidateProfile, LLMBatchRun, ResumeImport
+from .parse_cache import parse_resume_cached
+from .indexing import index_candidate_profile
 
 
 @shared_task(bind=True, max_retries=3, time_limit=1800, soft_time_limit=1500)
@@ -26,27 +27,25 @@ def parse_resume_task(self, candidate_profile_id):
         candidate_profile.parsing_status = 'parsing'
         candidate_profile.save(update_fields=['parsing_status'])
         
-        # Get the file path or URL depending on storage backend
-        try:
-            # For local storage
-            resume_url = default_storage.path(candidate_profile.resume_file.name)
-        except NotImplementedError:
-            # For S3 or other remote storage
-            resume_url = default_storage.url(candidate_profile.resume_file.name)
-        
-        # Parse the resume
-        parsed_data = parse_resume(resume_url)
+        # Parse the resume, read straight from storage (mmapped locally, one GetObject on S3).
+        # Bytes parsed before (by any profile) come from the parse cache without an LLM call.
+        parsed_data, cache_hit = parse_resume_cached(candidate_profile.resume_file.name)
         
         # Convert Pydantic model to dictionary
         resume_data_dict = parsed_data.model_dump()
+        unchanged = cache_hit and candidate_profile.resume_data == resume_data_dict
         
         # Update the resume record with the parsed data
         candidate_profile.resume_data = resume_data_dict
         candidate_profile.parsing_status = 'parsed'
         candidate_profile.save()
+
+        # Keep the search document and the ranking prefilter's vector in sync (already are for a re-upload)
+        if not unchanged:
+            index_candidate_profile(candidate_profile)
         
         print(f"Resume parsing completed successfully for candidate {candidate_profile_id}")
-        return {"status": "success", "data": resume_data_dict}
+        return {"status": "success", "cache_hit": cache_hit, "data": resume_data_dict}
         
     except Exception as exc:
         print(f"Resume parsing failed for candidate {candidate_profile_id}: {str(exc)}")
@@ -67,6 +66,61 @@ def parse_resume_task(self, candidate_profile_id):
         return {"status": "failed", "error": str(exc)}
 
 
+@shared_task(time_limit=1800, soft_time_limit=1500)
+def ingest_resume_batch_task(import_id):
+    """
+    One lane of a bulk resume import: processes a batch, then queues itself for the next one, so an
+    import never holds more than its max_concurrency worker slots and other tasks interleave.
+    """
+    from .bulk_ingest import ingest_next_batch
+
+    if ingest_next_batch(import_id):
+        ingest_resume_batch_task.apply_async(args=(import_id,), queue=settings.BULK_IMPORT_QUEUE)
+        return {"status": "running"}
+    return {"status": "done"}
+
+
+@shared_task(time_limit=3600, soft_time_limit=3500)
+def prepare_resume_import_task(import_id, zip_name):
+    """Unpacks an uploaded zip of resumes into storage, then starts the import's lanes."""
+    from django.core.files.storage import default_storage
+    from .bulk_ingest import add_zip_items, start_import
+
+    resume_import = ResumeImport.objects.get(id=import_id)
+    try:
+        add_zip_items(resume_import, zip_name, storage=default_storage)
+    except Exception as e:
+        print(f"Preparing resume import {import_id} failed: {str(e)}")
+        ResumeImport.objects.filter(id=import_id).update(status='failed', error=str(e))
+        return {"status": "failed", "error": str(e)}
+    return {"status": "running", "lanes": start_import(resume_import)}
+
+
+@shared_task(time_limit=3600, soft_time_limit=3500)
+def submit_parse_batch_task(limit=None):
+    """Submits the queued resume parses as one Batch API run (see candidates.batch_parsing) and starts polling it."""
+    from .batch_parsing import submit_parse_batch
+
+    run = submit_parse_batch(limit=limit)
+    if run is None:
+        return {"status": "idle"}
+    if run.status == 'submitted':
+        poll_parse_batch_task.apply_async(args=(run.id,), countdown=settings.LLM_BATCH_POLL_INTERVAL)
+    return {"status": run.status, "run_id": run.id, "requests": run.request_count}
+
+
+@shared_task(time_limit=3600, soft_time_limit=3500)
+def poll_parse_batch_task(run_id):
+    """Checks a parse batch run; applies its results once it is done, else polls again later."""
+    from .batch_parsing import apply_parse_results
+    from .llm_batches import poll_run
+
+    if poll_run(run_id, apply_parse_results):
+        poll_parse_batch_task.apply_async(args=(run_id,), countdown=settings.LLM_BATCH_POLL_INTERVAL)
+        return {"status": "pending"}
+    return {"status": "done"}
+
+
 @shared_task
 def cleanup_failed_parsing_tasks():
     """
@@ -78,10 +132,12 @@ def cleanup_failed_parsing_tasks():
     from django.utils import timezone
     from datetime import timedelta
     
+    # Profiles waiting in an unfinished Batch API run are not stuck, batches take up to their completion window
+    active_runs = [run.tag for run in LLMBatchRun.objects.filter(status__in=('preparing', 'submitted', 'applying')).only('id')]
     stuck_candidates = CandidateProfile.objects.filter(
         parsing_status='parsing',
         updated_at__lt=timezone.now() - timedelta(hours=1)
-    )
+    ).exclude(parsing_task_id__in=active_runs)
     
     count = stuck_candidates.count()
     stuck_candidates.update(parsing_status='not_parsed')
@@ -0,0 +1,447 @@
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+
+import fitz
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from organization.models import Organization
+from rest_framework.test import APIClient
+from users.models import User
+
+from . import bulk_ingest, parse_cache, pdf_text
+from .embeddings import CandidateEmbeddingStore, HashingEmbedder, embed_candidates
+from .features import CandidateFeatureMatrix
+from .resume_condenser import clean_lines, condense_resume
+from .models import CandidateEmbedding, CandidateProfile, ParsedResume, ResumeImport, ResumeImportItem
+from .resume_parser import PARSER_VERSION, ResumeData, extract_text_from_bytes
+
+
+def resume_data(name, email='-', skills=('Python',)):
+    return ResumeData.model_validate({
+        'personal_info': {'name': name, 'gender': '-', 'contact_no': '-', 'email': email, 'github': '-', 'linkedin': '-', 'website': '-'},
+        'qualifications': [],
+        'skills': [{'name': skill} for skill in skills],
+        'work_experience': [],
+    })
+
+
+class ParseCacheTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = FileSystemStorage(location=directory.name)
+        self.extract_text = self.enterContext(mock.patch.object(parse_cache, 'extract_text_from_bytes', return_value="resume text"))
+        self.parse = self.enterContext(mock.patch.object(parse_cache, 'extract_structured_data', return_value=resume_data("Ada")))
+
+    def upload(self, name, content):
+        return self.storage.save(name, ContentFile(content))
+
+    def test_miss_then_hit(self):
+        first = self.upload("first.pdf", b"%PDF-1.4 same bytes")
+        again = self.upload("again.pdf", b"%PDF-1.4 same bytes")
+
+        parsed, hit = parse_cache.parse_resume_cached(first, self.storage)
+        self.assertFalse(hit)
+        self.assertEqual(parsed.personal_info.name, "Ada")
+        parsed, hit = parse_cache.parse_resume_cached(again, self.storage)
+        self.assertTrue(hit)
+        self.assertEqual(parsed.personal_info.name, "Ada")
+
+        # The hit skipped both the text extraction and the LLM call
+        self.assertEqual(self.extract_text.call_count, 1)
+        self.assertEqual(self.parse.call_count, 1)
+        entry = ParsedResume.objects.get()
+        self.assertEqual((entry.content_hash, entry.hits), (parse_cache.resume_digest(b"%PDF-1.4 same bytes"), 1))
+
+    def test_different_bytes_miss(self):
+        parse_cache.parse_resume_cached(self.upload("a.pdf", b"%PDF-1.4 a"), self.storage)
+        _, hit = parse_cache.parse_resume_cached(self.upload("b.pdf", b"%PDF-1.4 b"), self.storage)
+        self.assertFalse(hit)
+        self.assertEqual(self.parse.call_count, 2)
+        self.assertEqual(ParsedResume.objects.count(), 2)
+
+    def test_parser_version_is_part_of_the_key(self):
+        digest = parse_cache.resume_digest(b"%PDF-1.4 a")
+        parse_cache.store_parse(digest, resume_data("Ada"), version="old")
+        self.assertIsNone(parse_cache.cached_parse(digest))
+        self.assertEqual(parse_cache.cached_parse(digest, version="old").personal_info.name, "Ada")
+
+    def test_store_keeps_the_first_parse(self):
+        digest = parse_cache.resume_digest(b"%PDF-1.4 a")
+        parse_cache.store_parse(digest, resume_data("Ada"))
+        parse_cache.store_parse(digest, resume_data("Grace"))
+        self.assertEqual(parse_cache.cached_parse(digest).personal_info.name, "Ada")
+
+    def test_stats(self):
+        first = self.upload("first.pdf", b"%PDF-1.4 same bytes")
+        for _ in range(3):
+            parse_cache.parse_resume_cached(first, self.storage)
+        stats = parse_cache.parse_cache_stats()["cache"]
+        self.assertEqual(stats, {'parser_version': PARSER_VERSION, 'entries': 1, 'hits': 2, 'misses': 1, 'hit_rate': 0.6667})
+
+
+def create_import_with_items(count):
+    resume_import = bulk_ingest.create_import('manifest', 'test manifest')
+    bulk_ingest.add_manifest_items(resume_import, [{'key': f"resumes/{i}.pdf"} for i in range(count)])
+    return resume_import
+
+
+def statuses(resume_import):
+    return dict(resume_import.items.values_list('source_key', 'status'))
+
+
+@override_settings(BULK_IMPORT_BATCH_SIZE=4)
+class ResumeImportClaimTests(TestCase):
+
+    def test_batches_do_not_overlap(self):
+        resume_import = create_import_with_items(10)
+        batches = [bulk_ingest.claim_batch(resume_import) for _ in range(4)]
+
+        self.assertEqual([len(batch) for batch in batches], [4, 4, 2, 0])
+        claimed = [item.id for batch in batches for item in batch]
+        self.assertEqual(len(set(claimed)), 10)
+        self.assertEqual(set(statuses(resume_import).values()), {'processing'})
+
+    def test_interrupted_import_resumes(self):
+        resume_import = create_import_with_items(6)
+        first = bulk_ingest.claim_batch(resume_import)
+        ResumeImportItem.objects.filter(id=first[0].id).update(status='created')
+        ResumeImportItem.objects.filter(id=first[1].id).update(status='failed', error='unreadable')
+        ResumeImport.objects.filter(id=resume_import.id).update(status='running', failed_count=1)
+
+        # The lane died: its unfinished items go back in the queue, finished ones stay done
+        bulk_ingest.requeue_items(resume_import)
+        self.assertEqual(
+            sorted(statuses(resume_import).values()), ['created', 'failed', 'pending', 'pending', 'pending', 'pending']
+        )
+        self.assertFalse(bulk_ingest.finish_import(resume_import))
+
+        bulk_ingest.requeue_items(resume_import, retry_failed=True)
+        resume_import.refresh_from_db()
+        self.assertEqual(resume_import.failed_count, 0)
+        self.assertEqual(resume_import.items.filter(status='pending').count(), 5)
+
+        while bulk_ingest.claim_batch(resume_import):
+            pass
+        resume_import.items.filter(status='processing').update(status='created')
+        self.assertTrue(bulk_ingest.finish_import(resume_import))
+        resume_import.refresh_from_db()
+        self.assertEqual(resume_import.status, 'completed')
+
+    def test_recorded_keys_are_not_added_again(self):
+        resume_import = create_import_with_items(3)
+        bulk_ingest.add_manifest_items(resume_import, [{'key': 'resumes/2.pdf'}, {'key': 'resumes/3.pdf'}])
+        self.assertEqual(resume_import.total, 4)
+        self.assertEqual(resume_import.items.count(), 4)
+
+    def test_collection_resumes_after_recorded_files(self):
+        with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as media:
+            for name in ("a.pdf", "b.pdf"):
+                with open(os.path.join(source, name), "wb") as f:
+                    f.write(b"%PDF-1.4 " + name.encode())
+            storages = {"default": {"BACKEND": "django.core.files.storage.FileSystemStorage", "OPTIONS": {"location": media}}}
+            with override_settings(STORAGES=storages):
+                resume_import = bulk_ingest.create_import('directory', source)
+                self.assertEqual(bulk_ingest.add_directory_items(resume_import, source), 2)
+                with open(os.path.join(source, "c.pdf"), "wb") as f:
+                    f.write(b"%PDF-1.4 c.pdf")
+                with mock.patch.object(bulk_ingest, '_copy_into_storage', wraps=bulk_ingest._copy_into_storage) as copy:
+                    self.assertEqual(bulk_ingest.add_directory_items(resume_import, source), 3)
+        self.assertEqual([key for key, _ in copy.call_args.args[1]], ["c.pdf"])
+
+    def test_manifest_keys(self):
+        prefix = f"{bulk_ingest.IMPORT_UPLOAD_DIR}/org-1/"
+        bulk_ingest.validate_manifest_keys([{'key': f"{prefix}a/b.pdf"}], prefix)
+        for key in (f"{prefix}../org-2/b.pdf", "/etc/passwd", f"{prefix}a//b.pdf", f"{bulk_ingest.IMPORT_UPLOAD_DIR}/org-2/b.pdf"):
+            with self.subTest(key=key), self.assertRaises(ValidationError):
+                bulk_ingest.validate_manifest_keys([{'key': key}], prefix)
+
+
+def create_organization(name):
+    user = User.objects.create_user(email=f"{name.lower()}@example.com")
+    return Organization.objects.create(
+        root_user=user, name=name, headquarter_location="Berlin", about="", employee_size=1, industry=1
+    )
+
+
+class CreateProfilesTests(TestCase):
+
+    def setUp(self):
+        self.acme, self.globex = create_organization("Acme"), create_organization("Globex")
+
+    def create(self, organization, email):
+        """Runs one resume with `email` through create_profiles() in a new import of `organization`."""
+        resume_import = bulk_ingest.create_import('manifest', 'test manifest', organization)
+        key = f"resumes/{ResumeImportItem.objects.count()}.pdf"
+        bulk_ingest.add_manifest_items(resume_import, [{'key': key, 'email': email}])
+        item = resume_import.items.get()
+        bulk_ingest.create_profiles(resume_import, [(item, resume_data("Ada", email))])
+        bulk_ingest.save_items(resume_import, [item])
+        return item
+
+    def test_candidates_are_reused_within_an_organization_only(self):
+        first = self.create(self.acme, "ada@example.com")
+        self.assertEqual((first.status, first.profile.user.email), ('created', "ada@example.com"))
+        # A recruiter's own account is never attached to
+        recruiter = self.create(self.acme, "acme@example.com")
+        self.assertEqual(recruiter.profile.user.email, bulk_ingest.placeholder_email(recruiter))
+
+        again = self.create(self.acme, "ada@example.com")
+        self.assertEqual((again.status, again.profile_id), ('duplicate', first.profile_id))
+
+        elsewhere = self.create(self.globex, "ada@example.com")
+        self.assertEqual(elsewhere.status, 'created')
+        self.assertNotEqual(elsewhere.profile_id, first.profile_id)
+        self.assertEqual(elsewhere.profile.user.email, bulk_ingest.placeholder_email(elsewhere))
+
+
+class ConcurrentClaimTests(TransactionTestCase):
+
+    def test_lanes_skip_locked_rows(self):
+        resume_import = create_import_with_items(6)
+        locked, release = threading.Event(), threading.Event()
+
+        def other_lane():
+            # Holds row locks on the first three items like a lane in the middle of claiming them
+            try:
+                with transaction.atomic():
+                    list(resume_import.items.order_by('id').select_for_update()[:3])
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_lane)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            claimed = bulk_ingest.claim_batch(resume_import, size=6)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual([item.source_key for item in claimed], ["resumes/3.pdf", "resumes/4.pdf", "resumes/5.pdf"])
+
+
+def pdf_bytes(pages, lines=60):
+    """A PDF of `pages` pages, each `lines` lines of 79 characters starting with the page number."""
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        for line in range(lines):
+            page.insert_text((40, 40 + 12 * line), f"page {number:02d} line {line:02d} ".ljust(79, "x"), fontsize=8)
+    try:
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+class PdfTextTests(SimpleTestCase):
+
+    def setUp(self):
+        self.data = pdf_bytes(12)
+
+    def test_extraction_stops_at_the_budget(self):
+        doc = fitz.open(stream=self.data, filetype="pdf")
+        self.addCleanup(doc.close)
+        pages = pdf_text.extract_page_range(doc, 0, doc.page_count).split(pdf_text.PAGE_BREAK)
+        self.assertEqual(len(pages), 12)
+        page_chars = len(pages[0])
+
+        # The page that reaches the budget is kept whole, the ones after it aren't read
+        text = pdf_text.extract_page_range(doc, 0, doc.page_count, max_chars=2 * page_chars + 1)
+        self.assertEqual(text.split(pdf_text.PAGE_BREAK), pages[:3])
+        text = pdf_text.extract_page_range(doc, 0, doc.page_count, max_chars=2 * page_chars)
+        self.assertEqual(text.split(pdf_text.PAGE_BREAK), pages[:2])
+
+    @override_settings(PDF_PARALLEL_MIN_PAGES=0)
+    def test_resume_budget(self):
+        text = extract_text_from_bytes(self.data)
+        pages = text.split(pdf_text.PAGE_BREAK)
+        self.assertGreaterEqual(sum(map(len, pages)), pdf_text.MAX_RESUME_CHARS)
+        self.assertLess(sum(map(len, pages[:-1])), pdf_text.MAX_RESUME_CHARS)
+        self.assertLess(len(pages), 12)
+
+    @override_settings(PDF_PARALLEL_MIN_PAGES=4, PDF_EXTRACT_CHUNK_PAGES=3, PDF_EXTRACT_WORKERS=2)
+    def test_parallel_extraction_matches(self):
+        self.addCleanup(pdf_text._reset_pool)
+        with override_settings(PDF_PARALLEL_MIN_PAGES=0):
+            expected = extract_text_from_bytes(self.data)
+        self.assertEqual(extract_text_from_bytes(self.data), expected)
+
+
+class WordEncoding:
+    """Stand-in for a tiktoken encoding: one token per word."""
+
+    def encode(self, text):
+        return text.split()
+
+
+RESUME_PAGES = [
+    """Jane Doe - Curriculum Vitae   Page 1 of 2
+jane@example.com
+Experience
+Senior Software Engineer
+Acme, 2020 - 2024
+• Led code reviews
+• Built the billing service in Python
+Senior Software Engineer
+Globex, 2016 - 2020
+• Led code reviews""",
+    """Jane Doe - Curriculum Vitae   Page 2 of 2
+• Migrated the monolith to Django
+Skills
+Python, Django, PostgreSQL
+Education
+BSc Computer Science, MIT""",
+]
+
+
+PRIORITY_RESUME = "\n".join([
+    "Jane Doe",
+    "jane@example.com",
+    "Interests",
+    *["Hiking and climbing in the Alps every summer"] * 10,
+    "Experience",
+    "Senior Engineer",
+    "Acme 2020 - 2024",
+    *["• Built the billing service in Python and Django"] * 6,
+    "Skills",
+    "Python, Django, PostgreSQL, Redis",
+])
+
+
+class ResumeCondenserTests(SimpleTestCase):
+
+    def test_sections_are_kept_by_priority(self):
+        condensed, report = condense_resume(PRIORITY_RESUME, budget=44, encoding=WordEncoding())
+        self.assertEqual(report["sections"], ["header", "interests", "experience", "skills"])
+        self.assertEqual((report["trimmed"], report["dropped"]), (["experience"], ["interests"]))
+        self.assertLessEqual(report["condensed_tokens"], 44)
+        # Skills come last in the document but are kept whole; the trimmed experience still names the job
+        self.assertEqual(condensed.splitlines(), [
+            "Jane Doe", "jane@example.com", "",
+            "Experience", "Senior Engineer", "Acme 2020 - 2024", "• Built the billing service in Python and Django", "",
+            "Skills", "Python, Django, PostgreSQL, Redis",
+        ])
+
+    def test_repeated_job_titles_and_bullets_are_kept(self):
+        lines = clean_lines("\f".join(RESUME_PAGES))
+        self.assertEqual(lines.count("Senior Software Engineer"), 2)
+        self.assertEqual(lines.count("• Led code reviews"), 2)
+        # The running header at the top of both pages is the only line dropped
+        self.assertEqual(sum(line.startswith("Jane Doe - Curriculum Vitae") for line in lines), 1)
+        self.assertEqual(len(lines), sum(len(page.splitlines()) for page in RESUME_PAGES) - 1)
+
+    def test_within_budget_keeps_every_line(self):
+        condensed, report = condense_resume("\f".join(RESUME_PAGES), budget=1000, encoding=WordEncoding())
+        lines = [line for line in condensed.splitlines() if line]
+        self.assertEqual(len(lines), sum(len(page.splitlines()) for page in RESUME_PAGES))
+        self.assertEqual((report["trimmed"], report["dropped"]), ([], []))
+
+
+def create_profile(*skills, **fields):
+    user = User.objects.create_user(email=f"candidate{User.objects.count()}@example.com")
+    return CandidateProfile.objects.create(
+        user=user, resume_file="Candidates-Resume/resume.pdf", resume_data={'skills': [{'name': s} for s in skills]}, **fields
+    )
+
+
+class FeatureMatrixTests(TestCase):
+
+    def setUp(self):
+        self.matrix = CandidateFeatureMatrix()
+
+    def overlap(self, *skills):
+        """{profile id: skill overlap} for every row of the matrix."""
+        return dict(zip(self.matrix.ids[:self.matrix.size].tolist(), self.matrix.skill_overlap(skills).tolist()))
+
+    def test_incremental_sync(self):
+        python, django = create_profile("Python"), create_profile("Django", "PostgreSQL", work_mode_preferences=["Remote"])
+        CandidateProfile.objects.filter(id=python.id).update(updated_at=timezone.now() - timedelta(hours=1))
+        CandidateProfile.objects.filter(id=django.id).update(updated_at=timezone.now() - timedelta(hours=2))
+        self.matrix.refresh()
+        self.assertEqual(self.overlap("python", "django"), {python.id: 1, django.id: 1})
+
+        with mock.patch.object(CandidateFeatureMatrix, '_set_row', wraps=self.matrix._set_row) as set_row:
+            python.resume_data = {'skills': [{'name': 'Python'}, {'name': 'Django'}]}
+            python.save()
+            added = create_profile("Go", is_available=False)
+            self.matrix.refresh()
+        # Only the changed and the new profile are read again
+        self.assertEqual(sorted(call.args[0] for call in set_row.call_args_list), [python.id, added.id])
+        self.assertEqual(self.overlap("python", "django"), {python.id: 2, django.id: 1, added.id: 0})
+        self.assertEqual(self.overlap("go")[added.id], 1)
+        self.assertEqual(self.matrix.preference_match(self.matrix.work_mode_vocab, self.matrix.work_mode_onehot, "remote").tolist(), [0, 1, 0])
+        self.assertEqual(self.matrix.eligible_mask().tolist(), [True, True, False])
+
+    def test_late_commit_within_the_overlap(self):
+        first = create_profile("Python")
+        self.matrix.refresh()
+        # Saved a minute before the last sync, but committed after it
+        late = create_profile("Go")
+        CandidateProfile.objects.filter(id=late.id).update(updated_at=self.matrix.synced_at - timedelta(minutes=1))
+        self.matrix.refresh()
+        self.assertEqual(self.overlap("go"), {first.id: 0, late.id: 1})
+
+    def test_deletion_rebuilds(self):
+        kept, deleted = create_profile("Python"), create_profile("Python")
+        self.matrix.refresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted.delete()
+        self.matrix.refresh()
+        self.assertEqual(self.overlap("python"), {kept.id: 1})
+
+
+class EmbeddingStoreTests(TestCase):
+
+    def test_late_commit_within_the_overlap(self):
+        embedder = HashingEmbedder(dimensions=16)
+        store = CandidateEmbeddingStore(embedder)
+        first, late = create_profile("Python"), create_profile("Go")
+        embed_candidates([first], embedder)
+        store.refresh()
+        # Written a minute before the last sync, but committed after it
+        embed_candidates([late], embedder)
+        CandidateEmbedding.objects.filter(profile=late).update(updated_at=store.synced_at - timedelta(minutes=1))
+        store.refresh()
+        self.assertEqual((len(store), first.id in store, late.id in store), (2, True, True))
+
+
+class CandidateSearchTests(TestCase):
+
+    def setUp(self):
+        self.visual = create_profile("Python", disability_categories=["Visual"], workplace_accommodations=["Screen reader"])
+        create_profile("Python", disability_categories=["Hearing"])
+        self.client = APIClient()
+
+    def search(self, user, **params):
+        self.client.force_authenticate(user)
+        return self.client.get("/api/candidates/search/", params)
+
+    def test_only_organization_members_search(self):
+        self.assertEqual(self.search(self.visual.user).status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get("/api/candidates/search/").status_code, 403)
+
+    def test_accommodation_details_are_not_listed(self):
+        recruiter = User.objects.create_user(email="recruiter@example.com")
+        organization = Organization.objects.create(
+            root_user=recruiter, name="Acme", headquarter_location="Berlin", about="", employee_size=1, industry=1
+        )
+        organization.users.add(recruiter)
+
+        response = self.search(recruiter, disability_category="Visual")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.visual.id])
+        row = response.data["results"][0]
+        for field in ("disability_categories", "accommodation_needs", "workplace_accommodations"):
+            self.assertNotIn(field, row)
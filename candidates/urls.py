@@ -1,6 +1,6 @@
 from django.urls import path,include
 from rest_framework.routers import DefaultRouter
-from .views import CandidateViewSet,NoteViewSet,PromptAPI,CareerCoachAPI
+from .views import CandidateViewSet,NoteViewSet,PromptAPI,CareerCoachAPI,ResumeImportAPI,ResumeImportDetailAPI
 
 router = DefaultRouter()
 router.register(r'', CandidateViewSet, basename='candidate')
@@ -8,6 +8,8 @@ router.register(r'note', NoteViewSet, basename='note')
 
 urlpatterns = [
     path('prompt/', PromptAPI.as_view()),
-    path('career-coach/', CareerCoachAPI.as_view())
+    path('career-coach/', CareerCoachAPI.as_view()),
+    path('imports/', ResumeImportAPI.as_view()),
+    path('imports/<int:pk>/', ResumeImportDetailAPI.as_view()),
 ]
 urlpatterns += router.urls
\ No newline at end of file
@@ -4,10 +4,17 @@ from rest_framework import permissions
 from rest_framework.views import APIView
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.pagination import LimitOffsetPagination
 from . import models,serializers
 from rest_framework.parsers import FormParser, MultiPartParser,JSONParser
 from django.shortcuts import get_object_or_404
-from .tasks import parse_resume_task
+from django.core.files.storage import default_storage
+from .tasks import parse_resume_task, prepare_resume_import_task
+from .bulk_ingest import add_manifest_items, create_import, manifest_prefix, start_import
+from .search import find_candidates
+from .parse_cache import parse_cache_stats
+from backends.singleflight import submit_once
+from organization.permissions import OrganizationMemberPermissions
 
 class CandidateViewSet(viewsets.ModelViewSet):
     permission_classes= (permissions.IsAuthenticated,)
@@ -88,25 +95,19 @@ class CandidateViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_200_OK
             )
         
-        # Check if currently parsing
-        if instance.parsing_status == 'parsing':
-            return Response(
-                {
-                    "message": "Resume parsing already in progress",
-                    "parsing_status": instance.parsing_status
-                },
-                status=status.HTTP_202_ACCEPTED
-            )
-        
         try:
-            # Start background task
-            task = parse_resume_task.delay(instance.id)
+            # Start background task, or attach to the one already parsing this resume
+            task_id, started = submit_once(
+                models.CandidateProfile.objects, instance.id, parse_resume_task,
+                status_field='parsing_status', task_id_field='parsing_task_id',
+                in_flight_status='parsing', reset_status=instance.parsing_status, args=(instance.id,)
+            )
             
             return Response(
                 {
-                    "message": "Resume parsing started in background",
+                    "message": "Resume parsing started in background" if started else "Resume parsing already in progress",
                     "parsing_status": "parsing",
-                    "task_id": task.id
+                    "task_id": task_id
                 },
                 status=status.HTTP_202_ACCEPTED
             )
@@ -117,6 +118,32 @@ class CandidateViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(methods=["GET"], detail=False, url_path="search", permission_classes=[OrganizationMemberPermissions])
+    def search(self, request):
+        """
+        Structured + full-text search over available candidates, compiled to indexed SQL (no LLM).
+        Only for organization members (recruiters).
+        ?q=<web search syntax>&work_mode=Remote&work_mode=Hybrid&employment_type=..&disability_category=..
+        &workplace_accommodation=..&has_workvisa=true&willing_to_relocate=..&accommodation_needs=YES&limit=&offset=
+        """
+        params = serializers.CandidateSearchParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        candidates = find_candidates(params.validated_data).only(
+            'id', 'slug', 'employment_type_preferences', 'work_mode_preferences', 'has_workvisa', 'willing_to_relocate',
+            'expected_salary_range'
+        )
+        paginator = LimitOffsetPagination()
+        paginator.default_limit, paginator.max_limit = 20, 100
+        page = paginator.paginate_queryset(candidates, request, view=self)
+        serializer = serializers.CandidateSearchResultSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(methods=["GET"], detail=False, url_path="parsing-stats")
+    def parsing_stats(self, request):
+        """Profiles per parsing status and the parse cache's hit rate."""
+        return Response(parse_cache_stats(), status=status.HTTP_200_OK)
+
     @action(methods=["GET"], detail=True, url_path="parsing-status")
     def get_parsing_status(self, request, slug):
         """Get current parsing status"""
@@ -243,4 +270,64 @@ class CareerCoachAPI(APIView):
             'output': result['response'],
             'thread_id': thread_id
         })
-        return Response(response_serializer.data)
\ No newline at end of file
+        return Response(response_serializer.data)
+
+
+class ResumeImportAPI(APIView):
+    """
+    Bulk resume ingestion for the user's organization. POST either a `zip_file` of PDFs (multipart)
+    or a JSON `manifest` of resumes already in storage ([{"key": ..., "email": ...}], keys under the
+    organization's Candidates-Resume/imports/org-<id>/ prefix); progress is read back from GET imports/<id>/.
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+    parser_classes = [MultiPartParser, FormParser, JSONParser]
+
+    def get(self, request):
+        imports = models.ResumeImport.objects.filter(created_by=request.user)[:50]
+        return Response(serializers.ResumeImportSerializer(imports, many=True).data, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        organization = request.user.organization_set.first()
+        if organization is None:
+            return Response({"error": "Bulk imports are only available to organization members."}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = serializers.CreateResumeImportSerializer(data=request.data, context={'organization': organization})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if data.get('manifest'):
+            resume_import = create_import('manifest', f"{len(data['manifest'])} storage keys", organization, request.user, data.get('max_concurrency'))
+            add_manifest_items(resume_import, data['manifest'], prefix=manifest_prefix(organization))
+            start_import(resume_import)
+        else:
+            # The archive is unpacked by a worker; the request only stores it
+            zip_name = default_storage.save(f"Candidates-Imports/{data['zip_file'].name}", data['zip_file'])
+            resume_import = create_import('zip', zip_name, organization, request.user, data.get('max_concurrency'))
+            models.ResumeImport.objects.filter(id=resume_import.id).update(status='preparing')
+            prepare_resume_import_task.delay(resume_import.id, zip_name)
+
+        resume_import.refresh_from_db()
+        return Response(serializers.ResumeImportSerializer(resume_import).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ResumeImportDetailAPI(APIView):
+    """GET an import's progress; POST to resume it (optionally retrying failed resumes)."""
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, pk):
+        resume_import = get_object_or_404(models.ResumeImport, pk=pk, created_by=request.user)
+        return Response(serializers.ResumeImportSerializer(resume_import).data, status=status.HTTP_200_OK)
+
+    def post(self, request, pk):
+        resume_import = get_object_or_404(models.ResumeImport, pk=pk, created_by=request.user)
+        options = serializers.ResumeImportActionSerializer(data=request.data)
+        options.is_valid(raise_exception=True)
+        if resume_import.status == 'preparing':
+            return Response({"error": "The import's files are still being collected."}, status=status.HTTP_409_CONFLICT)
+
+        lanes = start_import(resume_import, **options.validated_data)
+        resume_import.refresh_from_db()
+        return Response(
+            {"lanes_started": lanes, **serializers.ResumeImportSerializer(resume_import).data},
+            status=status.HTTP_202_ACCEPTED if lanes else status.HTTP_200_OK
+        )
@@ -0,0 +1,224 @@
+"""
+Batch API mode for overnight ranking (see backends.batch and candidates.llm_batches).
+
+submit_ranking_batch() runs the cheap cascade tiers of prepare_ranking for each job right away,
+reuses saved and cached final scores, and writes the final-tier scoring prompts for the remaining
+candidates (RANKING_SCORING_MODE, as rank_candidates_by_match would send them) into one batch across
+all the jobs. apply_ranking_results() scores the candidates from the answers and stores each job's
+ranking as rank_candidates_task does. A candidate whose answer failed or never came keeps an error
+row (score 0), which the next ranking run scores again.
+"""
+import json
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from backends.batch import request_line, response_body
+from candidates.llm_batches import count_result, create_run, finish_run, submit_run
+from .jobpost_candidate_ranker import (
+    build_batch_prompt, build_scoring_prompt, cache_scores, cached_scores, content_hash, get_token_encoding,
+    load_candidate_data, pack_batches, parse_batch_scores, persist_scores, prepare_ranking, reusable_rows,
+    score_cache_key, scoring_messages, start_ranking,
+)
+from .models import JobPost
+from .tasks import complete_ranking
+
+
+def queued_job_ids(limit=None):
+    """Job posts that were never ranked, oldest first."""
+    return list(
+        JobPost.objects.filter(ranking_status='not_ranked').order_by('id')
+        .values_list('id', flat=True)[:limit or settings.LLM_BATCH_MAX_REQUESTS]
+    )
+
+
+def release_jobs(run, job_ids, status):
+    JobPost.objects.filter(id__in=job_ids, ranking_task_id=run.tag, ranking_status='ranking').update(
+        ranking_status=status, updated_at=timezone.now()
+    )
+
+
+def parse_single_score(response_content):
+    result = json.loads(response_content)
+    return float(result["score"]), list(result["reasons"])
+
+
+def finish_job(job_post, job, fresh_results, total_tokens, total_cost):
+    """Stores the job's ranking: its reused and cached scores plus the batch's."""
+    ranked_candidates = job["scored"] + fresh_results
+    ranked_candidates.sort(key=lambda x: x["score"], reverse=True)
+    complete_ranking(job_post, ranked_candidates, total_tokens, total_cost, job["cascade"], job["started_at"])
+    print(f"Batch ranking of job {job_post.id} completed: {len(ranked_candidates)} candidates")
+
+
+def job_requests(run, job_id, model, mode, encoding):
+    """
+    Shortlists a job's candidates and returns the scoring requests the saved and cached scores don't
+    cover; what applying the answers needs is kept in the run. A job with nothing left to score is
+    ranked right away.
+    """
+    job_post, job_description, selected_ids, cascade = prepare_ranking(job_id)
+    start_ranking(job_post, job_description, selected_ids)
+    started_at = time.time()
+    candidate_data = load_candidate_data(selected_ids)
+
+    # Same reuse as score_shortlist: rows saved for this (job description, resume), then the score cache
+    reused = reusable_rows(job_post, job_description, candidate_data)
+    reused_ids = {r["candidate_id"] for r in reused}
+    results_by_id, misses, _ = cached_scores(
+        job_description, [c for c in candidate_data if c["id"] not in reused_ids], model
+    )
+    cached = list(results_by_id.values())
+    if cached:
+        persist_scores(job_post, job_description)(cached)
+
+    job = {
+        "job_description": job_description,
+        "cascade": cascade,
+        "started_at": started_at,
+        "candidates": {str(c["id"]): {"slug": c["slug"], "resume_hash": c["resume_hash"]} for c in misses},
+        "scored": reused + cached,
+        "reused_scores": len(reused),
+        "cache_hits": len(cached),
+    }
+    run.context.setdefault("jobs", {})[str(job_id)] = job
+    if not misses:
+        tokens = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0, "cache_hits": len(cached),
+                  "cache_misses": 0, "reused_scores": len(reused)}
+        finish_job(job_post, job, [], tokens, 0)
+        return []
+
+    units = pack_batches(job_description, misses, encoding) if mode == "batched" else [[c] for c in misses]
+    lines = []
+    for index, unit in enumerate(units):
+        custom_id = f"job-{job_id}-{index}"
+        prompt = build_batch_prompt(job_description, unit) if len(unit) > 1 else build_scoring_prompt(job_description, unit[0])
+        run.items[custom_id] = {"job": job_id, "candidates": [c["id"] for c in unit]}
+        lines.append(request_line(custom_id, "/v1/chat/completions", {
+            "model": model,
+            "messages": scoring_messages(prompt),
+            "response_format": {"type": "json_object"},
+        }))
+    return lines
+
+
+def submit_ranking_batch(job_ids=None, limit=None):
+    """
+    Claims the given job posts (default: the never ranked ones) and submits their final-tier scoring
+    as one batch. Returns the run, or None when no job could be claimed.
+    """
+    if job_ids is None:
+        job_ids = queued_job_ids(limit)
+    if not job_ids:
+        return None
+
+    model, mode = settings.RANKING_MODEL, settings.RANKING_SCORING_MODE
+    run = create_run('rank', model=model)
+    JobPost.objects.filter(id__in=job_ids).exclude(ranking_status='ranking').update(
+        ranking_status='ranking', ranking_task_id=run.tag, updated_at=timezone.now()
+    )
+    claimed = list(JobPost.objects.filter(id__in=job_ids, ranking_task_id=run.tag, ranking_status='ranking')
+                   .order_by('id').values_list('id', flat=True))
+    if not claimed:
+        run.delete()
+        return None
+
+    encoding = get_token_encoding()
+    lines, pending_jobs = [], []
+    for position, job_id in enumerate(claimed):
+        if len(lines) >= settings.LLM_BATCH_MAX_REQUESTS:
+            # The batch is full, the rest wait for the next one
+            release_jobs(run, claimed[position:], 'not_ranked')
+            break
+        try:
+            job_lines = job_requests(run, job_id, model, mode, encoding)
+        except Exception as e:
+            print(f"Batch ranking: preparing job {job_id} failed: {str(e)}")
+            release_jobs(run, [job_id], 'failed')
+            continue
+        if job_lines:
+            lines += job_lines
+            pending_jobs.append(job_id)
+
+    print(f"Batch ranking run {run.id}: {len(claimed)} jobs, {len(lines)} requests")
+    if not lines:
+        finish_run(run)
+        return run
+
+    try:
+        return submit_run(run, lines, "/v1/chat/completions")
+    except Exception as e:
+        release_jobs(run, pending_jobs, 'not_ranked')
+        finish_run(run, f"Submitting failed: {str(e)}")
+        raise
+
+
+def apply_ranking_results(run, results):
+    """Scores the candidates from the batch's answers and stores each job's ranking (see module docstring)."""
+    jobs = run.context.get("jobs", {})
+    fresh = {job_id: [] for job_id in jobs}
+    usage = {job_id: {"input_tokens": 0, "output_tokens": 0, "batch_requests": 0} for job_id in jobs}
+
+    for custom_id, item in run.items.items():
+        job_id = str(item["job"])
+        job = jobs[job_id]
+        result = results.get(custom_id)
+        body, error = response_body(result) if result is not None else (None, "No answer (batch expired or cancelled)")
+        scores = {}
+        if error is None:
+            try:
+                content = body["choices"][0]["message"]["content"]
+                if len(item["candidates"]) > 1:
+                    scores = parse_batch_scores(content)
+                else:
+                    scores = {item["candidates"][0]: parse_single_score(content)}
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                error = f"Unparseable response: {str(e)}"
+        if error is not None:
+            print(f"Batch ranking of candidates {item['candidates']} for job {job_id} failed: {error}")
+        # Unanswered requests have no body and count as failed
+        input_tokens, output_tokens, cost = count_result(run, body, failed=error is not None)
+        usage[job_id]["input_tokens"] += input_tokens
+        usage[job_id]["output_tokens"] += output_tokens
+        usage[job_id]["batch_requests"] += 1
+
+        # The request's tokens are split evenly over its candidates, as score_batch does
+        share = len(item["candidates"])
+        for candidate_id in item["candidates"]:
+            candidate = job["candidates"][str(candidate_id)]
+            entry = {
+                "candidate_id": candidate_id,
+                "candidate_slug": candidate["slug"],
+                "tokens_used": round((input_tokens + output_tokens) / share),
+                "cost": cost / share,
+                "job_hash": content_hash(job["job_description"]),
+                "resume_hash": candidate["resume_hash"],
+            }
+            if candidate_id in scores:
+                entry["score"], entry["reasons"] = scores[candidate_id]
+            else:
+                entry.update(score=0, reasons=["Error during ranking"], error=True)
+            fresh[job_id].append(entry)
+
+    for job_id, job in jobs.items():
+        if not fresh[job_id]:
+            continue  # Ranked when the batch was submitted
+        job_post = JobPost.objects.filter(id=job_id, ranking_task_id=run.tag).first()
+        if job_post is None:
+            print(f"Batch ranking: job {job_id} was taken over or deleted, skipping its results")
+            continue
+        results_of_job = fresh[job_id]
+        if all(r.get("error") for r in results_of_job):
+            release_jobs(run, [job_id], 'failed')
+            continue
+
+        job_hash = content_hash(job["job_description"])
+        cache_scores(results_of_job, {
+            r["candidate_id"]: score_cache_key(job_hash, r["resume_hash"], run.model) for r in results_of_job
+        })
+        persist_scores(job_post, job["job_description"])(results_of_job)
+        tokens = usage[job_id]
+        tokens["total_tokens"] = tokens["input_tokens"] + tokens["output_tokens"]
+        tokens.update(cache_hits=job["cache_hits"], cache_misses=len(results_of_job), reused_scores=job["reused_scores"])
+        finish_job(job_post, job, results_of_job, tokens, sum(r["cost"] for r in results_of_job))
@@ -1,12 +1,26 @@
 from openai import OpenAI
 from dotenv import load_dotenv
-from .models import JobPost
+from .models import JobPost, RankedCandidate
+from .skill_expansion import expand_skills
 from candidates.models import CandidateProfile
+from candidates.embeddings import get_embedding_store
+from candidates.features import get_feature_matrix
+from candidates.search import keyword_search
 from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from backends.llm import llm_call
+from backends.metrics import llm_cost
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import tiktoken
+import numpy as np
 import json
+import hashlib
 import datetime
-from pydantic import BaseModel
+import time
 load_dotenv()
 client = OpenAI()
 
@@ -59,30 +73,89 @@ def ranking_algo_unstructured(job_id: int):
     return 'done'
 """
 
-class SkillOutput(BaseModel):
-    skills: list[str]
+def prefilter_by_embedding(pool_ids, job_description, top_n=None):
+    """
+    Narrows the candidate pool to the top-N ids by cosine similarity between the
+    job description and the stored resume embeddings. Candidates without a vector yet are kept.
+    Returns (kept_ids, {candidate_id: similarity}); kept_ids is None when no prefilter was applied.
+    """
+    top_n = top_n or settings.RANKING_PREFILTER_TOP_N
+    try:
+        store = get_embedding_store()
+        if not len(store):
+            return None, {}
+        query_vector = store.embedder.embed([job_description])[0]
+    except Exception as e:
+        print(f"Embedding prefilter skipped: {str(e)}")
+        return None, {}
 
+    similarities = dict(store.top_n(query_vector, top_n, candidate_ids=pool_ids))
+    unembedded_ids = [candidate_id for candidate_id in pool_ids if candidate_id not in store]
+    print(f"Embedding prefilter kept {len(similarities)} of {len(pool_ids)} candidates ({len(unembedded_ids)} without vectors)")
+    return set(similarities) | set(unembedded_ids), similarities
 
 
+def prefilter_by_text_search(keywords, top_n=None):
+    """
+    Full-text match of the job keywords against the candidates' GIN-indexed search documents.
+    Returns {candidate_id: ts_rank} for the top-N matches ({} when the search is unavailable).
+    """
+    top_n = top_n or settings.RANKING_PREFILTER_TOP_N
+    try:
+        matches = keyword_search(keywords, limit=top_n)
+    except DatabaseError as e:
+        print(f"Full-text prefilter skipped: {str(e)}")
+        return {}
+    print(f"Full-text prefilter matched {len(matches)} candidates")
+    return dict(matches)
+
 
 from .models import WORKPLACE_TYPES,WORK_TYPES
 def ranking_algo(job_id: int):
-    job_query = get_object_or_404(JobPost, id=job_id)
+    """Ranks candidates for a job in this process and saves the result on the job post."""
+    job_query, job_description, selected_ids, cascade = prepare_ranking(job_id)
+    start_ranking(job_query, job_description, selected_ids)
 
+    # Rank candidates based on matching with job description, reusing scores for unchanged (job, resume) pairs
+    started_at = time.time()
+    ranked_candidates, total_tokens, total_cost = score_shortlist(job_description, selected_ids, job_query)
+    cascade = with_final_tier(cascade, ranked_candidates, total_tokens, total_cost, started_at)
+    result_data = save_ranking_result(job_query, ranked_candidates, total_tokens, total_cost, cascade)
+
+    return {
+        "job": job_description,
+        **result_data
+    }
+
+
+# Map job choices to readable strings to compare with candidate preferences
+WORK_MODE_MAP = {
+    1: 'Hybrid',
+    2: 'On-site',
+    3: 'Remote',
+}
+JOB_TYPE_MAP = {
+    1: 'Full-time',
+    2: 'Part-time',
+    3: 'Contract',
+    4: 'Temperory',
+    5: 'Other',
+    6: 'Volunteer',
+    7: 'Internship',
+}
+
+MIN_CANDIDATES = 3
+
+
+def build_job_description(job_query):
     # Convert job types and workplace types to readable text (assuming choices are defined)
     workplace_type_display = dict(WORKPLACE_TYPES).get(job_query.workplace_type, "Not specified")
     job_type_display = dict(WORK_TYPES).get(job_query.job_type, "Not specified")
 
     # Extract skills into a comma-separated string
     job_skills = ", ".join([skill.name for skill in job_query.skills.all()])
-    skills_synonames= client.responses.parse(model="gpt-4o", input=[{'role': 'developer', "content": "You're an Keyword/Synoname generating assistant which generates similar keywords for any given particular skill, Example: Sample Input=Python Backend Developer, Sample Output= Python, Django, Flask, ORM, databases, FastAPI, etc, etc"},
-                                                                               {'role': 'user', 'content': f"Generate keywords to search resume in the database for the given Skills {job_skills}"},
-                                            ],
-                                            text_format=SkillOutput)
-    expanded_skills= (skills_synonames.output_parsed)
-    print(expanded_skills.skills)
-
-    job_description = f"""
+
+    return f"""
 Job Overview
 ============
 Title: {job_query.title}
@@ -99,99 +172,146 @@ Skills Required:
 {job_skills}
 """
 
-    # Fetch candidates base queryset
-    candidates_qs = CandidateProfile.objects.filter(
-        is_available=True,
-        resume_data__isnull=False
-    ).only(
-        'id', 'slug', 'resume_data', 'willing_to_relocate',
-        'expected_salary_range', 'employment_type_preferences',
-        'disclosure_preference', 'work_mode_preferences', 'workplace_accommodations',
-        'has_workvisa'
+
+def job_search_keywords(job_query):
+    """The job's skills expanded into resume search keywords (synonyms are cached, see skill_expansion)."""
+    expanded_skills = expand_skills(skill.name for skill in job_query.skills.all())
+    print(expanded_skills)
+    return expanded_skills
+
+
+def job_heuristic_scores(job_query, features, keywords=None):
+    """
+    Lightweight heuristic score of every feature-matrix row for this job, used to preselect candidates before LLM:
+    skill_overlap * 3 + work_mode_bonus + employment_bonus, computed column-wise.
+    """
+    if keywords is None:
+        keywords = job_search_keywords(job_query)
+    return features.heuristic_scores(
+        keywords, WORK_MODE_MAP.get(job_query.workplace_type), JOB_TYPE_MAP.get(job_query.job_type)
     )
-    
-    if job_query.visa_required:
-        candidates_qs = candidates_qs.filter(has_workvisa=True)
 
-    # Map job choices to readable strings to compare with candidate preferences
-    work_mode_map = {
-        1: 'Hybrid',
-        2: 'On-site',
-        3: 'Remote',
-    }
-    job_work_mode = work_mode_map.get(job_query.workplace_type)
-    job_type_map = {
-        1: 'Full-time',
-        2: 'Part-time',
-        3: 'Contract',
-        4: 'Temperory',
-        5: 'Other',
-        6: 'Volunteer',
-        7: 'Internship',
+
+def prepare_ranking(job_id):
+    """
+    Builds the job description and shortlists candidates for the large scoring model in cascade tiers:
+    1. lexical: BM25 over the skill bitsets (preference bonus, full-text rank and embedding similarity
+       break ties) orders the whole eligible pool in-process, keeping the top RANKING_SCREEN_TOP_N
+    2. screen: the cheap RANKING_SCREEN_MODEL scores those and keeps the best RANKING_SHORTLIST_SIZE
+       (skipped when RANKING_SCREEN_TOP_N is 0 or the pool already fits the shortlist)
+    The final tier is score_shortlist with RANKING_MODEL.
+    Returns (job_query, job_description, selected candidate ids in cascade order, cascade tier records).
+    """
+    started = time.perf_counter()
+    job_query = get_object_or_404(JobPost, id=job_id)
+    job_description = build_job_description(job_query)
+
+    features = get_feature_matrix()
+    candidate_ids = features.ids[:features.size]
+    eligible = features.eligible_mask(job_query.visa_required)
+    pool_size = int(eligible.sum())
+    keywords = job_search_keywords(job_query)
+    scores = job_heuristic_scores(job_query, features, keywords)
+    lexical = features.bm25_scores(keywords)
+
+    # Indexed full-text match, also catches candidates whose titles/duties (not skill list) fit the job
+    text_ranks = {i: rank for i, rank in prefilter_by_text_search(keywords).items() if i in features.row_of}
+    text_rank = np.zeros(features.size, dtype=np.float32)
+    text_rank[[features.row_of[i] for i in text_ranks]] = list(text_ranks.values())
+
+    # Semantic prefilter: only the profiles closest to the job description stay in the pool
+    kept_ids, similarities = prefilter_by_embedding(candidate_ids[eligible].tolist(), job_description)
+    if kept_ids is not None:
+        eligible &= np.isin(candidate_ids, list(kept_ids))
+    similarity = np.zeros(features.size, dtype=np.float32)
+    similarity[[features.row_of[i] for i in similarities]] = list(similarities.values())
+
+    # Keep only somewhat relevant, sorted by BM25 desc (heuristic score, text rank, then similarity break ties)
+    # and capped to what the next tier scores, to control LLM cost
+    relevant = np.flatnonzero(eligible & ((scores > 0) | (text_rank > 0)))
+    relevant = relevant[np.lexsort((-similarity[relevant], -text_rank[relevant], -scores[relevant], -lexical[relevant]))]
+    shortlist_size = settings.RANKING_SHORTLIST_SIZE
+    lexical_rows = relevant[:max(shortlist_size, settings.RANKING_SCREEN_TOP_N)]
+    selected_ids = candidate_ids[lexical_rows].tolist()
+
+    # Ensure we have at least 3; if not, broaden by taking a few available profiles
+    if len(selected_ids) < MIN_CANDIDATES:
+        others = np.flatnonzero(eligible & ~np.isin(candidate_ids, selected_ids))
+        others = others[np.argsort(-similarity[others], kind='stable')]
+        selected_ids.extend(candidate_ids[others[:MIN_CANDIDATES - len(selected_ids)]].tolist())
+
+    cascade = [{
+        "tier": "lexical",
+        "method": "bm25",
+        "considered": pool_size,
+        "kept": len(selected_ids),
+        "cutoff_score": round(float(lexical[lexical_rows[-1]]), 4) if len(lexical_rows) else None,
+        "seconds": round(time.perf_counter() - started, 3),
+        "cost": 0,
+    }]
+    if len(selected_ids) > shortlist_size:
+        selected_ids, screen_tier = screen_candidates(job_description, selected_ids, shortlist_size)
+        cascade.append(screen_tier)
+
+    return job_query, job_description, selected_ids, cascade
+
+
+def screen_candidates(job_description, candidate_ids, keep):
+    """
+    Screening tier: scores the candidates with the cheap RANKING_SCREEN_MODEL (RANKING_SCREEN_MODE prompts,
+    cached like final scores) and keeps the best `keep`, ties in the given order. If every screening call
+    fails the given order is kept. Returns (kept ids, tier record).
+    """
+    started = time.perf_counter()
+    candidate_data = load_candidate_data(candidate_ids)
+    ranked, total_tokens, total_cost = rank_candidates_with_cache(
+        job_description, candidate_data, model=settings.RANKING_SCREEN_MODEL, mode=settings.RANKING_SCREEN_MODE
+    )
+    if ranked and all(r.get("error") for r in ranked):
+        print("Screening tier failed for every candidate, keeping the lexical order")
+        kept = [c["id"] for c in candidate_data][:keep]
+        cutoff_score = None
+    else:
+        kept = [r["candidate_id"] for r in ranked][:keep]
+        cutoff_score = ranked[len(kept) - 1]["score"] if kept else None
+
+    return kept, {
+        "tier": "screen",
+        "model": settings.RANKING_SCREEN_MODEL,
+        "considered": len(candidate_data),
+        "kept": len(kept),
+        "cutoff_score": cutoff_score,
+        "seconds": round(time.perf_counter() - started, 3),
+        "token_usage": total_tokens,
+        "cost": total_cost,
     }
-    job_type_text = job_type_map.get(job_query.job_type)
-
-    # Build expanded skills set (lowercased) for quick matching
-    expanded_skill_set = set(s.lower().strip() for s in (expanded_skills.skills or []))
-    job_skill_set = set(s.lower().strip() for s in job_skills.split(',')) if job_skills else set()
-
-    # Lightweight heuristic scoring to preselect candidates before LLM
-    scored_candidates = []
-    for c in candidates_qs:
-        resume_json = c.resume_data or {}
-        # Try common structures from resume parsing
-        resume_skills = []
-        if isinstance(resume_json, dict):
-            if isinstance(resume_json.get('skills'), list):
-                resume_skills = resume_json.get('skills', [])
-            elif isinstance(resume_json.get('Skills'), list):
-                resume_skills = resume_json.get('Skills', [])
-        # Fallback: try to derive skills from text if provided
-        resume_text_blob = json.dumps(resume_json).lower() if resume_json else ''
-
-        resume_skill_set = set(str(s).lower().strip() for s in resume_skills)
-        # Skill overlap score
-        skill_overlap = len(expanded_skill_set.intersection(resume_skill_set))
-        if skill_overlap == 0 and expanded_skill_set:
-            # Simple fuzzy: count occurrences of any expanded skill token in text blob
-            skill_overlap = sum(1 for s in expanded_skill_set if s and s in resume_text_blob)
-
-        # Work mode preference match
-        work_mode_bonus = 0
-        try:
-            if job_work_mode and c.work_mode_preferences:
-                work_mode_bonus = 1 if any(job_work_mode.lower() == str(w).lower() for w in c.work_mode_preferences) else 0
-        except Exception:
-            work_mode_bonus = 0
 
-        # Employment type match
-        employment_bonus = 0
-        try:
-            if job_type_text and c.employment_type_preferences:
-                employment_bonus = 1 if any(job_type_text.lower() == str(t).lower() for t in c.employment_type_preferences) else 0
-        except Exception:
-            employment_bonus = 0
 
-        # Aggregate heuristic score
-        score = (skill_overlap * 3) + work_mode_bonus + employment_bonus
+def with_final_tier(cascade, ranked_candidates, total_tokens, total_cost, started_at):
+    """Appends the large-model tier (started at wall-clock `started_at`, possibly in another worker) to the cascade."""
+    return list(cascade or []) + [{
+        "tier": "final",
+        "model": settings.RANKING_MODEL,
+        "considered": len(ranked_candidates),
+        "kept": len(ranked_candidates),
+        "cutoff_score": ranked_candidates[-1]["score"] if ranked_candidates else None,
+        "seconds": round(time.time() - started_at, 3),
+        "token_usage": total_tokens,
+        "cost": total_cost,
+    }]
 
-        # Keep only somewhat relevant
-        if score > 0:
-            scored_candidates.append((score, c))
 
-    # Sort by score desc and cap the number to control LLM cost
-    scored_candidates.sort(key=lambda x: x[0], reverse=True)
+def load_candidate_data(candidate_ids):
+    """Loads the shortlisted profiles (in the given order) and renders them for scoring."""
+    profiles = CandidateProfile.objects.filter(id__in=candidate_ids, is_available=True).only(
+        'id', 'slug', 'resume_data', 'willing_to_relocate',
+        'expected_salary_range', 'employment_type_preferences',
+        'disclosure_preference', 'work_mode_preferences', 'workplace_accommodations',
+        'has_workvisa'
+    )
+    profiles_by_id = {c.id: c for c in profiles}
+    selected = [profiles_by_id[i] for i in candidate_ids if i in profiles_by_id]
 
-    # Ensure we have at least 3; if not, broaden by taking a few available profiles
-    TOP_CANDIDATES_LIMIT = 5  # control LLM cost
-    MIN_CANDIDATES = 3
-    selected = [c for _, c in scored_candidates[:TOP_CANDIDATES_LIMIT]]
-    if len(selected) < MIN_CANDIDATES:
-        needed = MIN_CANDIDATES - len(selected)
-        fallback = candidates_qs.exclude(id__in=[c.id for c in selected])[:needed]
-        selected.extend(list(fallback))
-
-    candidates_profiles = []
     candidate_data = []
     for c in selected:
         profile = f"""
@@ -212,56 +332,262 @@ Skills Required:
         
         This candidate is currently available and actively looking for opportunities.
         """
-        candidates_profiles.append(profile.strip())
         candidate_data.append({
             "id": c.id,
             "slug": c.slug,
+            "resume_hash": content_hash(c.resume_data),
             "resume_data": json.dumps(c.resume_data) if c.resume_data else "No resume data available",
             "profile": profile.strip()
         })
+    return candidate_data
+
+
+def update_progress(job_query, job_description, **fields):
+    """
+    Sets the job's progress to its saved successful scores for this job description. Counted from
+    the rows rather than incremented, so retried attempts and chunks never count a candidate twice.
+    """
+    scored = RankedCandidate.objects.filter(
+        job=OuterRef('pk'), job_hash=content_hash(job_description), error=False
+    ).order_by().values('job').annotate(count=Count('id')).values('count')
+    JobPost.objects.filter(id=job_query.id).update(ranking_scored=Coalesce(Subquery(scored), Value(0)), **fields)
 
-    # Rank candidates based on matching with job description
-    ranked_candidates, total_tokens, total_cost = rank_candidates_by_match(job_description, candidate_data)
-    
-    result_data= {
-        "ranked_candidates": ranked_candidates,
+
+def start_ranking(job_query, job_description, candidate_ids):
+    """
+    Prepares a ranking run: drops rows of candidates no longer shortlisted or scored for an older
+    job description, and sets progress to the remaining (reusable) scores of len(candidate_ids).
+    """
+    with transaction.atomic():
+        job_query.ranked_candidates.exclude(
+            candidate_id__in=candidate_ids, job_hash=content_hash(job_description)
+        ).delete()
+        update_progress(job_query, job_description, ranking_total=len(candidate_ids))
+
+
+def persist_scores(job_query, job_description):
+    """on_result callback: saves each batch of scores as soon as it arrives and updates the job's progress."""
+    def on_result(results):
+        upsert_ranked_candidates(job_query, results)
+        update_progress(job_query, job_description)
+    return on_result
+
+
+def reusable_rows(job_query, job_description, candidate_data):
+    """Results already saved for this run's exact (job description, resume) pairs, e.g. by a failed attempt."""
+    resume_hashes = {c["id"]: c["resume_hash"] for c in candidate_data}
+    rows = job_query.ranked_candidates.filter(
+        candidate_id__in=list(resume_hashes), job_hash=content_hash(job_description),
+        scoring_version=SCORING_VERSION, error=False
+    ).select_related('candidate').only('candidate_id', 'candidate__slug', 'score', 'reasons', 'tokens_used', 'cost', 'resume_hash')
+    return [{
+        "candidate_id": row.candidate_id,
+        "candidate_slug": row.candidate.slug,
+        "score": row.score,
+        "reasons": row.reasons,
+        "tokens_used": row.tokens_used,
+        "cost": row.cost,
+        "job_hash": content_hash(job_description),
+        "resume_hash": row.resume_hash,
+        "reused": True
+    } for row in rows if row.resume_hash == resume_hashes[row.candidate_id]]
+
+
+def score_shortlist(job_description, candidate_ids, job_query=None):
+    """
+    Scores the given candidates (cached scores are reused). Returns (ranked_candidates, token_usage, cost).
+    With `job_query`, every score is saved as a RankedCandidate row the moment it arrives and rows
+    already saved for the same (job description, resume) are reused, so a retry only pays for the rest.
+    """
+    candidate_data = load_candidate_data(candidate_ids)
+    if job_query is None:
+        return rank_candidates_with_cache(job_description, candidate_data)
+
+    reused = reusable_rows(job_query, job_description, candidate_data)
+    reused_ids = {r["candidate_id"] for r in reused}
+    pending = [c for c in candidate_data if c["id"] not in reused_ids]
+
+    ranked_candidates, total_tokens, total_cost = merge_ranking_results([
+        (reused, {"reused_scores": len(reused)}, 0),
+        rank_candidates_with_cache(job_description, pending, on_result=persist_scores(job_query, job_description)),
+    ])
+    return ranked_candidates, total_tokens, total_cost
+
+
+def merge_ranking_results(results):
+    """
+    Merges partial (ranked_candidates, token_usage, cost) results, e.g. from fan-out chunks,
+    into one ranking. Ties keep the order of `results`.
+    """
+    ranked_candidates, total_tokens, total_cost = [], {}, 0
+    for ranked, tokens, cost in results:
+        ranked_candidates.extend(ranked)
+        for key, value in tokens.items():
+            total_tokens[key] = total_tokens.get(key, 0) + value
+        total_cost += cost
+    ranked_candidates.sort(key=lambda x: x["score"], reverse=True)
+    return ranked_candidates, total_tokens, total_cost
+
+
+def ranking_summary(candidate_count, total_tokens, total_cost, cascade=None):
+    """Run summary stored on the job post; token usage and cost are the final tier's, `cascade` has every tier's."""
+    summary = {
+        "candidate_count": candidate_count,
         "token_usage": total_tokens,
         "estimated_cost": total_cost,
         "last_updated": str(datetime.datetime.now())
     }
-    job_query.candidate_ranking_data = result_data
-    job_query.save()
+    if cascade is not None:
+        summary["cascade"] = {"tiers": cascade, "total_cost": sum(tier.get("cost", 0) for tier in cascade)}
+    return summary
+
+
+def upsert_ranked_candidates(job_query, ranked_candidates):
+    """Inserts or updates one RankedCandidate row per scored candidate (one statement)."""
+    existing = set(CandidateProfile.objects.filter(
+        id__in=[r["candidate_id"] for r in ranked_candidates]
+    ).values_list('id', flat=True))
+    rows = [
+        RankedCandidate(
+            job=job_query,
+            candidate_id=r["candidate_id"],
+            score=r["score"],
+            reasons=r["reasons"],
+            tokens_used=round(r.get("tokens_used", 0)),
+            cost=r.get("cost", 0),
+            error=bool(r.get("error")),
+            job_hash=r.get("job_hash", ""),
+            resume_hash=r.get("resume_hash", ""),
+            scoring_version=SCORING_VERSION,
+        )
+        # Profiles deleted while the ranking ran are dropped
+        for r in ranked_candidates if r["candidate_id"] in existing
+    ]
+    RankedCandidate.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['job', 'candidate'],
+        update_fields=['score', 'reasons', 'tokens_used', 'cost', 'error', 'job_hash', 'resume_hash', 'scoring_version', 'updated_at'],
+    )
+    return rows
+
+
+def save_ranking_result(job_query, ranked_candidates, total_tokens, total_cost, cascade=None):
+    """
+    Replaces the job's RankedCandidate rows with this ranking and stores the run summary
+    (token usage, cost, cascade tiers) on the job post. Returns the summary plus the ranked candidates.
+    """
+    result_data = ranking_summary(len(ranked_candidates), total_tokens, total_cost, cascade)
+    with transaction.atomic():
+        job_query.ranked_candidates.exclude(candidate_id__in=[r["candidate_id"] for r in ranked_candidates]).delete()
+        upsert_ranked_candidates(job_query, ranked_candidates)
+        job_query.candidate_ranking_data = result_data
+        job_query.save(update_fields=['candidate_ranking_data'])
+    return {**result_data, "ranked_candidates": ranked_candidates}
+
+
+# Bump when the scoring prompt or model changes so cached scores are not reused
+SCORING_VERSION = 1
 
-    return {
-        "job": job_description,
-        "ranked_candidates": ranked_candidates,
-        "token_usage": total_tokens,
-        "estimated_cost": total_cost
-    }
 
+def content_hash(value):
+    """Stable SHA-256 of a string or JSON-serializable value."""
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(value.encode()).hexdigest()
 
-def rank_candidates_by_match(job_description, candidate_data):
+
+def score_cache_key(job_hash, resume_hash, model):
+    return f"candidate_score_v{SCORING_VERSION}_{model}_{job_hash}_{resume_hash}"
+
+
+def cached_scores(job_description, candidate_data, model):
     """
-    Ranks candidates based on how well their resume matches the job description.
-    Returns a list of candidate IDs ordered by relevance score.
+    Cached results of the candidates whose (job description, resume_data) pair `model` already scored,
+    and the candidates still to score. Returns (results by candidate id, misses, cache keys by candidate id).
     """
-    ranked_results = []
-    total_input_tokens = 0
-    total_output_tokens = 0
-    total_cost = 0
-    
+    job_hash = content_hash(job_description)
+    keys = {c["id"]: score_cache_key(job_hash, c["resume_hash"], model) for c in candidate_data}
+    cached = cache.get_many(list(keys.values()))
+
+    results_by_id = {}
+    misses = []
+    for candidate in candidate_data:
+        entry = cached.get(keys[candidate["id"]])
+        if entry is None:
+            misses.append(candidate)
+        else:
+            results_by_id[candidate["id"]] = {
+                "candidate_id": candidate["id"],
+                "candidate_slug": candidate["slug"],
+                **entry,
+                "job_hash": job_hash,
+                "resume_hash": candidate["resume_hash"],
+                "cached": True
+            }
+    return results_by_id, misses, keys
+
+
+def cache_scores(results, keys):
+    """Caches fresh results (not the failed ones) under their candidates' `keys`."""
+    cache.set_many({
+        keys[r["candidate_id"]]: {k: r[k] for k in ("score", "reasons", "tokens_used", "cost")}
+        for r in results if not r.get("error")
+    }, settings.RANKING_SCORE_CACHE_TTL)
+
+
+def rank_candidates_with_cache(job_description, candidate_data, on_result=None, model=None, mode=None):
+    """
+    Same contract as rank_candidates_by_match, but candidates whose (job description, resume_data)
+    pair was already scored by `model` reuse the cached score; only the rest are sent to the LLM.
+    Fresh scores are cached as they arrive, so a run that dies halfway keeps what it paid for.
+    Cache hits/misses are reported in the token usage.
+    """
+    model = model or settings.RANKING_MODEL
+    job_hash = content_hash(job_description)
+    resume_hashes = {c["id"]: c["resume_hash"] for c in candidate_data}
+    results_by_id, misses, keys = cached_scores(job_description, candidate_data, model)
+    print(f"Score cache: {len(results_by_id)} hits, {len(misses)} misses")
+    if on_result and results_by_id:
+        on_result(list(results_by_id.values()))
+
+    def store(results):
+        for r in results:
+            r["job_hash"], r["resume_hash"] = job_hash, resume_hashes[r["candidate_id"]]
+        cache_scores(results, keys)
+        if on_result:
+            on_result(results)
+
+    fresh_results, total_tokens, total_cost = rank_candidates_by_match(
+        job_description, misses, mode=mode, on_result=store, model=model
+    )
+    results_by_id.update((r["candidate_id"], r) for r in fresh_results)
+
+    # Rebuild in input order, then stable-sort so ordering matches an uncached run
+    ranked_results = [results_by_id[c["id"]] for c in candidate_data]
+    ranked_results.sort(key=lambda x: x["score"], reverse=True)
+
+    total_tokens["cache_hits"] = len(candidate_data) - len(misses)
+    total_tokens["cache_misses"] = len(misses)
+    return ranked_results, total_tokens, total_cost
+
+
+def get_token_encoding():
     try:
-        encoding = tiktoken.encoding_for_model("gpt-5")
-    except:
+        return tiktoken.encoding_for_model("gpt-5")
+    except KeyError:
         # Fallback to cl100k_base which is often used for newer models
-        encoding = tiktoken.get_encoding("cl100k_base")
-    
-    # Cost per 1000 tokens (adjust these rates based on OpenAI's current pricing)
-    input_cost_per_1k = 0.01  # $0.01 per 1K input tokens for GPT-4o
-    output_cost_per_1k = 0.03  # $0.03 per 1K output tokens for GPT-4o
-    
-    for candidate in candidate_data:
-        prompt = f"""
+        return tiktoken.get_encoding("cl100k_base")
+
+
+SYSTEM_MESSAGE = "You are an AI Talent Matcher that evaluates candidate fit for jobs."
+
+
+def call_cost(input_tokens, output_tokens, model, batch=False):
+    # Per-model rates live in backends.metrics.LLM_PRICING_PER_1K
+    return llm_cost(model, input_tokens, output_tokens, batch=batch)
+
+
+def build_scoring_prompt(job_description, candidate):
+    return f"""
 You are an AI Talent Matcher. Compare the following job description with the candidate's resume data.
 Rate how well the candidate's qualifications match the job requirements on a scale of 0-100, 
 where 100 is a perfect match. Focus on skills, experience, and overall fit.
@@ -278,66 +604,224 @@ Return only a JSON object with the following structure:
   "reasons": [<list_of_3_key_matching_points_or_mismatches>]
 }}
 """
-        
-        # Count input tokens
-        system_message = "You are an AI Talent Matcher that evaluates candidate fit for jobs."
-        system_tokens = len(encoding.encode(system_message))
-        prompt_tokens = len(encoding.encode(prompt))
-        input_tokens = system_tokens + prompt_tokens
-        total_input_tokens += input_tokens
-        
+
+
+def build_batch_prompt(job_description, candidates):
+    resumes = "\n\n".join(
+        f"CANDIDATE {candidate['id']} RESUME:\n{candidate['resume_data']}" for candidate in candidates
+    )
+    return f"""
+You are an AI Talent Matcher. Compare the following job description with each candidate's resume data.
+Rate each candidate independently on how well their qualifications match the job requirements on a scale of 0-100, 
+where 100 is a perfect match. Focus on skills, experience, and overall fit.
+
+JOB DESCRIPTION:
+{job_description}
+
+{resumes}
+
+Return only a JSON object with the following structure, with exactly one entry per candidate:
+{{
+  "scores": [
+    {{
+      "candidate_id": <candidate_id_as_given_above>,
+      "score": <numeric_score_between_0_and_100>,
+      "reasons": [<list_of_3_key_matching_points_or_mismatches>]
+    }}
+  ]
+}}
+"""
+
+
+def scoring_messages(prompt):
+    return [{"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}]
+
+
+def parse_batch_scores(response_content):
+    """{candidate_id: (score, reasons)} from a listwise response; invalid entries are skipped."""
+    scores = {}
+    for item in json.loads(response_content)["scores"]:
         try:
-            response = client.chat.completions.create(
-                model="gpt-5",
-                messages=[{"role": "system", "content": system_message},
-                          {"role": "user", "content": prompt}],
-                response_format={"type": "json_object"}
-            )
-            
-            # Get response content and count output tokens
-            response_content = response.choices[0].message.content
-            output_tokens = len(encoding.encode(response_content))
-            total_output_tokens += output_tokens
-            
-            # Calculate cost for this API call
-            input_cost = (input_tokens / 1000) * input_cost_per_1k
-            output_cost = (output_tokens / 1000) * output_cost_per_1k
-            call_cost = input_cost + output_cost
-            total_cost += call_cost
-            
-            # Parse the result
-            result = json.loads(response_content)
-            
-            ranked_results.append({
-                "candidate_id": candidate["id"],
-                "candidate_slug": candidate["slug"],
-                "score": result["score"],
-                "reasons": result["reasons"],
-                "tokens_used": input_tokens + output_tokens,
-                "cost": call_cost
-            })
-            
-        except Exception as e:
-            print(f"Error ranking candidate {candidate['id']}: {str(e)}")
-            # Add with a zero score if there's an error
-            ranked_results.append({
+            scores[int(item["candidate_id"])] = (float(item["score"]), list(item["reasons"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return scores
+
+
+def count_prompt_tokens(prompt, encoding):
+    return len(encoding.encode(SYSTEM_MESSAGE)) + len(encoding.encode(prompt))
+
+
+def score_candidate(job_description, candidate, encoding, model):
+    """
+    Scores a single candidate against the job description.
+    Never raises: a failed call comes back as a zero score so one bad candidate
+    can't sink the whole ranking. Returns (result, input_tokens, output_tokens).
+    """
+    prompt = build_scoring_prompt(job_description, candidate)
+
+    # Count input tokens
+    input_tokens = count_prompt_tokens(prompt, encoding)
+
+    try:
+        response = llm_call(
+            "ranking_score", client.chat.completions.create,
+            model=model,
+            messages=scoring_messages(prompt),
+            response_format={"type": "json_object"}
+        )
+
+        # Get response content and count output tokens
+        response_content = response.choices[0].message.content
+        output_tokens = len(encoding.encode(response_content))
+
+        # Parse the result
+        result = json.loads(response_content)
+
+        return {
+            "candidate_id": candidate["id"],
+            "candidate_slug": candidate["slug"],
+            "score": result["score"],
+            "reasons": result["reasons"],
+            "tokens_used": input_tokens + output_tokens,
+            "cost": call_cost(input_tokens, output_tokens, model)
+        }, input_tokens, output_tokens
+
+    except Exception as e:
+        print(f"Error ranking candidate {candidate['id']}: {str(e)}")
+        # Add with a zero score if there's an error
+        return {
+            "candidate_id": candidate["id"],
+            "candidate_slug": candidate["slug"],
+            "score": 0,
+            "reasons": ["Error during ranking"],
+            "tokens_used": input_tokens,
+            "cost": call_cost(input_tokens, 0, model),
+            "error": True
+        }, input_tokens, 0
+
+
+def pack_batches(job_description, candidate_data, encoding, token_budget=None, max_batch_size=None):
+    """
+    Greedily packs candidates, in order, into listwise batches whose prompt stays within
+    `token_budget` input tokens. A candidate that does not fit even alone gets its own batch.
+    """
+    token_budget = token_budget or settings.RANKING_BATCH_TOKEN_BUDGET
+    max_batch_size = max_batch_size or settings.RANKING_BATCH_MAX_CANDIDATES
+    base_tokens = count_prompt_tokens(build_batch_prompt(job_description, []), encoding)
+
+    batches, current, used = [], [], base_tokens
+    for candidate in candidate_data:
+        tokens = len(encoding.encode(f"CANDIDATE {candidate['id']} RESUME:\n{candidate['resume_data']}\n\n"))
+        if current and (used + tokens > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current, used = [], base_tokens
+        current.append(candidate)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def score_batch(job_description, batch, encoding, model):
+    """
+    Scores a batch of candidates with one listwise call. Candidates missing from (or invalid in)
+    the response, or the whole batch if the response can't be parsed, fall back to score_candidate.
+    Returns [(result, input_tokens, output_tokens)] in batch order; the batch call's tokens are split evenly.
+    """
+    if len(batch) == 1:
+        return [score_candidate(job_description, batch[0], encoding, model)]
+
+    prompt = build_batch_prompt(job_description, batch)
+    input_tokens = count_prompt_tokens(prompt, encoding)
+    output_tokens = 0
+    scores = {}
+    try:
+        response = llm_call(
+            "ranking_batch_score", client.chat.completions.create,
+            model=model,
+            messages=scoring_messages(prompt),
+            response_format={"type": "json_object"}
+        )
+        response_content = response.choices[0].message.content
+        output_tokens = len(encoding.encode(response_content))
+        scores = parse_batch_scores(response_content)
+    except Exception as e:
+        print(f"Batch ranking failed for candidates {[c['id'] for c in batch]}, scoring individually: {str(e)}")
+
+    share_in, share_out = input_tokens / len(batch), output_tokens / len(batch)
+    outcomes = []
+    for candidate in batch:
+        if candidate["id"] in scores:
+            score, reasons = scores[candidate["id"]]
+            outcomes.append(({
                 "candidate_id": candidate["id"],
                 "candidate_slug": candidate["slug"],
-                "score": 0,
-                "reasons": ["Error during ranking"],
-                "tokens_used": input_tokens,
-                "cost": (input_tokens / 1000) * input_cost_per_1k
-            })
-    
-    # Sort candidates by score in descending order
+                "score": score,
+                "reasons": reasons,
+                "tokens_used": round(share_in + share_out),
+                "cost": call_cost(share_in, share_out, model)
+            }, share_in, share_out))
+        else:
+            # Fallback: score this one on its own, still paying its share of the batch call
+            result, fallback_in, fallback_out = score_candidate(job_description, candidate, encoding, model)
+            result["tokens_used"] += round(share_in + share_out)
+            result["cost"] += call_cost(share_in, share_out, model)
+            outcomes.append((result, fallback_in + share_in, fallback_out + share_out))
+    return outcomes
+
+
+def rank_candidates_by_match(job_description, candidate_data, max_concurrency=None, mode=None, on_result=None, model=None):
+    """
+    Ranks candidates based on how well their resume matches the job description.
+    mode "single" sends one prompt per candidate; "batched" packs several candidates into one
+    listwise prompt (defaults to settings.RANKING_SCORING_MODE). Calls run concurrently,
+    at most `max_concurrency` in flight (defaults to settings.RANKING_MAX_CONCURRENCY).
+    `model` defaults to settings.RANKING_MODEL.
+    `on_result(results)` is called in the calling thread as each call's results arrive.
+    Returns a list of candidate IDs ordered by relevance score.
+    """
+    if max_concurrency is None:
+        max_concurrency = settings.RANKING_MAX_CONCURRENCY
+    mode = mode or settings.RANKING_SCORING_MODE
+    model = model or settings.RANKING_MODEL
+
+    encoding = get_token_encoding()
+
+    if mode == "batched":
+        units = pack_batches(job_description, candidate_data, encoding)
+        score_unit = lambda batch: score_batch(job_description, batch, encoding, model)
+    else:
+        units = candidate_data
+        score_unit = lambda candidate: [score_candidate(job_description, candidate, encoding, model)]
+
+    unit_outcomes = [[] for _ in units]
+    if units:
+        workers = max(1, min(max_concurrency, len(units)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rank-candidate") as executor:
+            futures = {executor.submit(score_unit, unit): index for index, unit in enumerate(units)}
+            for future in as_completed(futures):
+                unit_outcomes[futures[future]] = future.result()
+                if on_result:
+                    on_result([result for result, _, _ in unit_outcomes[futures[future]]])
+    # Collected in submission order, so results stay deterministic
+    outcomes = [outcome for unit in unit_outcomes for outcome in unit]
+
+    ranked_results = [result for result, _, _ in outcomes]
+    total_input_tokens = round(sum(input_tokens for _, input_tokens, _ in outcomes))
+    total_output_tokens = round(sum(output_tokens for _, _, output_tokens in outcomes))
+    total_cost = sum(result["cost"] for result in ranked_results)
+
+    # Sort candidates by score in descending order (stable, so ties keep input order)
     ranked_results.sort(key=lambda x: x["score"], reverse=True)
-    
+
     # Total token usage information
     total_tokens = {
         "input_tokens": total_input_tokens,
         "output_tokens": total_output_tokens,
         "total_tokens": total_input_tokens + total_output_tokens
     }
-    
+
     # Return the sorted list of candidates with token usage and cost information
-    return ranked_results, total_tokens, total_cost
\ No newline at end of file
+    return ranked_results, total_tokens, total_cost
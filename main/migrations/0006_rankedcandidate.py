@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 14:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0006_candidateprofile_structured_search_indexes'),
+        ('main', '0005_jobpost_main_jobpos_organiz_6a0da8_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobpost',
+            name='candidate_ranking_data',
+            field=models.JSONField(blank=True, help_text='Summary of the last ranking run (token usage, cost); the rows live in RankedCandidate', null=True),
+        ),
+        migrations.CreateModel(
+            name='RankedCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('reasons', models.JSONField(default=list)),
+                ('tokens_used', models.PositiveIntegerField(default=0)),
+                ('cost', models.FloatField(default=0)),
+                ('error', models.BooleanField(default=False, help_text='Scoring failed, the score is a 0 placeholder')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='candidates.candidateprofile')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranked_candidates', to='main.jobpost')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job', '-score'], name='ranked_candidate_job_score')],
+                'constraints': [models.UniqueConstraint(fields=('job', 'candidate'), name='unique_ranked_candidate_per_job')],
+            },
+        ),
+    ]
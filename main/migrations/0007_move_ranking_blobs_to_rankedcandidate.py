@@ -0,0 +1,73 @@
+from django.db import migrations
+
+
+def blobs_to_rows(apps, schema_editor):
+    JobPost = apps.get_model('main', 'JobPost')
+    RankedCandidate = apps.get_model('main', 'RankedCandidate')
+    CandidateProfile = apps.get_model('candidates', 'CandidateProfile')
+
+    jobs = JobPost.objects.filter(candidate_ranking_data__isnull=False).only('id', 'candidate_ranking_data')
+    for job in jobs.iterator(chunk_size=200):
+        data = job.candidate_ranking_data or {}
+        entries = data.get('ranked_candidates') or []
+        existing = set(CandidateProfile.objects.filter(
+            id__in=[entry.get('candidate_id') for entry in entries]
+        ).values_list('id', flat=True))
+
+        rows, seen = [], set()
+        for entry in entries:
+            candidate_id = entry.get('candidate_id')
+            if candidate_id not in existing or candidate_id in seen:
+                continue
+            seen.add(candidate_id)
+            rows.append(RankedCandidate(
+                job_id=job.id,
+                candidate_id=candidate_id,
+                score=entry.get('score') or 0,
+                reasons=entry.get('reasons') or [],
+                tokens_used=round(entry.get('tokens_used') or 0),
+                cost=entry.get('cost') or 0,
+                error=bool(entry.get('error')),
+            ))
+        RankedCandidate.objects.bulk_create(rows, ignore_conflicts=True)
+
+        job.candidate_ranking_data = {
+            'candidate_count': len(rows),
+            'token_usage': data.get('token_usage', {}),
+            'estimated_cost': data.get('estimated_cost', 0),
+            'last_updated': data.get('last_updated'),
+        }
+        job.save(update_fields=['candidate_ranking_data'])
+
+
+def rows_to_blobs(apps, schema_editor):
+    JobPost = apps.get_model('main', 'JobPost')
+    RankedCandidate = apps.get_model('main', 'RankedCandidate')
+
+    jobs = JobPost.objects.filter(candidate_ranking_data__isnull=False).only('id', 'candidate_ranking_data')
+    for job in jobs.iterator(chunk_size=200):
+        rows = RankedCandidate.objects.filter(job_id=job.id).select_related('candidate').order_by('-score', 'id')
+        data = dict(job.candidate_ranking_data)
+        data.pop('candidate_count', None)
+        data['ranked_candidates'] = [{
+            'candidate_id': row.candidate_id,
+            'candidate_slug': row.candidate.slug,
+            'score': row.score,
+            'reasons': row.reasons,
+            'tokens_used': row.tokens_used,
+            'cost': row.cost,
+            **({'error': True} if row.error else {}),
+        } for row in rows]
+        job.candidate_ranking_data = data
+        job.save(update_fields=['candidate_ranking_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_rankedcandidate'),
+    ]
+
+    operations = [
+        migrations.RunPython(blobs_to_rows, rows_to_blobs),
+    ]
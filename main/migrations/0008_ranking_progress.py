@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 15:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_move_ranking_blobs_to_rankedcandidate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobpost',
+            name='ranking_scored',
+            field=models.PositiveIntegerField(default=0, help_text='Candidates scored so far in the current/last ranking run'),
+        ),
+        migrations.AddField(
+            model_name='jobpost',
+            name='ranking_total',
+            field=models.PositiveIntegerField(default=0, help_text='Candidates shortlisted for the current/last ranking run'),
+        ),
+        migrations.AddField(
+            model_name='rankedcandidate',
+            name='job_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='rankedcandidate',
+            name='resume_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='rankedcandidate',
+            name='scoring_version',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+    ]
@@ -50,10 +50,13 @@ class JobPost(models.Model):
     skills= models.ManyToManyField(Skills)
     estimated_salary= models.CharField(max_length=100)
     created_at= models.DateTimeField(auto_now_add=True)
+    updated_at= models.DateTimeField(auto_now=True)
     visa_required= models.BooleanField(default=False)
-    candidate_ranking_data = models.JSONField(null=True, blank=True, help_text="Stores candidate ranking results")
+    candidate_ranking_data = models.JSONField(null=True, blank=True, help_text="Summary of the last ranking run (token usage, cost); the rows live in RankedCandidate")
     ranking_status = models.CharField(max_length=20, choices=RANKING_STATUS, default='not_ranked')
     ranking_task_id = models.CharField(max_length=255, blank=True, null=True, help_text="Celery task ID for tracking")
+    ranking_scored = models.PositiveIntegerField(default=0, help_text="Candidates scored so far in the current/last ranking run")
+    ranking_total = models.PositiveIntegerField(default=0, help_text="Candidates shortlisted for the current/last ranking run")
 
     def __str__(self):
         return self.title
@@ -63,4 +66,31 @@ class JobPost(models.Model):
             models.Index(fields=['organization', 'created_at']),
             models.Index(fields=['ranking_status']),
             models.Index(fields=['visa_required']),
+        ]
+
+
+class RankedCandidate(models.Model):
+    job= models.ForeignKey(JobPost, on_delete=models.CASCADE, related_name='ranked_candidates')
+    candidate= models.ForeignKey('candidates.CandidateProfile', on_delete=models.CASCADE, related_name='rankings')
+    score= models.FloatField()
+    reasons= models.JSONField(default=list)
+    tokens_used= models.PositiveIntegerField(default=0)
+    cost= models.FloatField(default=0)
+    error= models.BooleanField(default=False, help_text="Scoring failed, the score is a 0 placeholder")
+    # What was scored, so a retried or repeated run can reuse the row instead of paying again
+    job_hash= models.CharField(max_length=64, blank=True, default='')
+    resume_hash= models.CharField(max_length=64, blank=True, default='')
+    scoring_version= models.PositiveSmallIntegerField(default=1)
+    created_at= models.DateTimeField(auto_now_add=True)
+    updated_at= models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Candidate {self.candidate_id} for job {self.job_id}: {self.score}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'candidate'], name='unique_ranked_candidate_per_job'),
+        ]
+        indexes = [
+            models.Index(fields=['job', '-score'], name='ranked_candidate_job_score'),
         ]
\ No newline at end of file
@@ -0,0 +1,115 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from candidates.features import get_feature_matrix
+from candidates.models import CandidateProfile
+from .jobpost_candidate_ranker import (
+    build_job_description, job_heuristic_scores, job_search_keywords, load_candidate_data,
+    merge_ranking_results, rank_candidates_with_cache, ranking_summary, upsert_ranked_candidates,
+)
+from .models import JobPost
+
+
+def lexical_positions(job_query, candidate_ids, features):
+    """
+    Runs the candidates through the lexical tier of a full ranking (prepare_ranking) on the current
+    pool: a candidate must be relevant (skill overlap) and, once the ranking is full, rank by BM25
+    within the candidates that tier would keep. The screening tier is skipped; the final-tier score
+    decides whether a candidate makes the list.
+    Returns {candidate_id: relevant candidates ahead of it by BM25} for the candidates that qualify.
+    """
+    eligible = features.eligible_mask(job_query.visa_required)
+    rows = {i: features.row_of[i] for i in candidate_ids if i in features.row_of}
+    rows = {i: row for i, row in rows.items() if eligible[row]}
+    if not rows:
+        return {}
+
+    keywords = job_search_keywords(job_query)
+    relevant = eligible & (job_heuristic_scores(job_query, features, keywords) > 0)
+    rows = {i: row for i, row in rows.items() if relevant[row]}
+    if not rows:
+        return {}
+
+    lexical = features.bm25_scores(keywords)
+    relevant_scores = np.sort(lexical[relevant])
+    ranked_ids = set(job_query.ranked_candidates.values_list('candidate_id', flat=True))
+    cutoff = max(settings.RANKING_SHORTLIST_SIZE, settings.RANKING_SCREEN_TOP_N)
+    positions = {}
+    for candidate_id, row in rows.items():
+        ahead = len(relevant_scores) - int(np.searchsorted(relevant_scores, lexical[row], side='right'))
+        if len(ranked_ids - {candidate_id}) < settings.RANKING_SHORTLIST_SIZE or ahead < cutoff:
+            positions[candidate_id] = ahead
+    return positions
+
+
+def merge_candidate_into_ranking(job_id, job_description, candidate_data):
+    """
+    Scores one candidate against a ranked job and upserts its RankedCandidate row, trimming the
+    ranking back to its size. Returns True if the candidate made the list.
+    """
+    ranked, tokens, cost = rank_candidates_with_cache(job_description, candidate_data)
+
+    with transaction.atomic():
+        job_query = JobPost.objects.select_for_update().get(id=job_id)
+        if job_query.ranking_status != 'ranked':
+            # A full (re-)ranking started meanwhile and will include this candidate
+            return False
+
+        candidate_id = candidate_data[0]["id"]
+        limit = max(settings.RANKING_SHORTLIST_SIZE, job_query.ranked_candidates.exclude(candidate_id=candidate_id).count())
+        upsert_ranked_candidates(job_query, ranked)
+
+        # Only the `limit` best rows stay; ties keep the candidates that were ranked first
+        kept = list(job_query.ranked_candidates.order_by('-score', 'id').values_list('candidate_id', flat=True)[:limit])
+        job_query.ranked_candidates.exclude(candidate_id__in=kept).delete()
+
+        summary = job_query.candidate_ranking_data or {}
+        _, total_tokens, total_cost = merge_ranking_results([
+            ([], summary.get("token_usage", {}), summary.get("estimated_cost", 0)),
+            ([], tokens, cost),
+        ])
+        # The cascade record still describes the full ranking run
+        cascade = (summary.get("cascade") or {}).get("tiers")
+        job_query.candidate_ranking_data = ranking_summary(len(kept), total_tokens, total_cost, cascade)
+        job_query.save(update_fields=['candidate_ranking_data'])
+
+    return candidate_id in kept
+
+
+def match_candidates_to_jobs(candidate_ids):
+    """
+    Rank-on-write: pre-scores newly parsed / newly available candidates against every job that
+    already has a ranking and merges each into the rankings it qualifies for. The lexical tier runs
+    once per job for all the candidates, and only each candidate's REVERSE_MATCH_MAX_JOBS best placed
+    jobs (fewest candidates ahead by BM25) are scored by the LLM.
+    """
+    candidate_ids = list(CandidateProfile.objects.filter(
+        id__in=candidate_ids, is_available=True, resume_data__isnull=False
+    ).values_list('id', flat=True))
+    if not candidate_ids:
+        return {"candidate_ids": [], "checked_jobs": 0, "merged_jobs": {}}
+
+    features = get_feature_matrix()
+    placements = {candidate_id: [] for candidate_id in candidate_ids}
+    checked = 0
+
+    jobs = JobPost.objects.filter(ranking_status='ranked', candidate_ranking_data__isnull=False).prefetch_related('skills')
+    for job_query in jobs.iterator(chunk_size=100):
+        checked += 1
+        for candidate_id, ahead in lexical_positions(job_query, candidate_ids, features).items():
+            placements[candidate_id].append((ahead, job_query.id, job_query))
+
+    candidate_data = {c["id"]: c for c in load_candidate_data(candidate_ids)}
+    merged = {}
+    for candidate_id, placed in placements.items():
+        if candidate_id not in candidate_data or not placed:
+            continue
+        best = sorted(placed, key=lambda p: p[:2])[:settings.REVERSE_MATCH_MAX_JOBS]
+        merged[candidate_id] = [
+            job_query.id for _, _, job_query in best
+            if merge_candidate_into_ranking(job_query.id, build_job_description(job_query), [candidate_data[candidate_id]])
+        ]
+
+    print(f"Rank-on-write for {len(candidate_ids)} candidates: checked {checked} jobs, merged {merged}")
+    return {"candidate_ids": candidate_ids, "checked_jobs": checked, "merged_jobs": merged}
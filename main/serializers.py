@@ -66,7 +66,14 @@ class JobPostSerializer(serializers.ModelSerializer):
     class Meta:
         model= models.JobPost
         fields= ['user','organization', 'title', 'job_desc', 'workplace_type',
-                 'location', 'job_type', 'skills', 'id', 'estimated_salary', 'visa_required', 'candidate_ranking_data']
+                 'location', 'job_type', 'skills', 'id', 'estimated_salary', 'visa_required']
+
+
+class RankedCandidateSerializer(serializers.ModelSerializer):
+    candidate_slug= serializers.CharField(source='candidate.slug', read_only=True)
+    class Meta:
+        model= models.RankedCandidate
+        fields= ['candidate_id', 'candidate_slug', 'score', 'reasons', 'tokens_used', 'cost', 'error', 'updated_at']
 
 class AgentQuerySerializer(serializers.Serializer):
     query = serializers.CharField(help_text="The recruiter's query to search for candidates")
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from candidates.features import record_deletion
+from candidates.models import CandidateProfile
+
+# A candidate is (re-)matched when it becomes parsed or available, i.e. when one of these changes
+TRANSITION_FIELDS = ('parsing_status', 'is_available')
+
+
+def matching_state(instance):
+    # Read from __dict__ so deferred fields aren't loaded (they stay None, i.e. unknown)
+    return {field: instance.__dict__.get(field) for field in TRANSITION_FIELDS}
+
+
+@receiver(post_init, sender=CandidateProfile, dispatch_uid='snapshot_candidate_matching_state')
+def snapshot_matching_state(sender, instance, **kwargs):
+    """Remembers the loaded parsing_status / is_available so post_save can tell what changed."""
+    instance._saved_matching_state = matching_state(instance)
+
+
+@receiver(post_save, sender=CandidateProfile, dispatch_uid='match_candidate_to_jobs')
+def match_candidate_on_save(sender, instance, created=False, update_fields=None, **kwargs):
+    """Queues reverse matching once a candidate that became parsed or available is committed."""
+    before = getattr(instance, '_saved_matching_state', {})
+    saved = set(TRANSITION_FIELDS) if update_fields is None else set(update_fields)
+    after = {field: value if field in saved else before.get(field) for field, value in matching_state(instance).items()}
+    instance._saved_matching_state = after
+
+    became_parsed = 'parsing_status' in saved and (created or before.get('parsing_status') != 'parsed')
+    became_available = 'is_available' in saved and (created or not before.get('is_available'))
+    if not (became_parsed or became_available):
+        return
+    if after['parsing_status'] != 'parsed' or not after['is_available']:
+        return
+
+    from .tasks import match_candidates_to_jobs_task
+    transaction.on_commit(lambda: match_candidates_to_jobs_task.delay([instance.id]))
+
+
+@receiver(post_delete, sender=CandidateProfile, dispatch_uid='drop_deleted_candidate_features')
+def drop_deleted_candidate_features(sender, instance, **kwargs):
+    """Makes every process's feature matrix rebuild without the deleted profile once the delete is committed."""
+    transaction.on_commit(record_deletion)
+
+
+def queue_reverse_matching(profiles):
+    """
+    Queues reverse matching for candidate profiles written with bulk_create / bulk_update, which
+    don't send post_save (bulk imports, batch parses): one task per REVERSE_MATCH_CHUNK_SIZE profiles.
+    """
+    from .tasks import match_candidates_to_jobs_task
+    candidate_ids = [profile.id for profile in profiles if profile.is_available and profile.resume_data]
+    chunk_size = settings.REVERSE_MATCH_CHUNK_SIZE
+
+    def enqueue():
+        # The profiles are written either way; a broker outage must not fail the import or parse
+        try:
+            for start in range(0, len(candidate_ids), chunk_size):
+                match_candidates_to_jobs_task.delay(candidate_ids[start:start + chunk_size])
+        except Exception as e:
+            print(f"Queueing reverse matching failed for {len(candidate_ids)} candidates: {str(e)}")
+
+    transaction.on_commit(enqueue)
@@ -0,0 +1,92 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from dotenv import load_dotenv
+from openai import OpenAI
+from pydantic import BaseModel
+
+from backends.llm import llm_call
+
+load_dotenv()
+client = OpenAI()
+
+# Bump when the prompt changes so stale expansions are not reused
+EXPANSION_VERSION = 1
+
+
+class SkillSynonyms(BaseModel):
+    skill: str
+    keywords: list[str]
+
+
+class SkillExpansionOutput(BaseModel):
+    skills: list[SkillSynonyms]
+
+
+def normalize_skill(skill):
+    return " ".join(str(skill).lower().split())
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+
+def skill_cache_key(skill):
+    return f"skill_expansion_v{EXPANSION_VERSION}_{_digest(skill)}"
+
+
+def skill_set_cache_key(skills):
+    return f"skill_expansion_set_v{EXPANSION_VERSION}_{_digest('|'.join(skills))}"
+
+
+def request_skill_expansions(skills):
+    """Asks the LLM for search keywords for each skill. Returns {normalized skill: [keywords]}."""
+    response = llm_call(
+        "skill_expansion", client.responses.parse,
+        model="gpt-4o",
+        input=[
+            {'role': 'developer', "content": "You're an Keyword/Synoname generating assistant which generates similar keywords for any given particular skill, Example: Sample Input=Python Backend Developer, Sample Output= Python, Django, Flask, ORM, databases, FastAPI, etc, etc. Return the keywords separately for every skill you are given, using the skill exactly as written."},
+            {'role': 'user', 'content': f"Generate keywords to search resume in the database for each of the given Skills: {', '.join(skills)}"},
+        ],
+        text_format=SkillExpansionOutput,
+    )
+    return {
+        normalize_skill(item.skill): sorted({normalize_skill(k) for k in item.keywords if normalize_skill(k)})
+        for item in response.output_parsed.skills
+    }
+
+
+def expand_skills(skills):
+    """
+    Expands job skills into resume search keywords (the skills themselves plus synonyms).
+    Expansions are cached per skill and per normalized skill set, so only skills that
+    were never expanded before are sent to the LLM.
+    """
+    skills = sorted({normalize_skill(s) for s in skills if normalize_skill(s)})
+    if not skills:
+        return []
+
+    ttl = settings.SKILL_EXPANSION_CACHE_TTL
+    set_key = skill_set_cache_key(skills)
+    keywords = cache.get(set_key)
+    if keywords is not None:
+        return keywords
+
+    keys = {skill: skill_cache_key(skill) for skill in skills}
+    cached = cache.get_many(list(keys.values()))
+    expansions = {skill: cached[key] for skill, key in keys.items() if key in cached}
+    missing = [skill for skill in skills if skill not in expansions]
+    print(f"Skill expansion: {len(expansions)} cached, {len(missing)} requested")
+
+    if missing:
+        fresh = request_skill_expansions(missing)
+        # Skills the model skipped are not cached, so they get another chance next time
+        returned = {skill: fresh[skill] for skill in missing if skill in fresh}
+        cache.set_many({keys[skill]: value for skill, value in returned.items()}, ttl)
+        expansions.update(returned)
+
+    keywords = sorted({k for skill in skills for k in [skill, *expansions.get(skill, [])]})
+    if not set(missing) - set(expansions):
+        cache.set(set_key, keywords, ttl)
+    return keywords
@@ -1,13 +1,36 @@
-from celery import shared_task
-from django.core.cache import cache
+import random
+import time
+
+from celery import shared_task, chord
+from django.conf import settings
+from django.utils import timezone
 from .models import JobPost
-from .jobpost_candidate_ranker import ranking_algo
+from .jobpost_candidate_ranker import (
+    prepare_ranking, start_ranking, score_shortlist, merge_ranking_results, save_ranking_result, with_final_tier,
+)
+
+
+class IncompleteRanking(Exception):
+    """Some candidates could not be scored, even after the per-call retries."""
+
+
+def complete_ranking(job_post, ranked_candidates, total_tokens, total_cost, cascade, started_at):
+    """Stores the final ranking (with the cascade tiers, the final one started at `started_at`) and marks the job as ranked."""
+    cascade = with_final_tier(cascade, ranked_candidates, total_tokens, total_cost, started_at)
+    result = save_ranking_result(job_post, ranked_candidates, total_tokens, total_cost, cascade)
+    job_post.ranking_status = 'ranked'
+    job_post.save(update_fields=['ranking_status', 'updated_at'])
+    return result
 
 
 @shared_task(bind=True, max_retries=3, time_limit=1800, soft_time_limit=1500)
 def rank_candidates_task(self, job_id):
     """
     Background task to rank candidates for a job post.
+    Large shortlists are split into chunks scored by parallel subtasks (see RANKING_FANOUT_CHUNK_SIZE)
+    and merged by finalize_ranking_task.
+    Every score is saved as it arrives, so a retry (also when some candidates stayed unscored) only
+    pays for the candidates without a saved score; the last attempt keeps whatever could be scored.
     """
     try:
         print(f"Starting candidate ranking task for job {job_id}")
@@ -17,52 +40,149 @@ def rank_candidates_task(self, job_id):
         
         # Update ranking status to 'in progress'
         job_post.ranking_status = 'ranking'
-        job_post.save(update_fields=['ranking_status'])
-        
-        # Run the ranking algorithm
-        result = ranking_algo(job_id)
+        job_post.save(update_fields=['ranking_status', 'updated_at'])
         
-        # Update the job post with results
-        job_post.candidate_ranking_data = {
-            "ranked_candidates": result.get("ranked_candidates", []),
-            "token_usage": result.get("token_usage", {}),
-            "estimated_cost": result.get("estimated_cost", 0),
-            "last_updated": result.get("last_updated", "")
-        }
-        job_post.ranking_status = 'ranked'
-        job_post.save()
-        
-        # Clear cache for this job's ranking data
-        cache_key = f"job_ranking_data_{job_id}"
-        cache.delete(cache_key)
+        # Build the job description and shortlist candidates through the lexical and screening tiers
+        _, job_description, selected_ids, cascade = prepare_ranking(job_id)
+        start_ranking(job_post, job_description, selected_ids)
+        started_at = time.time()
+
+        chunk_size = settings.RANKING_FANOUT_CHUNK_SIZE
+        if chunk_size and len(selected_ids) > chunk_size:
+            chunks = [selected_ids[i:i + chunk_size] for i in range(0, len(selected_ids), chunk_size)]
+            callback = finalize_ranking_task.s(job_id, cascade, started_at).on_error(ranking_fanout_failed_task.s(job_id=job_id))
+            chord(score_candidates_chunk_task.s(job_id, job_description, chunk) for chunk in chunks)(callback)
+            print(f"Fanned out ranking for job {job_id}: {len(selected_ids)} candidates in {len(chunks)} chunks")
+            return {"status": "fanned_out", "job_id": job_id, "chunks": len(chunks)}
+
+        # Score the shortlist in this worker
+        ranked_candidates, total_tokens, total_cost = score_shortlist(job_description, selected_ids, job_post)
+        failed = sum(1 for r in ranked_candidates if r.get("error"))
+        if failed and self.request.retries < self.max_retries:
+            raise IncompleteRanking(f"{failed} of {len(ranked_candidates)} candidates could not be scored")
+        complete_ranking(job_post, ranked_candidates, total_tokens, total_cost, cascade, started_at)
         
         print(f"Candidate ranking completed successfully for job {job_id}")
         return {
             "status": "success", 
             "job_id": job_id,
-            "ranked_candidates_count": len(result.get("ranked_candidates", [])),
-            "total_cost": result.get("estimated_cost", 0)
+            "ranked_candidates_count": len(ranked_candidates),
+            "total_cost": total_cost
         }
         
     except Exception as exc:
         print(f"Candidate ranking failed for job {job_id}: {str(exc)}")
         
+        # Retry the task if it's not the last attempt; the job stays 'ranking' so no second run starts meanwhile
+        if self.request.retries < self.max_retries:
+            print(f"Retrying candidate ranking task for job {job_id} (attempt {self.request.retries + 1})")
+            countdown = 60 * (self.request.retries + 1) * random.uniform(0.5, 1.5)  # Backoff, jittered across jobs
+            raise self.retry(exc=exc, countdown=countdown)
+        
         # Update ranking status to 'failed'
         try:
             job_post = JobPost.objects.get(id=job_id)
             job_post.ranking_status = 'failed'
-            job_post.save(update_fields=['ranking_status'])
+            job_post.save(update_fields=['ranking_status', 'updated_at'])
         except JobPost.DoesNotExist:
             print(f"Job post {job_id} not found")
         
-        # Retry the task if it's not the last attempt
-        if self.request.retries < self.max_retries:
-            print(f"Retrying candidate ranking task for job {job_id} (attempt {self.request.retries + 1})")
-            raise self.retry(countdown=60 * (self.request.retries + 1))  # Exponential backoff
-        
         return {"status": "failed", "error": str(exc)}
 
 
+@shared_task(bind=True, max_retries=3, time_limit=900, soft_time_limit=840)
+def score_candidates_chunk_task(self, job_id, job_description, candidate_ids):
+    """
+    Fan-out subtask: scores one chunk of a job's shortlist, saving each score as it arrives.
+    Retried like rank_candidates_task while candidates stay unscored (a retry only pays for those);
+    the last attempt hands whatever could be scored to finalize_ranking_task.
+    """
+    print(f"Scoring {len(candidate_ids)} candidates for job {job_id}")
+    try:
+        job_post = JobPost.objects.get(id=job_id)
+        ranked_candidates, total_tokens, total_cost = score_shortlist(job_description, candidate_ids, job_post)
+        failed = sum(1 for r in ranked_candidates if r.get("error"))
+        if failed and self.request.retries < self.max_retries:
+            raise IncompleteRanking(f"{failed} of {len(ranked_candidates)} candidates could not be scored")
+    except Exception as exc:
+        if self.request.retries >= self.max_retries or isinstance(exc, JobPost.DoesNotExist):
+            raise
+        print(f"Retrying chunk of job {job_id} (attempt {self.request.retries + 1}): {str(exc)}")
+        raise self.retry(exc=exc, countdown=60 * (self.request.retries + 1) * random.uniform(0.5, 1.5))
+    return {
+        "ranked_candidates": ranked_candidates,
+        "token_usage": total_tokens,
+        "estimated_cost": total_cost
+    }
+
+
+@shared_task
+def finalize_ranking_task(chunk_results, job_id, cascade=None, started_at=None):
+    """
+    Chord callback: merges the chunk results (in chunk order) and stores the final ranking.
+    """
+    ranked_candidates, total_tokens, total_cost = merge_ranking_results(
+        (r["ranked_candidates"], r["token_usage"], r["estimated_cost"]) for r in chunk_results
+    )
+    job_post = JobPost.objects.get(id=job_id)
+    complete_ranking(job_post, ranked_candidates, total_tokens, total_cost, cascade, started_at or time.time())
+
+    print(f"Candidate ranking completed successfully for job {job_id} ({len(chunk_results)} chunks)")
+    return {
+        "status": "success",
+        "job_id": job_id,
+        "ranked_candidates_count": len(ranked_candidates),
+        "total_cost": total_cost
+    }
+
+
+@shared_task
+def ranking_fanout_failed_task(*args, job_id=None):
+    """
+    Chord error callback: a chunk (or the merge) failed, so the ranking can't complete.
+    """
+    print(f"Candidate ranking fan-out failed for job {job_id}")
+    JobPost.objects.filter(id=job_id, ranking_status='ranking').update(ranking_status='failed', updated_at=timezone.now())
+
+
+@shared_task(time_limit=900, soft_time_limit=840)
+def match_candidates_to_jobs_task(candidate_ids):
+    """
+    Rank-on-write: merges newly parsed / updated candidates (a chunk of at most
+    REVERSE_MATCH_CHUNK_SIZE) into the existing job rankings they qualify for.
+    """
+    from .reverse_matching import match_candidates_to_jobs
+    return match_candidates_to_jobs(candidate_ids)
+
+
+@shared_task(time_limit=3600, soft_time_limit=3500)
+def submit_ranking_batch_task(job_ids=None, limit=None):
+    """
+    Overnight ranking: submits the final-tier scoring of the given (default: never ranked) job posts
+    as one Batch API run (see main.batch_ranking) and starts polling it.
+    """
+    from .batch_ranking import submit_ranking_batch
+
+    run = submit_ranking_batch(job_ids, limit=limit)
+    if run is None:
+        return {"status": "idle"}
+    if run.status == 'submitted':
+        poll_ranking_batch_task.apply_async(args=(run.id,), countdown=settings.LLM_BATCH_POLL_INTERVAL)
+    return {"status": run.status, "run_id": run.id, "requests": run.request_count}
+
+
+@shared_task(time_limit=3600, soft_time_limit=3500)
+def poll_ranking_batch_task(run_id):
+    """Checks a ranking batch run; applies its results once it is done, else polls again later."""
+    from candidates.llm_batches import poll_run
+    from .batch_ranking import apply_ranking_results
+
+    if poll_run(run_id, apply_ranking_results):
+        poll_ranking_batch_task.apply_async(args=(run_id,), countdown=settings.LLM_BATCH_POLL_INTERVAL)
+        return {"status": "pending"}
+    return {"status": "done"}
+
+
 @shared_task
 def cleanup_failed_ranking_tasks():
     """
@@ -71,16 +191,18 @@ def cleanup_failed_ranking_tasks():
     print("Starting cleanup of failed ranking tasks")
     
     # Reset ranking status for records that have been stuck in 'ranking' status for more than 2 hours
-    from django.utils import timezone
     from datetime import timedelta
     
+    # Jobs waiting in an unfinished Batch API run are not stuck, batches take up to their completion window
+    from candidates.models import LLMBatchRun
+    active_runs = [run.tag for run in LLMBatchRun.objects.filter(status__in=('preparing', 'submitted', 'applying')).only('id')]
     stuck_jobs = JobPost.objects.filter(
         ranking_status='ranking',
         updated_at__lt=timezone.now() - timedelta(hours=2)
-    )
+    ).exclude(ranking_task_id__in=active_runs)
     
     count = stuck_jobs.count()
-    stuck_jobs.update(ranking_status='not_ranked', ranking_task_id=None)
+    stuck_jobs.update(ranking_status='not_ranked', ranking_task_id=None, updated_at=timezone.now())
     
     print(f"Reset ranking status for {count} stuck job posts")
     return {"reset_count": count}
@@ -1,3 +1,546 @@
-from django.test import TestCase
+import json
+import time
+from unittest import mock
 
-# Create your tests here.
+from celery.exceptions import Retry
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from backends.singleflight import submit_once
+from candidates.features import CandidateFeatureMatrix
+from candidates.models import CandidateProfile
+from main import jobpost_candidate_ranker, reverse_matching, tasks
+from main.signals import queue_reverse_matching
+from main.models import JobPost, RankedCandidate
+from organization.models import Organization
+from users.models import User
+
+
+def create_user(role):
+    return User.objects.create_user(email=f"{role}{User.objects.count()}@example.com")
+
+
+def create_job_post(**fields):
+    user = create_user("recruiter")
+    organization = Organization.objects.create(
+        root_user=user, name="Acme", headquarter_location="Berlin", about="", employee_size=1, industry=1
+    )
+    organization.users.add(user)
+    return JobPost.objects.create(
+        user=user, organization=organization, title="Backend engineer", job_desc="Python and Django",
+        workplace_type=1, location="Berlin", job_type=1, estimated_salary="", **fields
+    )
+
+
+class WordEncoding:
+    """Stand-in for a tiktoken encoding: one token per word."""
+
+    def encode(self, text):
+        return text.split()
+
+
+class ConcurrentScoringTests(SimpleTestCase):
+
+    def setUp(self):
+        self.enterContext(mock.patch.object(jobpost_candidate_ranker, 'get_token_encoding', return_value=WordEncoding()))
+
+    def rank(self, candidates, scores, **kwargs):
+        def score_candidate(job_description, candidate, encoding, model):
+            # Later candidates finish first, so completion order is the reverse of input order
+            time.sleep(0.01 * (len(candidates) - candidates.index(candidate)))
+            return {"candidate_id": candidate["id"], "score": scores[candidate["id"]], "cost": 0.01}, 5, 1
+        with mock.patch.object(jobpost_candidate_ranker, 'score_candidate', side_effect=score_candidate):
+            return jobpost_candidate_ranker.rank_candidates_by_match("job description", candidates, mode="single", **kwargs)
+
+    def test_ties_keep_input_order(self):
+        candidates = [{"id": i} for i in range(6)]
+        scores = {0: 50, 1: 90, 2: 50, 3: 70, 4: 90, 5: 50}
+        arrived = []
+        ranked, tokens, cost = self.rank(candidates, scores, max_concurrency=4, on_result=arrived.extend)
+
+        self.assertEqual([r["candidate_id"] for r in ranked], [1, 4, 3, 0, 2, 5])
+        self.assertEqual(tokens, {"input_tokens": 30, "output_tokens": 6, "total_tokens": 36})
+        self.assertAlmostEqual(cost, 0.06)
+        self.assertEqual(sorted(r["candidate_id"] for r in arrived), list(range(6)))
+        # Results arrive as calls finish, but the ranking doesn't depend on it
+        self.assertNotEqual([r["candidate_id"] for r in arrived], list(range(6)))
+        self.assertEqual(self.rank(candidates, scores, max_concurrency=1)[0], ranked)
+
+    def test_no_candidates(self):
+        self.assertEqual(self.rank([], {}), ([], {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}, 0))
+
+
+class ScoreCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def rank(self, job_description, candidates, failing_ids=()):
+        """rank_candidates_with_cache() over a fake model; returns (ranked ids, candidates sent to the model)."""
+        def rank_by_match(job_description, candidate_data, on_result=None, **kwargs):
+            results = [{
+                "candidate_id": c["id"], "candidate_slug": c["slug"], "reasons": [], "tokens_used": 10, "cost": 0.01,
+                **({"score": 0, "error": True} if c["id"] in failing_ids else {"score": 100 - c["id"]}),
+            } for c in candidate_data]
+            on_result(results)
+            return results, {"total_tokens": 10 * len(results)}, 0.01 * len(results)
+        with mock.patch.object(jobpost_candidate_ranker, 'rank_candidates_by_match', side_effect=rank_by_match) as scored:
+            ranked, tokens, _ = jobpost_candidate_ranker.rank_candidates_with_cache(job_description, candidates, model="gpt-5")
+        return [r["candidate_id"] for r in ranked], [c["id"] for c in scored.call_args.args[1]], tokens
+
+    def test_scores_are_reused(self):
+        candidates = [{"id": i, "slug": f"c{i}", "resume_hash": jobpost_candidate_ranker.content_hash(f"resume {i}")} for i in range(1, 4)]
+        self.assertEqual(
+            self.rank("job", candidates, failing_ids={3}), ([1, 2, 3], [1, 2, 3], {"total_tokens": 30, "cache_hits": 0, "cache_misses": 3})
+        )
+
+        # Only the failed candidate is scored again, and the ordering matches the uncached run
+        ranked, sent, tokens = self.rank("job", candidates)
+        self.assertEqual((ranked, sent), ([1, 2, 3], [3]))
+        self.assertEqual((tokens["cache_hits"], tokens["cache_misses"]), (2, 1))
+        self.assertEqual(self.rank("job", candidates)[1], [])
+
+        # A changed resume or job description is a miss
+        candidates[0]["resume_hash"] = jobpost_candidate_ranker.content_hash("resume 1, edited")
+        self.assertEqual(self.rank("job", candidates)[1], [1])
+        self.assertEqual(self.rank("another job", candidates)[1], [1, 2, 3])
+
+
+def llm_response(content):
+    return mock.Mock(choices=[mock.Mock(message=mock.Mock(content=content))])
+
+
+class BatchedScoringTests(SimpleTestCase):
+
+    def setUp(self):
+        self.encoding = WordEncoding()
+        self.candidates = [{"id": i, "slug": f"c{i}", "resume_data": "python " * (10 * i)} for i in range(1, 6)]
+
+    def test_batches_fit_the_token_budget(self):
+        budget = jobpost_candidate_ranker.count_prompt_tokens(
+            jobpost_candidate_ranker.build_batch_prompt("job", []), self.encoding
+        ) + 50
+        batches = jobpost_candidate_ranker.pack_batches("job", self.candidates, self.encoding, token_budget=budget, max_batch_size=10)
+
+        self.assertEqual([[c["id"] for c in batch] for batch in batches], [[1, 2], [3], [4], [5]])
+        for batch in batches:
+            prompt = jobpost_candidate_ranker.build_batch_prompt("job", batch)
+            # Only a candidate that doesn't fit on its own goes over the budget
+            if len(batch) > 1 or batch[0]["id"] < 5:
+                self.assertLessEqual(jobpost_candidate_ranker.count_prompt_tokens(prompt, self.encoding), budget)
+
+        batches = jobpost_candidate_ranker.pack_batches("job", self.candidates, self.encoding, token_budget=10**6, max_batch_size=2)
+        self.assertEqual([[c["id"] for c in batch] for batch in batches], [[1, 2], [3, 4], [5]])
+
+    def test_parse_skips_invalid_entries(self):
+        content = json.dumps({"scores": [
+            {"candidate_id": "1", "score": "72", "reasons": ["a"]},
+            {"candidate_id": 2, "score": "high", "reasons": []},
+            {"score": 50, "reasons": []},
+        ]})
+        self.assertEqual(jobpost_candidate_ranker.parse_batch_scores(content), {1: (72.0, ["a"])})
+
+    def test_missing_candidates_are_scored_alone(self):
+        content = json.dumps({"scores": [{"candidate_id": 1, "score": 70, "reasons": ["fit"]}]})
+        single = ({"candidate_id": 2, "score": 40, "reasons": [], "tokens_used": 5, "cost": 0.001}, 4, 1)
+        with mock.patch.object(jobpost_candidate_ranker, 'llm_call', return_value=llm_response(content)), \
+                mock.patch.object(jobpost_candidate_ranker, 'score_candidate', return_value=single) as score_candidate:
+            outcomes = jobpost_candidate_ranker.score_batch("job", self.candidates[:2], self.encoding, "gpt-5")
+
+        self.assertEqual([(r["candidate_id"], r["score"]) for r, _, _ in outcomes], [(1, 70), (2, 40)])
+        self.assertEqual(score_candidate.call_args.args[1]["id"], 2)
+        # The batch call's tokens are split evenly, the fallback adds its own on top
+        (_, first_in, first_out), (_, second_in, second_out) = outcomes
+        self.assertEqual((second_in - first_in, second_out - first_out), (4, 1))
+
+
+class SubmitOnceTests(TestCase):
+
+    def submit(self, job, task):
+        return submit_once(
+            JobPost.objects, job.id, task, status_field='ranking_status', task_id_field='ranking_task_id',
+            in_flight_status='ranking', reset_status='not_ranked', args=(job.id,)
+        )
+
+    def test_one_submission_enqueues(self):
+        job = create_job_post()
+        task = mock.Mock()
+        task_id, started = self.submit(job, task)
+        again, started_again = self.submit(job, task)
+
+        self.assertTrue(started)
+        self.assertFalse(started_again)
+        self.assertEqual(again, task_id)
+        task.apply_async.assert_called_once_with(args=(job.id,), task_id=task_id)
+        claimed = JobPost.objects.get(id=job.id)
+        self.assertEqual((claimed.ranking_status, claimed.ranking_task_id), ('ranking', task_id))
+        self.assertGreater(claimed.updated_at, job.updated_at)
+
+    def test_failed_enqueue_releases_the_claim(self):
+        job = create_job_post()
+        task = mock.Mock()
+        task.apply_async.side_effect = ConnectionError("broker down")
+        with self.assertRaises(ConnectionError):
+            self.submit(job, task)
+        self.assertEqual(JobPost.objects.get(id=job.id).ranking_status, 'not_ranked')
+
+        task.apply_async.side_effect = None
+        task_id, started = self.submit(job, task)
+        self.assertTrue(started)
+        self.assertEqual(JobPost.objects.get(id=job.id).ranking_task_id, task_id)
+
+
+@override_settings(RANKING_FANOUT_CHUNK_SIZE=2)
+class RankingFanOutTests(TestCase):
+
+    def setUp(self):
+        self.job = create_job_post()
+
+    def test_shortlist_is_fanned_out(self):
+        with mock.patch.object(tasks, 'prepare_ranking', return_value=(self.job, "job description", [1, 2, 3, 4, 5], [])), \
+                mock.patch.object(tasks, 'start_ranking'), mock.patch.object(tasks, 'chord') as chord:
+            result = tasks.rank_candidates_task.apply(args=(self.job.id,)).get()
+
+        self.assertEqual((result["status"], result["chunks"]), ("fanned_out", 3))
+        header = list(chord.call_args.args[0])
+        self.assertEqual([signature.args[2] for signature in header], [[1, 2], [3, 4], [5]])
+
+    def run_chunk(self, retries, ranked):
+        task = tasks.score_candidates_chunk_task
+        task.push_request(retries=retries)
+        self.addCleanup(task.pop_request)
+        with mock.patch.object(tasks, 'score_shortlist', return_value=(ranked, {"total_tokens": 10}, 0.01)), \
+                mock.patch.object(task, 'retry', side_effect=Retry()) as retry:
+            try:
+                return task.run(self.job.id, "job description", [1, 2]), retry
+            except Retry:
+                return None, retry
+
+    def test_chunk_with_unscored_candidates_is_retried(self):
+        ranked = [{"candidate_id": 1, "score": 80}, {"candidate_id": 2, "score": 0, "error": True}]
+        result, retry = self.run_chunk(0, ranked)
+        self.assertIsNone(result)
+        self.assertIsInstance(retry.call_args.kwargs["exc"], tasks.IncompleteRanking)
+
+    def test_last_chunk_attempt_keeps_what_was_scored(self):
+        ranked = [{"candidate_id": 1, "score": 80}, {"candidate_id": 2, "score": 0, "error": True}]
+        result, retry = self.run_chunk(3, ranked)
+        retry.assert_not_called()
+        self.assertEqual(result["ranked_candidates"], ranked)
+
+    def test_chunks_are_merged_by_score(self):
+        chunks = [
+            {"ranked_candidates": [{"candidate_id": 1, "score": 50}], "token_usage": {"total_tokens": 10}, "estimated_cost": 0.01},
+            {"ranked_candidates": [{"candidate_id": 2, "score": 90}], "token_usage": {"total_tokens": 5}, "estimated_cost": 0.02},
+        ]
+        with mock.patch.object(tasks, 'complete_ranking') as complete_ranking:
+            tasks.finalize_ranking_task(chunks, self.job.id)
+        _, ranked, tokens, cost = complete_ranking.call_args.args[:4]
+        self.assertEqual([r["candidate_id"] for r in ranked], [2, 1])
+        self.assertEqual(tokens, {"total_tokens": 15})
+        self.assertAlmostEqual(cost, 0.03)
+
+
+def create_candidate(**fields):
+    fields.setdefault('resume_data', {'skills': [{'name': 'Python'}]})
+    fields.setdefault('parsing_status', 'parsed')
+    return CandidateProfile.objects.create(user=create_user("candidate"), resume_file="Candidates-Resume/resume.pdf", **fields)
+
+
+def scored(candidate, score, tokens=10, cost=0.01):
+    """rank_candidates_with_cache() result for one candidate."""
+    usage = {"input_tokens": tokens, "output_tokens": 0, "total_tokens": tokens}
+    return [{"candidate_id": candidate.id, "score": score, "reasons": ["fit"]}], usage, cost
+
+
+@override_settings(RANKING_SHORTLIST_SIZE=2, RANKING_SCREEN_TOP_N=4)
+class RankingCascadeTests(TestCase):
+
+    def setUp(self):
+        self.job = create_job_post()
+        skills = {"both": ["Python", "Django"], "python": ["Python"], "django": ["Django"],
+                  "long": ["Python", "Django", "Go", "Rust", "Java"], "unrelated": ["Java"]}
+        self.candidates = {name: create_candidate(resume_data={'skills': [{'name': s} for s in names]}) for name, names in skills.items()}
+        create_candidate(resume_data={'skills': [{'name': 'Python'}, {'name': 'Django'}]}, is_available=False)
+
+        # A fresh matrix, the process-wide one would keep rows of other tests' rolled back profiles
+        self.enterContext(mock.patch.object(
+            jobpost_candidate_ranker, 'get_feature_matrix', side_effect=lambda: CandidateFeatureMatrix().refresh()
+        ))
+        self.enterContext(mock.patch.object(jobpost_candidate_ranker, 'job_search_keywords', return_value=["python", "django"]))
+        self.enterContext(mock.patch.object(jobpost_candidate_ranker, 'prefilter_by_text_search', return_value={}))
+        self.enterContext(mock.patch.object(jobpost_candidate_ranker, 'prefilter_by_embedding', return_value=(None, {})))
+
+    def prepare(self, screen_scores):
+        """prepare_ranking() with the screening model scoring `screen_scores` ({name: score}, None fails)."""
+        ids = {c.id: name for name, c in self.candidates.items()}
+
+        def screen(job_description, candidate_data, model=None, mode=None):
+            scores = [screen_scores[ids[c["id"]]] for c in candidate_data]
+            results = [{"candidate_id": c["id"], "score": score or 0, "error": score is None} for c, score in zip(candidate_data, scores)]
+            return sorted(results, key=lambda r: r["score"], reverse=True), {"total_tokens": 40}, 0.004
+        with mock.patch.object(jobpost_candidate_ranker, 'rank_candidates_with_cache', side_effect=screen) as screened:
+            _, _, selected_ids, cascade = jobpost_candidate_ranker.prepare_ranking(self.job.id)
+        return [ids[i] for i in selected_ids], [ids[c["id"]] for c in screened.call_args.args[1]], cascade
+
+    def test_tiers(self):
+        selected, screened, cascade = self.prepare({"both": 60, "python": 70, "django": 80, "long": 90})
+        # Only candidates matching the job's skills reach the screening tier, best BM25 first
+        self.assertEqual(sorted(screened), ["both", "django", "long", "python"])
+        self.assertEqual(screened[0], "both")
+        self.assertEqual(selected, ["long", "django"])
+        self.assertEqual([(t["tier"], t["considered"], t["kept"]) for t in cascade], [("lexical", 5, 4), ("screen", 4, 2)])
+        self.assertEqual((cascade[1]["cutoff_score"], cascade[1]["cost"]), (80, 0.004))
+
+    def test_failed_screening_keeps_the_lexical_order(self):
+        selected, screened, cascade = self.prepare(dict.fromkeys(["both", "python", "django", "long"]))
+        self.assertEqual(selected, screened[:2])
+        self.assertIsNone(cascade[1]["cutoff_score"])
+
+    def test_small_pool_skips_screening(self):
+        for name in ("python", "django", "long"):
+            CandidateProfile.objects.filter(id=self.candidates[name].id).update(is_available=False)
+        with mock.patch.object(jobpost_candidate_ranker, 'rank_candidates_with_cache') as screen:
+            _, _, selected_ids, cascade = jobpost_candidate_ranker.prepare_ranking(self.job.id)
+        screen.assert_not_called()
+        # Fewer than MIN_CANDIDATES matched, so the pool is topped up with the other eligible profiles
+        self.assertEqual(selected_ids, [self.candidates["both"].id, self.candidates["unrelated"].id])
+        self.assertEqual([t["tier"] for t in cascade], ["lexical"])
+
+
+@override_settings(RANKING_SHORTLIST_SIZE=3)
+class ReverseMatchMergeTests(TestCase):
+
+    def setUp(self):
+        summary = {"token_usage": {"input_tokens": 100, "output_tokens": 0, "total_tokens": 100}, "estimated_cost": 1.0,
+                   "cascade": {"tiers": [{"tier": "lexical", "cost": 0}]}}
+        self.job = create_job_post(ranking_status='ranked', candidate_ranking_data=summary)
+        self.ranked = [create_candidate() for _ in range(3)]
+        for candidate, score in zip(self.ranked, (90, 70, 50)):
+            RankedCandidate.objects.create(job=self.job, candidate=candidate, score=score)
+
+    def merge(self, candidate, score):
+        with mock.patch.object(reverse_matching, 'rank_candidates_with_cache', return_value=scored(candidate, score)):
+            return reverse_matching.merge_candidate_into_ranking(self.job.id, "job description", [{"id": candidate.id}])
+
+    def ranking(self):
+        return list(self.job.ranked_candidates.order_by('-score').values_list('candidate_id', 'score'))
+
+    def test_better_candidate_replaces_the_last(self):
+        candidate = create_candidate()
+        self.assertTrue(self.merge(candidate, 80))
+        self.assertEqual(self.ranking(), [(self.ranked[0].id, 90), (candidate.id, 80), (self.ranked[1].id, 70)])
+
+        self.job.refresh_from_db()
+        summary = self.job.candidate_ranking_data
+        self.assertEqual(summary["candidate_count"], 3)
+        self.assertEqual(summary["token_usage"]["total_tokens"], 110)
+        self.assertAlmostEqual(summary["estimated_cost"], 1.01)
+        self.assertEqual(summary["cascade"]["tiers"], [{"tier": "lexical", "cost": 0}])
+
+    def test_worse_candidate_is_left_out(self):
+        self.assertFalse(self.merge(create_candidate(), 40))
+        self.assertEqual([score for _, score in self.ranking()], [90, 70, 50])
+
+    def test_tie_keeps_the_ranked_candidate(self):
+        self.assertFalse(self.merge(create_candidate(), 50))
+        self.assertEqual([candidate_id for candidate_id, _ in self.ranking()], [c.id for c in self.ranked])
+
+    def test_ranked_candidate_is_rescored_in_place(self):
+        self.assertTrue(self.merge(self.ranked[2], 95))
+        self.assertEqual(self.ranking(), [(self.ranked[2].id, 95), (self.ranked[0].id, 90), (self.ranked[1].id, 70)])
+
+    def test_short_ranking_grows(self):
+        RankedCandidate.objects.filter(candidate=self.ranked[2]).delete()
+        candidate = create_candidate()
+        self.assertTrue(self.merge(candidate, 10))
+        self.assertEqual(len(self.ranking()), 3)
+
+    def test_job_being_reranked_is_left_alone(self):
+        JobPost.objects.filter(id=self.job.id).update(ranking_status='ranking')
+        self.assertFalse(self.merge(create_candidate(), 99))
+        self.assertEqual([score for _, score in self.ranking()], [90, 70, 50])
+
+
+class MatchOnSaveTests(TestCase):
+    """Reverse matching is queued when a profile becomes parsed or available, not on every save."""
+
+    def saved(self, profile, **fields):
+        for field, value in fields.items():
+            setattr(profile, field, value)
+        with mock.patch('main.tasks.match_candidates_to_jobs_task.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            profile.save(update_fields=list(fields) or None)
+        return delay.call_count
+
+    def test_transitions(self):
+        profile = create_candidate(parsing_status='not_parsed')
+        profile = CandidateProfile.objects.get(id=profile.id)
+        self.assertEqual(self.saved(profile, willing_to_relocate=False), 0)
+        self.assertEqual(self.saved(profile, parsing_status='parsed'), 1)
+        self.assertEqual(self.saved(profile, parsing_status='parsed'), 0)
+        self.assertEqual(self.saved(profile, is_available=False), 0)
+        self.assertEqual(self.saved(profile, is_available=True), 1)
+        self.assertEqual(self.saved(profile), 0)
+
+    def test_unparsed_profile_is_not_matched(self):
+        profile = create_candidate(parsing_status='failed', is_available=False)
+        self.assertEqual(self.saved(profile, is_available=True), 0)
+
+    @override_settings(REVERSE_MATCH_CHUNK_SIZE=2)
+    def test_bulk_writes_are_queued_in_chunks(self):
+        profiles = [create_candidate() for _ in range(5)] + [create_candidate(is_available=False)]
+        with mock.patch('main.tasks.match_candidates_to_jobs_task.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            queue_reverse_matching(profiles)
+        ids = [p.id for p in profiles]
+        self.assertEqual([call.args[0] for call in delay.call_args_list], [ids[0:2], ids[2:4], ids[4:5]])
+
+
+@override_settings(REVERSE_MATCH_MAX_JOBS=2, RANKING_SHORTLIST_SIZE=3)
+class ReverseMatchJobCapTests(TestCase):
+
+    def setUp(self):
+        self.enterContext(mock.patch.object(
+            reverse_matching, 'get_feature_matrix', side_effect=lambda: CandidateFeatureMatrix().refresh()
+        ))
+
+    def test_best_placed_jobs_are_scored(self):
+        def skills(*names):
+            return {'skills': [{'name': name} for name in names]}
+        candidate = create_candidate(resume_data=skills("Python"))
+        create_candidate(resume_data=skills("Python", "Django"))
+        create_candidate(resume_data=skills("Go", "Python"))
+        create_candidate(resume_data=skills("Go", "Python", "Rust"))
+        summary = {"candidate_count": 0}
+        keywords = {}
+        # The candidate is 1st by BM25 for "python", 2nd with "django" and 3rd with "go"; "rust" doesn't match it
+        for job_keywords in (["python", "go"], ["rust"], ["python"], ["python", "django"]):
+            job = create_job_post(ranking_status='ranked', candidate_ranking_data=summary)
+            keywords[job.id] = job_keywords
+        create_job_post(ranking_status='not_ranked')
+        go, rust, python, django = keywords
+
+        with mock.patch.object(reverse_matching, 'job_search_keywords', side_effect=lambda job: keywords[job.id]), \
+                mock.patch.object(reverse_matching, 'merge_candidate_into_ranking', return_value=True) as merge:
+            result = reverse_matching.match_candidates_to_jobs([candidate.id])
+
+        self.assertEqual(result["checked_jobs"], 4)
+        self.assertEqual(result["merged_jobs"], {candidate.id: [python, django]})
+        self.assertEqual([call.args[2][0]["id"] for call in merge.call_args_list], [candidate.id] * 2)
+
+
+class RankingDataTests(TestCase):
+
+    def setUp(self):
+        self.job = create_job_post(ranking_status='ranked', candidate_ranking_data={"candidate_count": 5})
+        self.scores = {}
+        for score in (40, 90, 70, 90, 55):
+            candidate = create_candidate()
+            RankedCandidate.objects.create(job=self.job, candidate=candidate, score=score)
+            self.scores[candidate.id] = score
+        self.client = APIClient()
+        self.client.force_authenticate(self.job.user)
+
+    def get(self, **params):
+        return self.client.get(f"/api/channels/jobpost/{self.job.id}/ranking-data/", params)
+
+    def test_pages_by_score(self):
+        response = self.get(limit=2)
+        self.assertEqual(response.data["count"], 5)
+        by_score = sorted(self.scores, key=lambda candidate_id: (-self.scores[candidate_id], candidate_id))
+        self.assertEqual([row["candidate_id"] for row in response.data["results"]], by_score[:2])
+        # Ties are broken by id, so pages don't overlap
+        response = self.get(limit=2, offset=2)
+        self.assertEqual([row["candidate_id"] for row in response.data["results"]], by_score[2:4])
+        self.assertEqual(response.data["summary"], {"candidate_count": 5})
+
+    def test_min_score_and_ordering(self):
+        response = self.get(min_score=55, ordering="score")
+        self.assertEqual(response.data["count"], 4)
+        self.assertEqual([row["score"] for row in response.data["results"]], [55, 70, 90, 90])
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.get(min_score="high").status_code, 400)
+        self.assertEqual(self.get(ordering="candidate__user__email").status_code, 400)
+
+    def test_other_organizations_jobs_are_hidden(self):
+        self.client.force_authenticate(create_job_post().user)
+        self.assertEqual(self.get().status_code, 404)
+
+
+def fake_scoring(failing_ids):
+    """Patches the final-tier scoring: every candidate scores 80 except those in `failing_ids`, which fail."""
+    def rank(job_description, candidate_data, on_result=None, **kwargs):
+        results = [{
+            "candidate_id": c["id"], "candidate_slug": c["slug"], "reasons": [],
+            "job_hash": jobpost_candidate_ranker.content_hash(job_description), "resume_hash": c["resume_hash"],
+            **({"score": 0, "error": True} if c["id"] in failing_ids else {"score": 80}),
+        } for c in candidate_data]
+        for result in results:
+            on_result([result])
+        return results, {}, 0
+    return mock.patch.object(jobpost_candidate_ranker, 'rank_candidates_with_cache', side_effect=rank)
+
+
+class RankingProgressTests(TestCase):
+    """Progress of a ranking run, as the ranking-data endpoint reports it, through a failed attempt and its retry."""
+
+    def setUp(self):
+        self.job = create_job_post(ranking_status='ranking')
+        self.candidates = [create_candidate(resume_data={'skills': [{'name': f'Skill {i}'}]}) for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.job.user)
+
+    def progress(self):
+        response = self.client.get(f"/api/channels/jobpost/{self.job.id}/ranking-data/")
+        self.assertEqual(response.status_code, 200)
+        return response.data["progress"], [row["score"] for row in response.data["results"]]
+
+    def attempt(self, failing_ids):
+        """One ranking attempt in which the candidates in `failing_ids` can't be scored."""
+        ids = [c.id for c in self.candidates]
+        jobpost_candidate_ranker.start_ranking(self.job, "job description", ids)
+        with fake_scoring(failing_ids) as ranked:
+            jobpost_candidate_ranker.score_shortlist("job description", ids, self.job)
+        return [c["id"] for c in ranked.call_args.args[1]]
+
+    def test_failed_attempt_and_retry(self):
+        self.assertEqual(self.progress()[0], {"scored": 0, "total": 0})
+
+        rescored = self.attempt(failing_ids={self.candidates[2].id})
+        self.assertEqual(len(rescored), 3)
+        # The error row is listed (score 0) but not counted as scored
+        self.assertEqual(self.progress(), ({"scored": 2, "total": 3}, [80, 80, 0]))
+
+        # The retry reuses the two saved scores and only scores the failed candidate again
+        rescored = self.attempt(failing_ids=set())
+        self.assertEqual(rescored, [self.candidates[2].id])
+        self.assertEqual(self.progress(), ({"scored": 3, "total": 3}, [80, 80, 80]))
+
+        # Another attempt over the same scores doesn't count them twice
+        self.attempt(failing_ids=set())
+        self.assertEqual(self.progress()[0], {"scored": 3, "total": 3})
+
+    def test_retried_chunk(self):
+        ids = [c.id for c in self.candidates]
+        jobpost_candidate_ranker.start_ranking(self.job, "job description", ids)
+        chunk_task = tasks.score_candidates_chunk_task
+
+        for retries, failing_ids in ((0, {ids[1]}), (1, set())):
+            chunk_task.push_request(retries=retries)
+            try:
+                with fake_scoring(failing_ids), mock.patch.object(chunk_task, 'retry', side_effect=Retry()):
+                    try:
+                        chunk_task.run(self.job.id, "job description", ids[:2])
+                    except Retry:
+                        pass
+            finally:
+                chunk_task.pop_request()
+            self.assertEqual(self.progress()[0], {"scored": 2 - len(failing_ids), "total": 3})
+
+        with fake_scoring(set()):
+            chunk_task.run(self.job.id, "job description", ids[2:])
+        self.assertEqual(self.progress()[0], {"scored": 3, "total": 3})
@@ -2,7 +2,7 @@ from rest_framework import viewsets, status
 from rest_framework import permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.core.cache import cache
+from rest_framework.pagination import LimitOffsetPagination
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 from . import models,serializers
@@ -10,6 +10,7 @@ from dotenv import load_dotenv
 from openai import OpenAI
 from rest_framework.views import APIView
 from .tasks import rank_candidates_task
+from backends.singleflight import submit_once
 from .serializers import AgentQuerySerializer, AgentResponseSerializer
 from main.agent import query_candidates
 
@@ -76,30 +77,19 @@ class JobPostViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_200_OK
             )
         
-        # Check if currently ranking
-        if job.ranking_status == 'ranking':
-            return Response(
-                {
-                    "message": "Candidate ranking already in progress",
-                    "ranking_status": job.ranking_status,
-                    "task_id": job.ranking_task_id
-                },
-                status=status.HTTP_202_ACCEPTED
-            )
-        
         try:
-            # Start background task
-            task = rank_candidates_task.delay(job.id)
-            
-            # Update job with task ID
-            job.ranking_task_id = task.id
-            job.save(update_fields=['ranking_task_id'])
+            # Start background task, or attach to the one already ranking this job
+            task_id, started = submit_once(
+                models.JobPost.objects, job.id, rank_candidates_task,
+                status_field='ranking_status', task_id_field='ranking_task_id',
+                in_flight_status='ranking', reset_status=job.ranking_status, args=(job.id,)
+            )
             
             return Response(
                 {
-                    "message": "Candidate ranking started in background",
+                    "message": "Candidate ranking started in background" if started else "Candidate ranking already in progress",
                     "ranking_status": "ranking",
-                    "task_id": task.id
+                    "task_id": task_id
                 },
                 status=status.HTTP_202_ACCEPTED
             )
@@ -110,29 +100,51 @@ class JobPostViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    RANKING_ORDERINGS = {
+        'score': ('score', 'id'),
+        '-score': ('-score', 'id'),
+        'updated_at': ('updated_at', 'id'),
+        '-updated_at': ('-updated_at', 'id'),
+    }
+
     @action(methods=["GET"], detail=True, url_path="ranking-data")
     def get_ranking_data(self, request, pk=None):
         """
-        Returns the saved candidate ranking data for a job post
+        Returns the job's ranked candidates, paginated and filtered in SQL:
+        ?min_score=<0-100>&ordering=-score|score|-updated_at|updated_at&limit=&offset=
+        While ranking_status is 'ranking' this is the partial list scored so far, see `progress`.
         """
         job = self.get_object()
-        
-        # Cache key for ranking data
-        cache_key = f"job_ranking_data_{job.id}"
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            return Response(cached_data, status=status.HTTP_200_OK)
-        
-        if not job.candidate_ranking_data:
+        if not job.candidate_ranking_data and job.ranking_status != 'ranking':
             return Response(
                 {"detail": "No ranking data available for this job post."},
                 status=status.HTTP_404_NOT_FOUND
             )
-        
-        # Cache the ranking data for 1 hour
-        cache.set(cache_key, job.candidate_ranking_data, 3600)
-        return Response(job.candidate_ranking_data, status=status.HTTP_200_OK)
+
+        ordering = request.query_params.get('ordering', '-score')
+        if ordering not in self.RANKING_ORDERINGS:
+            return Response(
+                {"error": f"ordering must be one of {', '.join(self.RANKING_ORDERINGS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        rows = job.ranked_candidates.select_related('candidate').only(
+            'candidate_id', 'candidate__slug', 'score', 'reasons', 'tokens_used', 'cost', 'error', 'updated_at'
+        ).order_by(*self.RANKING_ORDERINGS[ordering])
+
+        if request.query_params.get('min_score'):
+            try:
+                rows = rows.filter(score__gte=float(request.query_params['min_score']))
+            except ValueError:
+                return Response({"error": "min_score must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = LimitOffsetPagination()
+        paginator.default_limit, paginator.max_limit = 20, 100
+        page = paginator.paginate_queryset(rows, request, view=self)
+        response = paginator.get_paginated_response(serializers.RankedCandidateSerializer(page, many=True).data)
+        response.data['ranking_status'] = job.ranking_status
+        response.data['progress'] = {"scored": job.ranking_scored, "total": job.ranking_total}
+        response.data['summary'] = job.candidate_ranking_data
+        return response
 
 class AgentAPI(APIView):
     permission_classes = (permissions.AllowAny,)
@@ -1,4 +1,4 @@
-from rest_framework.permissions import BasePermission, SAFE_METHODS
+from rest_framework.permissions import BasePermission, IsAuthenticated, SAFE_METHODS
 
 class OrganizationViewSetPermissions(BasePermission):
     def has_permission(self, request, view):
@@ -11,4 +11,10 @@ class OrganizationViewSetPermissions(BasePermission):
         if request.method in SAFE_METHODS:
             # Allow safe methods (GET, HEAD, OPTIONS) for organization members or staff
             return obj.users.filter(id=request.user.id).exists() or obj.root_user == request.user or request.user.is_staff
-        return obj.root_user == request.user or request.user.is_staff
\ No newline at end of file
+        return obj.root_user == request.user or request.user.is_staff
+
+
+class OrganizationMemberPermissions(IsAuthenticated):
+    """Only users who belong to an organization (recruiters), like the job post views expect."""
+    def has_permission(self, request, view):
+        return super().has_permission(request, view) and request.user.organization_set.exists()